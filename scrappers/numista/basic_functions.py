@@ -1,13 +1,47 @@
 from pathlib import Path
+import os
+import sys
 from curl_cffi import requests as creq
+from curl_cffi import CurlHttpVersion
+import asyncio
 import re
+import threading
 import time
 from urllib.parse import parse_qs, urlparse
+from cache_functions import ResponseCache, OfflineCacheMiss
+
+# Fetch-layer pieces shared with the uCoin scraper
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "shared"))
+from session_pool_functions import SessionPool
+from fetch_config_functions import host_budget
+from circuit_breaker_functions import circuit_breaker, BlockedPageDetected, ChallengePageDetected
+from download_functions import stream_download, stream_download_async, discard_partial_download, write_file_atomic, IncompleteDownload
+
+RETRYABLE_STATUS_CODES = [429, 500, 502, 503, 504]
 
 class BasicHelper:
-    def __init__(self):
+    DEFAULT_POOL_SIZE = 4
+    SITE_NAME = "numista"  # circuit breaker shared by every fetch against the site
+
+    # Process-wide pool shared by every scraper that uses the default BasicHelper()
+    _shared_pool = None
+    _shared_pool_lock = threading.Lock()
+
+    # Response cache shared by every helper, see enable_response_cache()
+    _shared_cache = None
+    _offline = False
+
+    def __init__(self, pool_size=None):
         cookie = BasicHelper._read_cookie_file()
 
+        # An explicit pool_size gives this helper its own pool, otherwise the shared one is used
+        self.session_pool = SessionPool(pool_size) if pool_size else BasicHelper.get_shared_pool()
+        self.async_session = None
+
+        self.response_cache = BasicHelper._shared_cache
+        self.offline = BasicHelper._offline
+        self.cache_images = False
+
         self.headers = {
             "accept": r"text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
             "accept-encoding": r"gzip, deflate, br, zstd",
@@ -29,53 +63,388 @@ class BasicHelper:
         }
 
     def fetch(self, url: str, is_image:bool=False) -> str | bytes:
+        body, _ = self._fetch(url, is_image, revalidate=False)
+        return body
+
+    def fetch_revalidated(self, url: str) -> tuple[str, bool]:
+        """
+        Fetch a page bypassing cache freshness, sending If-None-Match/If-Modified-Since when a
+        cached copy exists. Returns (text, not_modified); on 304 the cached text is returned.
+        not_modified is only True when the server answered 304 or sent the cached bytes again,
+        never for a page served from the cache alone (--offline). The validators live in the
+        response cache: without --cache this is a plain GET and not_modified is always False.
+        """
+        return self._fetch(url, False, revalidate=True)
+
+    def _fetch(self, url, is_image, revalidate):
+        cached, entry, headers = self._prepare_request(url, is_image, revalidate)
+        if cached is not None:
+            # Served without asking the server (offline replay or a fresh entry): nothing says it is unchanged
+            return cached, False
+
+        budget = host_budget(url)
+        limiter = budget.limiter
+        breaker = circuit_breaker(BasicHelper.SITE_NAME)
+
         delay = 1
         max_retries = 5
         for attempt in range(1, max_retries + 1):
+            probe = False
             try:
-                r = creq.get(url, headers=self.headers, impersonate="chrome136", timeout=30)
+                probe = breaker.wait()
+                limiter.wait()
+
+                with budget.slot(), self.session_pool.session() as session:
+                    # Timed from here: waiting for a slot or a session says nothing about the host
+                    started = time.monotonic()
+                    try:
+                        r = session.get(url, headers=headers, timeout=budget.timeout)
+                    except Exception:
+                        limiter.on_response(None, time.monotonic() - started)
+                        raise
+                    limiter.on_response(r.status_code, time.monotonic() - started, r.headers.get("Retry-After"))
                 
                 # Check for HTTP errors that warrant a retry
-                if r.status_code in [429, 500, 502, 503, 504]:
+                if r.status_code in RETRYABLE_STATUS_CODES:
                      # Raise to trigger exception handling block below which handles retries
                      r.raise_for_status()
 
-                if is_image:
-                    return r.content
-                else:
-                    text = r.text
-                    # Check for Cloudflare challenge page
-                    if "Checking connection" in text and ("Numista" in text or "Enable JavaScript and cookies to continue" in text):
-                        raise Exception("Cloudflare challenge page detected")
-                    return text
+                result = self._finish_request(url, r, is_image, entry)
+                breaker.record_success(probe)
+                return result
             except Exception as e:
-                msg = str(e)
-                is_retryable_http = False
-                
-                # Check if it's an HTTP error with a retryable status code
-                # curl_cffi might wrap it, or we can check the response object if attached to exception
-                # but we manualy triggered raise_for_status above. 
-                # Let's rely on string matching or attributes if available, but simple logic:
-                # If we raised above, it goes here.
-                # However, raise_for_status() raises RequestsError/HTTPError. 
-                # Let's check if the exception has a 'response' attribute with status code.
-                if hasattr(e, 'response') and e.response is not None:
-                     if e.response.status_code in [429, 500, 502, 503, 504]:
-                         is_retryable_http = True
-
-                # Retry on TLS errors (35), Timeouts (28/Operation timed out), DNS errors (6), or Server Errors
-                if is_retryable_http or "TLS connect error" in msg or "curl: (35)" in msg or "curl: (28)" in msg or "Operation timed out" in msg or "curl: (6)" in msg or "Could not resolve host" in msg:
+                if isinstance(e, BlockedPageDetected):
+                    # Pause every fetcher in the process instead of retrying into the block
+                    breaker.trip(str(e), probe)
+                    if attempt == max_retries:
+                        raise
+                    continue
+
+                breaker.record_failure(probe)
+                if BasicHelper._is_retryable_error(e):
                     if attempt == max_retries:
                         raise
                     
-                    # If 429, maybe respect Retry-After header? For now, exponential backoff.
-                    print(f"Fetch warning ({msg}), retrying in {delay}s...")
+                    if BasicHelper._error_status(e) == 429:
+                        # The host limiter already slowed down and honours Retry-After
+                        print(f"Fetch warning ({e}), retrying at {limiter.current_rate():.2f} req/s...")
+                        continue
+
+                    print(f"Fetch warning ({e}), retrying in {delay}s...")
                     time.sleep(delay)
                     delay *= 2  # exponential backoff
                 else:
                     # some other error: raise immediately
                     raise
-        
+
+    def open_async_session(self, max_clients=10):
+        """
+        Create the curl_cffi AsyncSession used by fetch_async.
+        Must be called from inside the running event loop; close it with close_async_session().
+        """
+        self.async_session = creq.AsyncSession(impersonate="chrome136", max_clients=max_clients, http_version=CurlHttpVersion.V2TLS)
+        return self.async_session
+
+    async def close_async_session(self):
+        if self.async_session is not None:
+            await self.async_session.close()
+            self.async_session = None
+
+    async def fetch_async(self, url: str, is_image:bool=False) -> str | bytes:
+        """Asyncio counterpart of fetch(), same retry and challenge handling."""
+        body, _ = await self._fetch_async(url, is_image, revalidate=False)
+        return body
+
+    async def fetch_revalidated_async(self, url: str) -> tuple[str, bool]:
+        return await self._fetch_async(url, False, revalidate=True)
+
+    async def _fetch_async(self, url, is_image, revalidate):
+        cached, entry, headers = self._prepare_request(url, is_image, revalidate)
+        if cached is not None:
+            # Served without asking the server (offline replay or a fresh entry): nothing says it is unchanged
+            return cached, False
+
+        if self.async_session is None:
+            raise RuntimeError("open_async_session() must be called before fetch_async()")
+
+        budget = host_budget(url)
+        limiter = budget.limiter
+        breaker = circuit_breaker(BasicHelper.SITE_NAME)
+
+        delay = 1
+        max_retries = 5
+        for attempt in range(1, max_retries + 1):
+            probe = False
+            try:
+                probe = await breaker.wait_async()
+                await limiter.wait_async()
+
+                async with budget.slot_async():
+                    started = time.monotonic()
+                    try:
+                        r = await self.async_session.get(url, headers=headers, timeout=budget.timeout)
+                    except Exception:
+                        limiter.on_response(None, time.monotonic() - started)
+                        raise
+                    limiter.on_response(r.status_code, time.monotonic() - started, r.headers.get("Retry-After"))
+
+                if r.status_code in RETRYABLE_STATUS_CODES:
+                     r.raise_for_status()
+
+                result = self._finish_request(url, r, is_image, entry)
+                breaker.record_success(probe)
+                return result
+            except Exception as e:
+                if isinstance(e, BlockedPageDetected):
+                    breaker.trip(str(e), probe)
+                    if attempt == max_retries:
+                        raise
+                    continue
+
+                breaker.record_failure(probe)
+                if BasicHelper._is_retryable_error(e):
+                    if attempt == max_retries:
+                        raise
+
+                    if BasicHelper._error_status(e) == 429:
+                        print(f"Fetch warning ({e}), retrying at {limiter.current_rate():.2f} req/s...")
+                        continue
+
+                    print(f"Fetch warning ({e}), retrying in {delay}s...")
+                    await asyncio.sleep(delay)
+                    delay *= 2
+                else:
+                    raise
+
+    def download_file(self, url, save_path):
+        """
+        Stream url into save_path with constant memory through download_functions.stream_download:
+        chunks go to save_path + ".part", which is checked against Content-Length, fsynced and
+        renamed over save_path. An interrupted transfer is resumed with a Range request on the
+        next attempt, or the next run. Returns False when the server answers with a
+        non-retryable HTTP error.
+        """
+        if self.offline or (self.response_cache is not None and self.cache_images):
+            # The response cache keeps whole bodies, so go through fetch()
+            write_file_atomic(save_path, self.fetch(url, is_image=True))
+            return True
+
+        budget = host_budget(url)
+        limiter = budget.limiter
+        breaker = circuit_breaker(BasicHelper.SITE_NAME)
+
+        delay = 1
+        max_retries = 5
+        for attempt in range(1, max_retries + 1):
+            probe = False
+            try:
+                # A challenge usually only shows up on pages: images probe only when no page fetch is waiting
+                probe = breaker.wait(defer_probe=True)
+                limiter.wait()
+
+                with budget.slot(), self.session_pool.session() as session:
+                    started = time.monotonic()
+                    on_response = lambda r: limiter.on_response(r.status_code, time.monotonic() - started, r.headers.get("Retry-After"))
+                    try:
+                        stream_download(session.get, url, save_path, self.headers, on_response, budget.timeout)
+                    except Exception as e:
+                        if BasicHelper._error_status(e) is None:
+                            limiter.on_response(None, time.monotonic() - started)
+                        raise
+                breaker.record_success(probe)
+                return True
+            except Exception as e:
+                breaker.record_failure(probe)
+                if isinstance(e, IncompleteDownload) or BasicHelper._is_retryable_error(e):
+                    if attempt == max_retries:
+                        # The .part file stays: the next run picks up where this one stopped
+                        raise
+
+                    if BasicHelper._error_status(e) == 429:
+                        print(f"Download warning ({e}), retrying at {limiter.current_rate():.2f} req/s...")
+                        continue
+
+                    print(f"Download warning ({e}), retrying in {delay}s...")
+                    time.sleep(delay)
+                    delay *= 2  # exponential backoff
+                elif (BasicHelper._error_status(e) or 0) >= 400:
+                    discard_partial_download(save_path)
+                    print(f"Download failed ({e}): {url}")
+                    return False
+                else:
+                    raise
+
+    async def download_file_async(self, url, save_path):
+        """Asyncio counterpart of download_file(), on the session opened by open_async_session()."""
+        if self.offline or (self.response_cache is not None and self.cache_images):
+            body = await self.fetch_async(url, is_image=True)
+            await asyncio.to_thread(write_file_atomic, save_path, body)
+            return True
+
+        budget = host_budget(url)
+        limiter = budget.limiter
+        breaker = circuit_breaker(BasicHelper.SITE_NAME)
+
+        delay = 1
+        max_retries = 5
+        for attempt in range(1, max_retries + 1):
+            probe = False
+            try:
+                probe = await breaker.wait_async(defer_probe=True)
+                await limiter.wait_async()
+
+                async with budget.slot_async():
+                    started = time.monotonic()
+                    on_response = lambda r: limiter.on_response(r.status_code, time.monotonic() - started, r.headers.get("Retry-After"))
+                    try:
+                        await stream_download_async(self.async_session, url, save_path, self.headers, on_response, budget.timeout)
+                    except Exception as e:
+                        if BasicHelper._error_status(e) is None:
+                            limiter.on_response(None, time.monotonic() - started)
+                        raise
+                breaker.record_success(probe)
+                return True
+            except Exception as e:
+                breaker.record_failure(probe)
+                if isinstance(e, IncompleteDownload) or BasicHelper._is_retryable_error(e):
+                    if attempt == max_retries:
+                        raise
+
+                    if BasicHelper._error_status(e) == 429:
+                        print(f"Download warning ({e}), retrying at {limiter.current_rate():.2f} req/s...")
+                        continue
+
+                    print(f"Download warning ({e}), retrying in {delay}s...")
+                    await asyncio.sleep(delay)
+                    delay *= 2
+                elif (BasicHelper._error_status(e) or 0) >= 400:
+                    discard_partial_download(save_path)
+                    print(f"Download failed ({e}): {url}")
+                    return False
+                else:
+                    raise
+
+    def _prepare_request(self, url, is_image, revalidate):
+        """
+        Look url up in the response cache.
+        Returns (cached_body, entry, request_headers): cached_body is set when the cache can answer
+        without the network; otherwise request_headers carry the entry's validators, if any.
+        In offline mode a miss raises OfflineCacheMiss.
+        """
+        entry = None
+        if self.response_cache is not None and (not is_image or self.cache_images):
+            entry = self.response_cache.get(url, self.headers, allow_expired=True)
+
+        if self.offline:
+            # Offline replay serves whatever is cached, however old
+            if entry is None:
+                raise OfflineCacheMiss(url)
+            return BasicHelper._decode_entry(entry, is_image), entry, self.headers
+
+        if entry is None:
+            return None, None, self.headers
+
+        if not revalidate and self.response_cache.is_fresh(entry):
+            return BasicHelper._decode_entry(entry, is_image), entry, self.headers
+
+        headers = self.headers
+        if entry["etag"] or entry["last_modified"]:
+            headers = dict(self.headers)
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return None, entry, headers
+
+    def _finish_request(self, url, r, is_image, entry):
+        """Turn a response into (body, not_modified), updating the response cache."""
+        if r.status_code == 304 and entry is not None:
+            self.response_cache.touch(url, self.headers)
+            return BasicHelper._decode_entry(entry, is_image), True
+
+        if is_image:
+            body = r.content
+        else:
+            body = r.text
+            BasicHelper._check_challenge(body)
+
+        not_modified = False
+        if self.response_cache is not None and (not is_image or self.cache_images) and r.status_code == 200:
+            # A 200 carrying the same bytes as the cached copy is unchanged too (servers without validators)
+            changed = self.response_cache.put(
+                url, self.headers, r.status_code, r.content, r.encoding,
+                etag=r.headers.get("ETag"), last_modified=r.headers.get("Last-Modified")
+            )
+            not_modified = not changed
+        return body, not_modified
+
+    @staticmethod
+    def _decode_entry(entry, is_image):
+        if is_image:
+            return entry["body"]
+        return entry["body"].decode(entry["encoding"] or "utf-8", errors="replace")
+
+    @staticmethod
+    def _check_challenge(text):
+        # Check for Cloudflare challenge page
+        if "Checking connection" in text and ("Numista" in text or "Enable JavaScript and cookies to continue" in text):
+            raise ChallengePageDetected("Cloudflare challenge page detected")
+
+    @staticmethod
+    def _error_status(e):
+        # raise_for_status() raises RequestsError/HTTPError with the response attached
+        if hasattr(e, 'response') and e.response is not None:
+            return e.response.status_code
+        return None
+
+    @staticmethod
+    def _is_retryable_error(e):
+        msg = str(e)
+        is_retryable_http = BasicHelper._error_status(e) in RETRYABLE_STATUS_CODES
+
+        # Retry on TLS errors (35), Timeouts (28/Operation timed out), DNS errors (6), truncated bodies (18), or Server Errors
+        if is_retryable_http or "TLS connect error" in msg or "curl: (35)" in msg or "curl: (28)" in msg or "Operation timed out" in msg or "curl: (6)" in msg or "Could not resolve host" in msg or "curl: (18)" in msg:
+            return True
+
+        return False
+
+    @classmethod
+    def get_shared_pool(cls):
+        with cls._shared_pool_lock:
+            if cls._shared_pool is None:
+                cls._shared_pool = SessionPool(cls.DEFAULT_POOL_SIZE)
+            return cls._shared_pool
+
+    @classmethod
+    def configure_shared_pool(cls, size):
+        """Resize the shared pool. Existing helpers keep the pool they were created with."""
+        with cls._shared_pool_lock:
+            cls._shared_pool = SessionPool(size)
+            return cls._shared_pool
+
+    @classmethod
+    def enable_response_cache(cls, offline=False, **cache_args):
+        """
+        Turn on the shared ResponseCache for helpers created afterwards.
+        With offline=True every fetch is served from the cache, ignoring TTL, and misses raise OfflineCacheMiss.
+        """
+        cls._shared_cache = ResponseCache(**cache_args)
+        cls._offline = offline
+        return cls._shared_cache
+
+    @staticmethod
+    def add_cache_arguments(parser):
+        parser.add_argument("--cache", action="store_true", help="serve and store pages through the on-disk response cache; it also keeps the ETag/Last-Modified needed to revalidate pages with conditional GETs")
+        parser.add_argument("--offline", action="store_true", help="replay pages from the response cache only, no network requests")
+        parser.add_argument("--cache-ttl-days", type=float, default=30, help="age after which cached pages are refetched")
+
+    @classmethod
+    def configure_from_args(cls, args):
+        if args.cache or args.offline:
+            cache = cls.enable_response_cache(offline=args.offline, ttl=args.cache_ttl_days * 24 * 3600)
+            if not args.offline:
+                cache.evict()
+
     @staticmethod     
     def text_or_none(el, sep=" ", strip=True):
         return BasicHelper.clean_text(el.get_text(separator=sep)) if el else None
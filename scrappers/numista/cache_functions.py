@@ -0,0 +1,213 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# Request headers that change the content the server returns and therefore belong in the cache key.
+# The cookie is deliberately left out: it rotates (cf_clearance) without changing the page.
+VARY_HEADERS = ["accept", "accept-language"]
+
+class OfflineCacheMiss(Exception):
+    """Raised in offline mode when a URL has no cached response."""
+    def __init__(self, url):
+        super().__init__(f"Offline mode: no cached response for {url}")
+        self.url = url
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of HTTP responses.
+
+    The index lives in SQLite (cache.db) and maps a request key, sha256 of the URL plus
+    the VARY_HEADERS values, to status, timestamp, the ETag/Last-Modified validators
+    used for conditional revalidation and the hash of the body.
+    Bodies are zlib-compressed files named after the sha256 of their content, so
+    identical bodies served under different URLs are stored once.
+
+    Entries older than ttl seconds are treated as missing (except in offline mode) and
+    the least recently used entries are evicted once the bodies exceed max_size bytes.
+    """
+    DEFAULT_TTL = 30 * 24 * 3600
+    DEFAULT_MAX_SIZE = 20 * 1024 ** 3
+
+    def __init__(self, cache_dir=None, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE):
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+        self.bodies_dir = os.path.join(self.cache_dir, "bodies")
+        os.makedirs(self.bodies_dir, exist_ok=True)
+
+        self.ttl = ttl
+        self.max_size = max_size
+
+        # One connection shared by all threads, serialized by the lock
+        self._lock = threading.Lock()
+        self.db_connection = sqlite3.connect(os.path.join(self.cache_dir, "cache.db"), timeout=30, check_same_thread=False)
+        self.db_connection.execute("PRAGMA journal_mode = WAL")
+        self.db_connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                encoding TEXT,
+                body_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT
+            )
+        """)
+        # Caches created before validators were stored
+        columns = {row[1] for row in self.db_connection.execute("PRAGMA table_info(responses)")}
+        for column in ("etag", "last_modified"):
+            if column not in columns:
+                self.db_connection.execute(f"ALTER TABLE responses ADD COLUMN {column} TEXT")
+        self.db_connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses(accessed_at)")
+        self.db_connection.commit()
+
+    @staticmethod
+    def make_key(url, headers=None):
+        lowered = {k.lower(): v for k, v in (headers or {}).items()}
+        parts = [url] + [f"{h}:{lowered.get(h, '')}" for h in VARY_HEADERS]
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def _body_path(self, body_hash):
+        # two-level fan-out keeps directories small
+        return os.path.join(self.bodies_dir, body_hash[:2], body_hash)
+
+    def get(self, url, headers=None, allow_expired=False):
+        """
+        Return {"url", "status", "encoding", "body", "fetched_at", "etag", "last_modified"} or None.
+        Expired entries are returned only when allow_expired is set (revalidation, offline replay).
+        """
+        key = ResponseCache.make_key(url, headers)
+        with self._lock:
+            row = self.db_connection.execute(
+                "SELECT status, encoding, body_hash, fetched_at, etag, last_modified FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+
+            status, encoding, body_hash, fetched_at, etag, last_modified = row
+            if not allow_expired and not self.is_fresh({"fetched_at": fetched_at}):
+                return None
+
+            try:
+                with open(self._body_path(body_hash), "rb") as f:
+                    body = zlib.decompress(f.read())
+            except (OSError, zlib.error):
+                # Body file lost or corrupted: forget the entry
+                self.db_connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.db_connection.commit()
+                return None
+
+            self.db_connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.db_connection.commit()
+
+        return {
+            "url": url,
+            "status": status,
+            "encoding": encoding,
+            "body": body,
+            "fetched_at": fetched_at,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+
+    def is_fresh(self, entry):
+        return self.ttl is None or time.time() - entry["fetched_at"] <= self.ttl
+
+    def touch(self, url, headers=None):
+        """Mark an entry as just revalidated (the server answered 304 Not Modified)."""
+        now = time.time()
+        with self._lock:
+            self.db_connection.execute(
+                "UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, ResponseCache.make_key(url, headers))
+            )
+            self.db_connection.commit()
+
+    def put(self, url, headers, status, body, encoding=None, etag=None, last_modified=None):
+        """Store a response. Returns False when the body is identical to the one already cached."""
+        key = ResponseCache.make_key(url, headers)
+        body_hash = hashlib.sha256(body).hexdigest()
+        path = self._body_path(body_hash)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(zlib.compress(body, 6))
+            os.replace(tmp_path, path)
+
+        now = time.time()
+        with self._lock:
+            old = self.db_connection.execute("SELECT body_hash FROM responses WHERE key = ?", (key,)).fetchone()
+            self.db_connection.execute("""
+                INSERT INTO responses (key, url, status, encoding, body_hash, size, fetched_at, accessed_at, etag, last_modified)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    status=excluded.status,
+                    encoding=excluded.encoding,
+                    body_hash=excluded.body_hash,
+                    size=excluded.size,
+                    fetched_at=excluded.fetched_at,
+                    accessed_at=excluded.accessed_at,
+                    etag=excluded.etag,
+                    last_modified=excluded.last_modified
+            """, (key, url, status, encoding, body_hash, os.path.getsize(path), now, now, etag, last_modified))
+            self.db_connection.commit()
+
+            if old and old[0] != body_hash:
+                self._delete_body_if_unused(old[0])
+
+        return not old or old[0] != body_hash
+
+    def _delete_body_if_unused(self, body_hash):
+        in_use = self.db_connection.execute("SELECT 1 FROM responses WHERE body_hash = ? LIMIT 1", (body_hash,)).fetchone()
+        if not in_use:
+            try:
+                os.remove(self._body_path(body_hash))
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until the cache fits max_size."""
+        removed = 0
+        with self._lock:
+            if self.ttl is not None:
+                rows = self.db_connection.execute(
+                    "SELECT key, body_hash FROM responses WHERE fetched_at < ?", (time.time() - self.ttl,)
+                ).fetchall()
+                removed += self._remove_entries(rows)
+
+            if self.max_size is not None:
+                # Bodies shared by several keys are counted once
+                total = self.db_connection.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT body_hash, size FROM responses)"
+                ).fetchone()[0]
+                if total > self.max_size:
+                    victims = []
+                    for key, body_hash, size in self.db_connection.execute(
+                        "SELECT key, body_hash, size FROM responses ORDER BY accessed_at"
+                    ):
+                        if total <= self.max_size:
+                            break
+                        victims.append((key, body_hash))
+                        total -= size
+                    removed += self._remove_entries(victims)
+
+        return removed
+
+    def _remove_entries(self, rows):
+        if not rows:
+            return 0
+        self.db_connection.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key, _ in rows])
+        for body_hash in {body_hash for _, body_hash in rows}:
+            self._delete_body_if_unused(body_hash)
+        self.db_connection.commit()
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self.db_connection.close()
@@ -2,10 +2,12 @@ import sqlite3
 import os
 
 class CoinTypesDbHelper:
-    def __init__(self):
+    def __init__(self, db_path=None):
         # Database is in the parent directory's db folder
-        self.db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "coins.db")
-        self.db_connection = sqlite3.connect(self.db_path)  
+        self.db_path = db_path or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "coins.db")
+        # Sharded crawls write from several processes: wait for the lock instead of failing
+        self.db_connection = sqlite3.connect(self.db_path, timeout=30)
+        self.db_connection.execute("PRAGMA journal_mode = WAL")
 
         self.db_connection.execute("PRAGMA foreign_keys = ON")
 
@@ -162,6 +164,38 @@ class CoinTypesDbHelper:
 
 
 
+    def get_coin_type_out(self, coin_type_id):
+        """
+        Rebuild the scraper's parsed "out" dict from the stored rows, so an unchanged page does not
+        have to be parsed again. Returns None if the coin type is not in the DB.
+        """
+        sql = """
+            SELECT id, issuer_id, title, subtitle, edge_image, period, coin_type_slug, rarity_index
+            FROM coin_types WHERE id = ?
+        """
+        row = self.db_connection.execute(sql, (coin_type_id,)).fetchone()
+        if not row:
+            return None
+
+        samples_sql = "SELECT obverse_image, reverse_image, sample_type FROM coin_type_samples WHERE coin_type_id = ? ORDER BY rowid"
+        sample_images = [
+            {"obverse_image": r[0], "reverse_image": r[1], "image_type": r[2]}
+            for r in self.db_connection.execute(samples_sql, (coin_type_id,))
+        ]
+
+        return {
+            "id": row[0],
+            "issuer_id": row[1],
+            "title": row[2],
+            "subtitle": row[3],
+            "edge_image": row[4],
+            "period": row[5],
+            "file_name_prefix": row[6],
+            "sample_images": sample_images,
+            "comment_images": self.get_coin_type_comment_images(coin_type_id),
+            "rarity_index": row[7],
+        }
+
     def check_reference_image_exists(self, coin_type_id):
         # sample_type=1 is Reference image
         sql = "SELECT 1 FROM coin_type_samples WHERE coin_type_id = ? AND sample_type = 1 LIMIT 1"
@@ -182,24 +216,34 @@ class CoinTypesDbHelper:
         self.db_connection.execute(sql, (coin_type_id, obverse_image, reverse_image))
         self.db_connection.commit()
 
-    def delete_coin_type(self, coin_type_id):
-        self.db_connection.execute("DELETE FROM coin_types WHERE id = ?", (coin_type_id,))
-        self.db_connection.commit()
-
-    def get_last_inserted_coin_type_with_issuer(self):
-        sql = """
-            SELECT ct.id, ct.coin_type_slug, i.numista_url_slug
+    def get_coin_type_targets(self, coin_type_ids):
+        """
+        Issuer, slug and period of stored coin types, for reprocessing them without the listing pages.
+        Returns {coin_type_id: {...}}; unknown IDs are missing from the result.
+        """
+        if not coin_type_ids:
+            return {}
+        placeholders = ",".join("?" for _ in coin_type_ids)
+        sql = f"""
+            SELECT ct.id, ct.coin_type_slug, ct.period, i.id, i.numista_url_slug
             FROM coin_types ct
             JOIN issuers i ON ct.issuer_id = i.id
-            ORDER BY ct.date_time_inserted DESC
-            LIMIT 1
+            WHERE ct.id IN ({placeholders})
         """
-        cursor = self.db_connection.execute(sql)
-        row = cursor.fetchone()
-        if row:
-            return {
+        return {
+            row[0]: {
                 "id": row[0],
                 "coin_type_slug": row[1],
-                "issuer_url_slug": row[2] # This key name is expected by the caller
+                "period": row[2],
+                "issuer_record": {"id": row[3], "numista_url_slug": row[4]},
             }
-        return None
+            for row in self.db_connection.execute(sql, list(coin_type_ids))
+        }
+
+    def get_coin_type_counts(self):
+        """{issuer_id: number of stored coin types}"""
+        return dict(self.db_connection.execute("SELECT issuer_id, COUNT(*) FROM coin_types GROUP BY issuer_id"))
+
+    def delete_coin_type(self, coin_type_id):
+        self.db_connection.execute("DELETE FROM coin_types WHERE id = ?", (coin_type_id,))
+        self.db_connection.commit()
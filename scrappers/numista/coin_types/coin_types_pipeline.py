@@ -0,0 +1,307 @@
+import os, sys
+import queue
+import threading
+from urllib.parse import urljoin
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+
+from coin_types_db_functions import CoinTypesDbHelper
+from rate_limit_functions import format_rate_metrics
+
+# End-of-stream marker passed down the queues
+_DONE = object()
+
+class PageProgress:
+    """
+    Marks a listing page done in the crawl frontier once every coin queued from it has finished.
+    The listing stage runs ahead of the other stages, so a page is usually closed long before
+    its last coin is done.
+    """
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self._lock = threading.Lock()
+        self._pages = {}  # (issuer_slug, page) -> [pending coins, listing finished, listing fingerprint]
+
+    def start(self, key):
+        self.scraper.log_processed_page(*key)
+        with self._lock:
+            self._pages[key] = [0, False, None]
+
+    def add(self, key):
+        with self._lock:
+            self._pages[key][0] += 1
+
+    def close(self, key, fingerprint):
+        with self._lock:
+            self._pages[key][1] = True
+            self._pages[key][2] = fingerprint
+        self._complete_if_finished(key)
+
+    def done(self, key):
+        with self._lock:
+            self._pages[key][0] -= 1
+        self._complete_if_finished(key)
+
+    def _complete_if_finished(self, key):
+        with self._lock:
+            pending, closed, fingerprint = self._pages[key]
+            if pending or not closed:
+                return
+            del self._pages[key]
+        self.scraper.frontier.complete_page(*key, fingerprint)
+
+class CoinTypesPipeline:
+    """
+    CoinTypesScraper.process() split into stages joined by bounded queues:
+
+        listing -> page fetch -> parse -> DB writer -> image download
+
+    Each stage has its own thread count and the queues give backpressure, so network I/O,
+    BeautifulSoup parsing and SQLite writes overlap instead of adding up. The listing and
+    DB stages own their SQLite connections (a connection cannot move between threads);
+    fetches go through the scraper's thread-safe BasicHelper.
+    Parsing is pure Python, so extra parse workers only help while others wait on I/O.
+
+    The first error stops the listing, the remaining queued coins are drained without being
+    processed and run() re-raises it. Targeting a single coin type (coin_type_id) is only
+    supported by process().
+    """
+    def __init__(self, scraper, fetch_workers=4, parse_workers=2, image_workers=4, queue_size=16):
+        self.scraper = scraper
+        self.workers = {
+            "fetch": fetch_workers,
+            "parse": parse_workers,
+            "db": 1,  # a single writer keeps SQLite free of lock contention
+            "image": image_workers,
+        }
+        self.queues = {stage: queue.Queue(maxsize=queue_size) for stage in self.workers}
+        self.progress = PageProgress(self.scraper)
+
+        self.failed = threading.Event()
+        self.error = None
+        self._lock = threading.Lock()
+        self._remaining = dict(self.workers)
+
+    def run(self, issuer_url_slug=None, page=None):
+        # Issuers are read up front: the issuers DB connection belongs to this thread
+        issuers = list(self.scraper._iter_issuers(issuer_url_slug, page))
+        self._run(self._listing, issuers)
+
+    def run_jobs(self, jobs):
+        """Process prepared jobs (see make_job) without the listing stage; the crawl frontier is left alone."""
+        self._run(self._feed, jobs)
+
+    def _run(self, source, source_arg):
+        stages = [
+            ("fetch", self._fetch, None, "parse"),
+            ("parse", self._parse, None, "db"),
+            ("db", self._store, CoinTypesDbHelper, "image"),
+            ("image", self._download_images, None, None),
+        ]
+        threads = [threading.Thread(target=source, args=(source_arg,), name="source")]
+        for stage, handle, setup, next_stage in stages:
+            for i in range(self.workers[stage]):
+                threads.append(threading.Thread(
+                    target=self._worker, args=(stage, handle, setup, next_stage), name=f"{stage}-{i}"
+                ))
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self.error is not None:
+            raise self.error
+
+    def _fail(self, e):
+        with self._lock:
+            if self.error is None:
+                self.error = e
+        self.failed.set()
+
+    def _finish_stage(self, next_stage):
+        """Tell every worker of next_stage that no more items are coming."""
+        if next_stage is not None:
+            for _ in range(self.workers[next_stage]):
+                self.queues[next_stage].put(_DONE)
+
+    def _worker(self, stage, handle, setup, next_stage):
+        db_helper = setup() if setup else None
+        in_queue = self.queues[stage]
+        out_queue = self.queues[next_stage] if next_stage else None
+
+        while True:
+            job = in_queue.get()
+            if job is _DONE:
+                break
+            if self.failed.is_set():
+                # Keep draining so upstream stages never block on a full queue
+                continue
+            try:
+                result = handle(job, db_helper) if db_helper else handle(job)
+                if result is None:
+                    if job["page_key"] is not None:
+                        self.scraper.frontier.complete_coin(*job["page_key"], job["id"])
+                        self.progress.done(job["page_key"])
+                else:
+                    out_queue.put(result)
+            except Exception as e:
+                print(f"Pipeline {stage} failed on coin type {job['id']}: {e}")
+                if job["page_key"] is not None:
+                    self.scraper.frontier.fail_coin(*job["page_key"], job["id"], e)
+                self._fail(e)
+
+        with self._lock:
+            self._remaining[stage] -= 1
+            last = self._remaining[stage] == 0
+        if last:
+            self._finish_stage(next_stage)
+
+    def _listing(self, issuers):
+        scraper = self.scraper
+        db_helper = CoinTypesDbHelper()
+        try:
+            for issuer_record, page in issuers:
+                issuer_url_slug = issuer_record["numista_url_slug"]
+                for page, country_page_soup in scraper.iter_listing_pages(issuer_url_slug, page):
+                    if self.failed.is_set():
+                        break
+                    page_key = (issuer_url_slug, page)
+                    print(f"Processing {issuer_url_slug} page {page}... [{format_rate_metrics()}]")
+                    self.progress.start(page_key)
+
+                    periods = scraper.parse_country_page(country_page_soup)
+                    fingerprint, unchanged = scraper.check_listing(issuer_url_slug, page, periods)
+                    if unchanged:
+                        periods = []
+
+                    for period in periods:
+                        for coin_type_link in period["links"]:
+                            job = self._new_job(db_helper, issuer_record, period, coin_type_link, page_key)
+                            if job is not None:
+                                self.progress.add(page_key)
+                                self.queues["fetch"].put(job)
+                    self.progress.close(page_key, fingerprint)
+                if self.failed.is_set():
+                    break
+        except Exception as e:
+            print(f"Pipeline listing failed: {e}")
+            self._fail(e)
+        finally:
+            self._finish_stage("fetch")
+
+    def _feed(self, jobs):
+        try:
+            for job in jobs:
+                if self.failed.is_set():
+                    break
+                self.queues["fetch"].put(job)
+        finally:
+            self._finish_stage("fetch")
+
+    @staticmethod
+    def make_job(id, url, issuer_record, period, coin_type_db_info, file_name_prefix, coin_type_dir, page_key=None, replace=False):
+        """
+        A coin type to run through the pipeline. With replace, the stored row is replaced by the
+        DB writer once the new page is parsed, and the folder once the new images are in.
+        """
+        return {
+            "id": id,
+            "url": url,
+            "issuer_record": issuer_record,
+            "period": period,
+            "coin_type_db_info": coin_type_db_info,
+            "file_name_prefix": file_name_prefix,
+            "coin_type_dir": coin_type_dir,
+            "page_key": page_key,
+            "replace": replace,
+        }
+
+    def _new_job(self, db_helper, issuer_record, period, coin_type_link, page_key):
+        scraper = self.scraper
+        coin_type_url = coin_type_link["href"]
+        id = scraper.basic_helper.id_from_url_path(coin_type_url)
+        if id is None:
+            raise ValueError(f"Cannot extract coin type ID from URL: {coin_type_url}")
+
+        # Coins finished before a crash are skipped without touching the DB or the disk
+        if not scraper.frontier.claim_coin(*page_key, id):
+            return None
+
+        coin_type_db_info = db_helper.get_coin_type_full_info(id)
+        if scraper.check_if_exists(issuer_record["numista_url_slug"], coin_type_db_info):
+            scraper.frontier.complete_coin(*page_key, id)
+            return None
+
+        file_name_prefix, coin_type_dir = scraper.get_coin_type_dir(coin_type_link, issuer_record, id)
+        return CoinTypesPipeline.make_job(
+            id, urljoin(scraper.base_url, coin_type_url), issuer_record, period,
+            coin_type_db_info, file_name_prefix, coin_type_dir, page_key
+        )
+
+    def _fetch(self, job):
+        basic_helper = self.scraper.basic_helper
+        job["not_modified"] = False
+        if job["coin_type_db_info"]:
+            # Stored but incomplete: an unchanged page needs no parsing or DB writes
+            job["page"], job["not_modified"] = basic_helper.fetch_revalidated(job["url"])
+        else:
+            job["page"] = basic_helper.fetch(job["url"])
+        return job
+
+    def _parse(self, job):
+        if job["not_modified"]:
+            # Rebuilt from the DB by the writer stage
+            return job
+
+        scraper = self.scraper
+        out = scraper._new_out(job["id"], job["issuer_record"], job["period"], job["file_name_prefix"])
+        soup = scraper.parse_coin_type_page(out, job["page"])
+        job["out"] = out
+        job["cleaned_page"] = scraper.clean_html(soup, out, job["issuer_record"]["numista_url_slug"])
+        return job
+
+    def _store(self, job, db_helper):
+        issuer_url_slug = job["issuer_record"]["numista_url_slug"]
+        coin_type_dir = job["coin_type_dir"]
+        file_path = os.path.join(coin_type_dir, "coin_type.html")
+        job["skip_existing"] = False
+        job["staging_dir"] = None
+
+        if job["not_modified"]:
+            out = db_helper.get_coin_type_out(job["id"])
+            if out:
+                os.makedirs(coin_type_dir, exist_ok=True)
+                if not os.path.exists(file_path):
+                    with open(file_path, "w", encoding="utf-8") as f:
+                        f.write(self.scraper.clean_html(job["page"], out, issuer_url_slug))
+                job["out"] = out
+                job["skip_existing"] = True
+                return job
+
+            # The DB row is gone since the listing looked it up: parse the page after all
+            job["not_modified"] = False
+            self._parse(job)
+
+        if not job["coin_type_db_info"]:
+            # New or replaced: built in a staging folder, published once its images are in
+            job["staging_dir"] = self.scraper.stage_coin_type(
+                job["out"], job["cleaned_page"], issuer_url_slug, coin_type_dir, replace=job["replace"], db_helper=db_helper
+            )
+            return job
+
+        # Stored but incomplete: repaired in place
+        os.makedirs(coin_type_dir, exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(job["cleaned_page"])
+        return job
+
+    def _download_images(self, job):
+        issuer_url_slug = job["issuer_record"]["numista_url_slug"]
+        if job["staging_dir"]:
+            self.scraper.finish_coin_type(job["out"], issuer_url_slug, job["staging_dir"], job["coin_type_dir"])
+        else:
+            self.scraper.download_coin_type_images(job["out"], issuer_url_slug, job["coin_type_dir"], skip_existing=job["skip_existing"])
+        # Nothing downstream: the coin is finished
+        return None
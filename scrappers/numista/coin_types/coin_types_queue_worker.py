@@ -0,0 +1,203 @@
+import os, sys
+import argparse
+import json
+import socket
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+
+from work_queue_db_functions import WorkQueueDbHelper
+from coin_types_scrapper import CoinTypesScraper
+from basic_functions import *
+from rate_limit_functions import configure_rate_limits, format_rate_metrics
+from fetch_config_functions import load_hosts_config
+from download_functions import SingleFlightDownloads
+from html_parser_functions import make_soup, configure_html_parser, add_html_parser_argument
+
+class CoinTypesQueueWorker:
+    """
+    One crawl node: worker threads take leased tasks from the shared WorkQueueDbHelper and run
+    the CoinTypesScraper logic on them.
+    - a listing page queues its coin types and the next page
+    - a coin type is fetched, stored and has its images downloaded as in process()
+
+    A heartbeat thread renews the leases of the tasks in progress every lease_seconds / 3.
+    Tasks of a node that died are picked up by the others once their leases run out.
+    Workers stop when nothing is pending, leased or left to retry. While another node still
+    holds a listing page they keep polling, because that page may queue more coin types.
+
+    The coin data lands in the node's own coins.db and html folder, like a local crawl.
+    The nodes do not share their rate limiters. With --max-rps set to (global budget / nodes),
+    throughput grows with the number of nodes up to that budget.
+    """
+    def __init__(self, queue, workers=4, lease_seconds=300, poll_interval=5, node_id=None):
+        self.queue = queue
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.node_id = node_id or f"{socket.gethostname()}:{os.getpid()}"
+
+        # Shared by the scrapers of all worker threads
+        self.basic_helper = BasicHelper()
+        self.image_downloads = SingleFlightDownloads()
+
+        self._held = {}  # lease token -> task_key
+        self._held_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def _new_scraper(self):
+        # A scraper per thread: its SQLite connections cannot be shared between threads
+        scraper = CoinTypesScraper()
+        scraper.basic_helper = self.basic_helper
+        scraper.image_downloads = self.image_downloads
+        return scraper
+
+    def seed(self, scraper=None):
+        """Queue the first listing page of every issuer (of the scraper's shard, if set)."""
+        scraper = scraper or self._new_scraper()
+        added = 0
+        for issuer_record, page in scraper._iter_issuers(None, 1):
+            if self.queue.add_page(issuer_record["numista_url_slug"], page, json.dumps({"issuer_id": issuer_record["id"]})):
+                added += 1
+        print(f"Queued {added} issuers")
+
+    def run(self):
+        threads = [threading.Thread(target=self._work, name=f"worker-{i}") for i in range(self.workers)]
+        heartbeat = threading.Thread(target=self._heartbeat, name="heartbeat", daemon=True)
+        heartbeat.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self._stopping.set()
+        heartbeat.join()
+
+    def _heartbeat(self):
+        while not self._stopping.wait(self.lease_seconds / 3):
+            with self._held_lock:
+                tokens = list(self._held)
+            try:
+                extended = self.queue.heartbeat(tokens, self.lease_seconds)
+            except Exception as e:
+                print(f"Lease heartbeat failed: {e}")
+                continue
+            # Tasks completed meanwhile have no lease left to extend
+            with self._held_lock:
+                still_held = sum(1 for token in tokens if token in self._held)
+            if extended < still_held:
+                print(f"{still_held - extended} leases were lost to other workers; their tasks may run twice")
+
+    def _work(self):
+        scraper = self._new_scraper()
+        while True:
+            task = self.queue.claim(self.node_id, self.lease_seconds)
+            if task is None:
+                if not self.queue.has_open_tasks():
+                    break
+                time.sleep(self.poll_interval)
+                continue
+
+            if task["reclaimed"]:
+                print(f"Reclaimed expired lease on {task['task_key']}")
+            with self._held_lock:
+                self._held[task["token"]] = task["task_key"]
+            try:
+                if task["kind"] == WorkQueueDbHelper.PAGE:
+                    self._process_page(scraper, task)
+                else:
+                    self._process_coin(scraper, task)
+            except Exception as e:
+                print(f"Task {task['task_key']} failed: {e}")
+                self.queue.fail(task["task_key"], task["token"], e)
+            else:
+                self.queue.complete(task["task_key"])
+            finally:
+                with self._held_lock:
+                    del self._held[task["token"]]
+
+    def _process_page(self, scraper, task):
+        issuer_url_slug, page = task["issuer_url_slug"], task["page"]
+        print(f"Processing {issuer_url_slug} page {page}... [{format_rate_metrics()}]")
+
+        country_page_text, _ = scraper.basic_helper.fetch_revalidated(scraper._listing_url(issuer_url_slug, page))
+        country_page_soup = make_soup(country_page_text)
+        issuer_id = json.loads(task["payload"])["issuer_id"]
+
+        for period in scraper.parse_country_page(country_page_soup):
+            for coin_type_link in period["links"]:
+                id = scraper.basic_helper.id_from_url_path(coin_type_link["href"])
+                if id is None:
+                    raise ValueError(f"Cannot extract coin type ID from URL: {coin_type_link['href']}")
+                # The anchor is kept as HTML: directory names are derived from its text
+                self.queue.add_coin(issuer_url_slug, page, id, json.dumps({
+                    "issuer_id": issuer_id,
+                    "period_text": period["period_text"],
+                    "link": str(coin_type_link),
+                }))
+
+        next_page = scraper._get_next_page_number(country_page_soup)
+        if next_page:
+            self.queue.add_page(issuer_url_slug, next_page, task["payload"])
+
+    def _process_coin(self, scraper, task):
+        payload = json.loads(task["payload"])
+        issuer_record = {"id": payload["issuer_id"], "numista_url_slug": task["issuer_url_slug"]}
+        coin_type_link = make_soup(payload["link"]).a
+        scraper._process_coin_type(task["coin_type_id"], coin_type_link, {"period_text": payload["period_text"]}, issuer_record)
+
+def print_queue_status(queue):
+    counts = queue.get_counts()
+    for kind in (WorkQueueDbHelper.PAGE, WorkQueueDbHelper.COIN):
+        states = ", ".join(f"{count} {state}" for (k, state), count in sorted(counts.items()) if k == kind)
+        print(f"{kind}s: {states or 'none'}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl Numista coin types from a work queue shared by several nodes")
+    parser.add_argument("--queue-dsn", help="Postgres DSN of the queue, e.g. \"host=db port=5432 dbname=mintada_db user=admin password=...\"")
+    parser.add_argument("--queue-db", help="SQLite file of the queue for nodes on one host (default: numista/db/work_queue.db)")
+    parser.add_argument("--seed", action="store_true", help="queue the first listing page of every issuer before working")
+    parser.add_argument("--fresh", action="store_true", help="empty the queue first (a new crawl)")
+    parser.add_argument("--status", action="store_true", help="print the task counts and exit")
+    shard_group = parser.add_mutually_exclusive_group()
+    shard_group.add_argument("--shard", type=CoinTypesScraper.parse_shard, help="with --seed, queue only shard i of N (e.g. 0/4) of the issuers")
+    shard_group.add_argument("--issuers", type=lambda v: [x.strip() for x in v.split(",") if x.strip()], help="with --seed, comma-separated issuer slugs to queue")
+    parser.add_argument("--workers", type=int, default=4, help="worker threads on this node")
+    parser.add_argument("--lease", type=float, default=300, help="lease length in seconds; renewed every third of it")
+    parser.add_argument("--max-attempts", type=int, default=3, help="attempts per task before it stays failed")
+    parser.add_argument("--node-id", help="name of this node in the leases (default: hostname:pid)")
+    parser.add_argument("--max-rps", type=float, help="requests-per-second cap of this node per host")
+    parser.add_argument("--rate-state", help="SQLite file shared by the scraper processes of this host to throttle together")
+    parser.add_argument("--hosts-config", help="per-host concurrency/rate/timeout settings (default: scrappers/shared/fetch_hosts.json)")
+    BasicHelper.add_cache_arguments(parser)
+    add_html_parser_argument(parser)
+    args = parser.parse_args()
+
+    queue = WorkQueueDbHelper(dsn=args.queue_dsn, sqlite_path=args.queue_db, max_attempts=args.max_attempts)
+    if args.status:
+        print_queue_status(queue)
+        return
+
+    BasicHelper.configure_from_args(args)
+    configure_html_parser(args.html_parser)
+    if args.rate_state:
+        configure_rate_limits(state_path=args.rate_state)
+    if args.max_rps:
+        configure_rate_limits(max_rate=args.max_rps)
+    if args.hosts_config:
+        load_hosts_config(args.hosts_config)
+
+    worker = CoinTypesQueueWorker(queue, workers=args.workers, lease_seconds=args.lease, node_id=args.node_id)
+    if args.fresh:
+        queue.reset()
+    if args.seed:
+        scraper = worker._new_scraper()
+        scraper.set_shard(args.shard, args.issuers)
+        worker.seed(scraper)
+
+    worker.run()
+    print_queue_status(queue)
+
+if __name__ == '__main__':
+    raise SystemExit(main())
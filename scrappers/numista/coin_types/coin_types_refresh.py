@@ -0,0 +1,195 @@
+import os, sys
+import argparse
+import heapq
+import math
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+
+from coin_types_scrapper import CoinTypesScraper
+from image_queue_db_functions import ImageQueueDbHelper
+from basic_functions import *
+from rate_limit_functions import configure_rate_limits, format_rate_metrics, requests_sent
+from fetch_config_functions import load_hosts_config
+from html_parser_functions import configure_html_parser, add_html_parser_argument
+
+# Coin types per listing page (the listing URL asks for q=200)
+LISTING_PAGE_SIZE = 200
+
+class RefreshScheduler:
+    """
+    Stale-first refresh of the catalogue under a time and/or request budget.
+
+    Instead of walking the issuers in id order, every known listing page is ranked by the number
+    of coin types a visit is expected to find changed:
+
+        score = P(changed since the last check) * coin types on the page
+        P(changed) = 1 - exp(-change_rate * age)
+
+    age is the time since the page was last checked and change_rate the changes per second seen
+    over its recorded checks (listing_checks), smoothed with a prior of one change per
+    prior_change_interval so a page checked only once or twice is neither ignored nor favoured.
+    Pages never checked have P = 1 and are sized from the coin types stored for their issuer
+    (a full page for an issuer with none). A page reached through the "next" link of another
+    one that is not known yet is scheduled as soon as it is seen.
+
+    The pages go through CoinTypesScraper.process_listing_page(), so a listing whose links did
+    not change costs one request. The budget is checked between listing pages: the page being
+    processed is always finished. Progress lives in a "refresh" shard of the crawl frontier, and
+    coin types left half-written by an interrupted refresh are finished from the coin journal.
+    """
+    def __init__(self, scraper, max_seconds=None, max_requests=None, prior_change_interval=30 * 86400):
+        self.scraper = scraper
+        self.max_seconds = max_seconds
+        self.max_requests = max_requests
+        self.prior_change_interval = prior_change_interval
+
+    def score_page(self, check, now):
+        """Expected changed coin types on a checked page (check: a get_listing_checks() entry)."""
+        age = max(now - check["checked_at"], 0)
+        observed = check["checked_at"] - check["first_checked_at"]
+        change_rate = (check["changes"] + 1) / (observed + self.prior_change_interval)
+        return (1 - math.exp(-change_rate * age)) * max(check["coin_count"], 1)
+
+    @staticmethod
+    def score_unchecked_page(stored_coin_types, page):
+        """Expected changed coin types on a page never checked: all of the coin types it should hold."""
+        if not stored_coin_types:
+            return LISTING_PAGE_SIZE
+        return min(LISTING_PAGE_SIZE, max(stored_coin_types - LISTING_PAGE_SIZE * (page - 1), 1))
+
+    def plan(self):
+        """[(score, issuer_record, page)] for the known listing pages of the crawled issuers, best first."""
+        now = time.time()
+        checks = self.scraper.frontier.get_listing_checks()
+        stored = self.scraper.db_helper.get_coin_type_counts()
+
+        plan = []
+        for issuer_record in self.scraper.issuers_db_helper.get_issuers():
+            issuer_url_slug = issuer_record["numista_url_slug"]
+            if not self.scraper.in_shard(issuer_url_slug):
+                continue
+            pages = checks.get(issuer_url_slug)
+            if not pages:
+                plan.append((RefreshScheduler.score_unchecked_page(stored.get(issuer_record["id"]), 1), issuer_record, 1))
+                continue
+            for page, check in pages.items():
+                plan.append((self.score_page(check, now), issuer_record, page))
+
+        # Stable: equal scores keep the issuer order
+        plan.sort(key=lambda item: -item[0])
+        return plan
+
+    @staticmethod
+    def refresh_shard(shard):
+        """Frontier shard of a refresh of the given crawl shard: its progress never mixes with the crawl's."""
+        return "refresh:" + shard if shard else "refresh"
+
+    def budget_left(self, started, requests_at_start):
+        if self.max_seconds is not None and time.monotonic() - started >= self.max_seconds:
+            return False
+        if self.max_requests is not None and requests_sent() - requests_at_start >= self.max_requests:
+            return False
+        return True
+
+    def run(self):
+        scraper = self.scraper
+        scraper.frontier.shard = RefreshScheduler.refresh_shard(scraper.frontier.shard)
+        # Pages the crawl finished and whose links did not change since are skipped from the first refresh on
+        scraper.frontier.fingerprints_from_any_shard = True
+        scraper.cleanup_interrupted_coins()
+        scraper.frontier.reset()
+
+        stored = scraper.db_helper.get_coin_type_counts()
+        heap = []
+        scheduled = set()
+        for order, (score, issuer_record, page) in enumerate(self.plan()):
+            heap.append((-score, order, page, issuer_record))
+            scheduled.add((issuer_record["numista_url_slug"], page))
+        heapq.heapify(heap)
+        order = len(heap)
+
+        started = time.monotonic()
+        requests_at_start = requests_sent()
+        pages_done = 0
+        coin_types_done = 0
+        while heap:
+            if not self.budget_left(started, requests_at_start):
+                print(f"Refresh budget used up, {len(heap)} listing pages left for the next refresh")
+                break
+
+            neg_score, _, page, issuer_record = heapq.heappop(heap)
+            issuer_url_slug = issuer_record["numista_url_slug"]
+            print(f"Refreshing {issuer_url_slug} page {page} (expected changes {-neg_score:.2f})")
+
+            country_page_soup = scraper._fetch_listing(issuer_url_slug, page)
+            coin_types_done += scraper.process_listing_page(issuer_record, page, country_page_soup)
+            pages_done += 1
+
+            next_page = scraper._get_next_page_number(country_page_soup)
+            if next_page is not None and (issuer_url_slug, next_page) not in scheduled:
+                # A page the refresh has not seen yet: as stale as it gets
+                score = RefreshScheduler.score_unchecked_page(stored.get(issuer_record["id"]), next_page)
+                heapq.heappush(heap, (-score, order, next_page, issuer_record))
+                scheduled.add((issuer_url_slug, next_page))
+                order += 1
+
+        print(f"Refreshed {pages_done} listing pages, {coin_types_done} coin types processed, "
+              f"{requests_sent() - requests_at_start} requests in {time.monotonic() - started:.0f}s [{format_rate_metrics()}]")
+
+def print_plan(scheduler, limit):
+    plan = scheduler.plan()
+    for score, issuer_record, page in plan[:limit]:
+        print(f"{score:10.2f}  {issuer_record['numista_url_slug']} page {page}")
+    if len(plan) > limit:
+        print(f"... {len(plan) - limit} more listing pages")
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the Numista coin types stale-first within a time or request budget")
+    parser.add_argument("--budget-minutes", type=float, help="stop starting new listing pages after this many minutes")
+    parser.add_argument("--budget-requests", type=int, help="stop starting new listing pages after this many requests")
+    parser.add_argument("--prior-change-days", type=float, default=30, help="assumed interval between changes of a page with little history")
+    parser.add_argument("--plan", type=int, nargs="?", const=50, help="print the first N ranked listing pages and exit")
+    shard_group = parser.add_mutually_exclusive_group()
+    shard_group.add_argument("--shard", type=CoinTypesScraper.parse_shard, help="refresh only shard i of N (e.g. 0/4) of the issuers")
+    shard_group.add_argument("--issuers", type=lambda v: [x.strip() for x in v.split(",") if x.strip()], help="comma-separated issuer slugs to refresh")
+    parser.add_argument("--recheck-listings", action="store_true", help="check every coin even on listing pages that did not change since the last crawl")
+    parser.add_argument("--defer-images", action="store_true", help="queue images for image_downloader.py instead of downloading them during the refresh")
+    parser.add_argument("--max-rps", type=float, help="requests-per-second cap per host")
+    parser.add_argument("--rate-state", help="SQLite file shared by several scraper processes to throttle together")
+    parser.add_argument("--hosts-config", help="per-host concurrency/rate/timeout settings (default: scrappers/shared/fetch_hosts.json)")
+    BasicHelper.add_cache_arguments(parser)
+    add_html_parser_argument(parser)
+    args = parser.parse_args()
+
+    BasicHelper.configure_from_args(args)
+    configure_html_parser(args.html_parser)
+    if args.rate_state:
+        configure_rate_limits(state_path=args.rate_state)
+    if args.max_rps:
+        configure_rate_limits(max_rate=args.max_rps)
+    if args.hosts_config:
+        load_hosts_config(args.hosts_config)
+
+    scraper = CoinTypesScraper()
+    scraper.skip_unchanged_listings = not args.recheck_listings
+    if args.defer_images:
+        scraper.image_queue = ImageQueueDbHelper()
+    scraper.set_shard(args.shard, args.issuers)
+
+    scheduler = RefreshScheduler(
+        scraper,
+        max_seconds=args.budget_minutes * 60 if args.budget_minutes is not None else None,
+        max_requests=args.budget_requests,
+        prior_change_interval=args.prior_change_days * 86400,
+    )
+    if args.plan is not None:
+        print_plan(scheduler, args.plan)
+        return
+    if not (args.cache or args.offline):
+        print("Warning: without --cache there are no validators to send, listing pages are downloaded in full instead of revalidated")
+    scheduler.run()
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,19 +1,32 @@
 import os, sys
 from curl_cffi import requests as creq
-from bs4 import BeautifulSoup, Tag, NavigableString
+from bs4 import BeautifulSoup, Tag
 import re
 from urllib.parse import urljoin, urlparse, parse_qs, parse_qsl, urlunparse
-import logging
 import shutil
+import asyncio
+import argparse
+import hashlib
+import zlib
 # Add parent directory to path to import helpers
 # Add parent directory to path to import helpers
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "issuers"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
 
 from coin_types_db_functions import *
+from frontier_db_functions import *
+from journal_db_functions import *
+from image_queue_db_functions import *
 from issuers_db_functions import *
 from helper_functions import *
 from basic_functions import *
+from rate_limit_functions import configure_rate_limits, format_rate_metrics
+from fetch_config_functions import load_hosts_config
+from download_functions import SingleFlightDownloads
+from prefetch_functions import prefetch_pages, prefetch_pages_async
+from html_parser_functions import make_soup, configure_html_parser, add_html_parser_argument
+from coin_types_pipeline import CoinTypesPipeline
 
 class CoinTypesScraper:
     def __init__(self):
@@ -27,272 +40,114 @@ class CoinTypesScraper:
         self.base_sales_image_url = self.base_url + "sales_archive/pictures/"
         
         self.tid_regex = re.compile(r"[?&]tid=(\d+)\b")   
+        # Folder of html/ (the published coin types) and staging/
+        self.output_dir = os.path.dirname(os.path.abspath(__file__))
+        # Progress log of older versions, only read to seed the frontier (see _migrate_pages_log)
         self.log_file_name = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages.log')
 
         self.db_helper = CoinTypesDbHelper()
+        self.frontier = FrontierDbHelper()
+        self.journal = CoinJournalDbHelper()
         self.issuers_db_helper = IssuersDbHelper()
         self.basic_helper = BasicHelper()
 
-        logging.basicConfig(
-            filename = self.log_file_name,       # Log file name
-            level = logging.INFO,       # Log level
-            format = '%(message)s'  # Log format
-        )
-        
         self.should_cleanup = True
 
-    def _parse_edge(self, out, descriptions_section):
-        h3 = _find_description_h3(descriptions_section, "edge")
-        if not h3:
-            return {}
-
-        found_filename = None
-
-        for sib in _section_siblings(h3):
-            image_url = None
-
-            # Check if sib itself is the <a> tag
-            if sib.name == "a" and sib.has_attr("href") and sib.find("img"):
-                image_url = sib["href"].strip()
-            else:
-                # Fallback to img
-                if sib.name == "img" and sib.has_attr("src"):
-                    image_url = sib["src"].strip()
-
-            if image_url is not None:
-                found_filename = extract_filename_from_url(image_url, strip_original=True)
-                if found_filename:
-                    break                      
-
-        out["edge_image"] = found_filename
-
-    def _parse_example_images(self, out, soup):
-        # Find all example divs
-        examples_div = soup.find("div", id="examples_list")
-        if not examples_div:
-            return
-
-        for example_image_div in examples_div.find_all("div", class_="example_image"):
-            # Each should have 2 links (obverse/reverse)
-            links = [a for a in example_image_div.find_all("a", href=True) if a.find("img")]
-            if len(links) >= 2:
-                # Obverse is usually first, Reverse second
-                obverse_link = links[0]
-                reverse_link = links[1]
-                
-                obverse_url = obverse_link["href"]
-                reverse_url = reverse_link["href"]
-                
-                obverse_image = extract_filename_from_url(obverse_url)
-                reverse_image = extract_filename_from_url(reverse_url)
-
-                out["sample_images"].append({
-                    "obverse_image": obverse_image,
-                    "reverse_image": reverse_image,
-                    "image_type": 2
-                })
-            elif len(links) == 1:
-                # User requested: if only one image, use it for both
-                link = links[0]
-                url = link["href"]
-                image = extract_filename_from_url(url)
-                
-                out["sample_images"].append({
-                    "obverse_image": image,
-                    "reverse_image": image,
-                    "image_type": 2
-                })
-
-    def _parse_sales_images(self, out, soup):
-        sales_table = soup.find("table", id="sales_list")
-        if not sales_table:
-            return
-
-        # Iterate over all rows that look like sales rows
-        for picture_td in sales_table.find_all("td", class_="sale_pictures"):
-            links = [a for a in picture_td.find_all("a", href=True) if a.find("img")]
-            if not links:
-                continue
-
-            obverse_image = None
-            reverse_image = None
-            
-            if len(links) >= 1:
-                link1 = links[0]
-                img1 = extract_filename_from_url(link1["href"])
-                
-                if len(links) >= 2:
-                    link2 = links[1]
-                    img2 = extract_filename_from_url(link2["href"])
-                    
-                    obverse_image = img1
-                    reverse_image = img2
-                else:
-                    obverse_image = img1
-                    reverse_image = img1
-            
-            if obverse_image and reverse_image:
-                out["sample_images"].append({
-                    "obverse_image": obverse_image,
-                    "reverse_image": reverse_image,
-                    "image_type": 3
-                })
-
-    def _parse_comment_images(self, out, soup):
-        comments_div = soup.find("div", id="fiche_comments")
-        if not comments_div:
-            return
-
-        out["comment_images"] = []
-        for a in comments_div.find_all("a", href=True):
-             if not a.find("img"):
-                 continue
-             
-             href = a["href"]
-             image_name = extract_filename_from_url(href)
-             
-             if image_name:
-                 # Determine source type
-                 source_type = 1 # Default: Catalogue
-                 if "/forum/images/" in href:
-                     source_type = 2
-                 
-                 out["comment_images"].append({
-                     "image": image_name,
-                     "source_type": source_type
-                 })
-
-    def _parse_rarity_index(self, out, soup):
-        val = _strong_value_pair(soup, "Numista Rarity index")
-        if val:
-             try:
-                 out["rarity_index"] = int(val)
-             except ValueError:
-                 out["rarity_index"] = None
-
-    def _parse_reference_images(self, out, coin_type_image_links):
-        main_image_entry = {
-            "obverse_image": None,
-            "reverse_image": None,
-            "image_type": 1
-        }
-
-        valid_links = []
-        for a in coin_type_image_links:
-            img = a.find("img")
-            if not img:
-                continue
-
-            src = img.get("src", "")
-            if "no-obverse" in src or "no-reverse" in src:
-                continue
-            valid_links.append(a)
-
-        if len(valid_links) == 2:
-            obverse_a = valid_links[0]
-            reverse_a = valid_links[1]
+        # Listing pages whose links did not change since their coins were last all done are skipped whole
+        self.skip_unchanged_listings = True
+
+        # Listing pages fetched ahead of the one whose coin types are being processed
+        self.listing_prefetch_depth = 1
+
+        # Sales/example pictures are shared between coin types: download each URL once per run
+        self.image_downloads = SingleFlightDownloads()
+
+        # ImageQueueDbHelper when images are left to image_downloader.py (--defer-images)
+        self.image_queue = None
+
+        # Subset of the issuers crawled by this process (see set_shard)
+        self.shard_index = None
+        self.shard_count = None
+        self.shard_issuers = None
+
+    @staticmethod
+    def parse_shard(value):
+        """"i/N" -> (i, N), with 0 <= i < N."""
+        index, _, count = value.partition("/")
+        index, count = int(index), int(count)
+        if not 0 <= index < count:
+            raise ValueError(f"Invalid shard {value}: expected i/N with 0 <= i < N")
+        return index, count
+
+    def set_shard(self, shard=None, issuers=None):
+        """
+        Crawl only part of the issuers, so several processes can split the work: shard (i, N)
+        takes the issuers whose slug hashes to i, issuers is an explicit list of slugs.
+        Each shard has its own checkpoint in the crawl frontier.
+        """
+        if shard is not None:
+            self.shard_index, self.shard_count = shard
+            self.frontier.shard = f"{self.shard_index}/{self.shard_count}"
+        if issuers:
+            self.shard_issuers = set(issuers)
+            self.frontier.shard = "issuers:" + ",".join(sorted(self.shard_issuers))
+
+    def in_shard(self, issuer_url_slug):
+        if self.shard_issuers is not None and issuer_url_slug not in self.shard_issuers:
+            return False
+        if self.shard_count is not None:
+            # crc32 rather than hash(): it has to agree between processes
+            return zlib.crc32(issuer_url_slug.encode("utf-8")) % self.shard_count == self.shard_index
+        return True
 
-            obv_name = extract_filename_from_url(obverse_a["href"], strip_original=True) if obverse_a.has_attr("href") else None
-            rev_name = extract_filename_from_url(reverse_a["href"], strip_original=True) if reverse_a.has_attr("href") else None
-            
-            main_image_entry["obverse_image"] = obv_name
-            main_image_entry["reverse_image"] = rev_name
+    def clean_html(self, html_content, out=None, url_slug=None):
+        """
+        Strip a coin type page down to the catalogue content and point its images at the local copies.
+        html_content is the page text or the soup returned by parse_coin_type_page(), which is then
+        rewritten in place instead of being parsed a second time. Returns the cleaned HTML.
+        """
+        if isinstance(html_content, BeautifulSoup):
+            soup = html_content
         else:
-            for idx, a in enumerate(valid_links):
-                img = a.find("img")
-                # img is guaranteed to exist because of valid_links filter
-
-                # Decide kind
-                kind = None
-                alt_lc = (img.get("alt") or "").lower()
-
-                if alt_lc.endswith("obverse"):
-                    kind = "obverse"
-                elif alt_lc.endswith("reverse"):
-                    kind = "reverse"
-                else:
-                    # fallback by order: 1st -> obverse, 2nd -> reverse
-                    kind = "obverse" if idx == 0 else ("reverse" if idx == 1 else None)
-
-                image_name = extract_filename_from_url(a["href"], strip_original=True) if a.has_attr("href") else None
-
-                # Assign to the right field
-                if kind == "obverse":
-                    main_image_entry["obverse_image"] = image_name
-                elif kind == "reverse":
-                    main_image_entry["reverse_image"] = image_name
-
-        out["sample_images"].append(main_image_entry)       
-
-    def _parse_title(self, out, title_h1):
-        # Special-case <h1> with an inline <span> subtitle
-        if getattr(title_h1, "name", None) == "h1":
-            # subtitle = text inside the first <span> (if any)
-            span = title_h1.find("span")
-            subtitle = self.basic_helper.clean_text(span.get_text(" ", strip=True)) if span else None
-
-            # title = text up to (but not including) that <span>, preserving punctuation/spaces
-            title_chunks = []
-            for child in title_h1.children:
-                if isinstance(child, NavigableString):
-                    title_chunks.append(str(child))
-                elif isinstance(child, Tag):
-                    if child.name == "span":
-                        break  # stop at subtitle
-                    title_chunks.append(child.get_text(" ", strip=True))
-            title = self.basic_helper.clean_text("".join(title_chunks)) if title_chunks else None
-
-            out["title"] = title
-            out["subtitle"] = subtitle
+            soup = make_soup(html_content)
 
-    def clean_html(self, html_content, out=None, url_slug=None):
-        soup = BeautifulSoup(html_content, "html.parser")
+        def point_link_at(link, local_path):
+            img = link.find("img")
+            if img:
+                img["src"] = local_path
+                if "srcset" in img.attrs: del img["srcset"]
+                if "sizes" in img.attrs: del img["sizes"]
+                link["href"] = local_path
 
         # Replace image links if metadata is provided
         if out:
             images_dir = "images" # Relative path
-            
-            # Helper to create matcher for cleaned filenames
-            def create_matcher(img_name):
-                # Match if href contains img_name OR if it contains the original version (stem-original.ext)
-                if not img_name: return lambda h: False
+
+            # Every link is looked up by file name in one index instead of scanning the tree per image
+            links = _links_by_filename(soup)
+
+            def find_link(img_name):
+                # The link points at img_name or at its original version (stem-original.ext)
                 name, ext = os.path.splitext(img_name)
-                # We assume if it was stripped, it was like name-original.ext
-                # But it could also just be name.ext (if no original suffix existed, but we prioritize matching)
-                return lambda h: h and (img_name in h or f"{name}-original{ext}" in h)
+                return _first_link(links, img_name, f"{name}-original{ext}")
 
             # Edge image
             edge_img = out.get("edge_image")
             if edge_img:
                 subfolder = "edge_image"
-                link = soup.find("a", href=create_matcher(edge_img))
+                link = find_link(edge_img)
                 if link:
-                    img = link.find("img")
-                    if img:
-                        local_path = f"{subfolder}/{edge_img}"
-                        img["src"] = local_path
-                        if "srcset" in img.attrs: del img["srcset"]
-                        if "sizes" in img.attrs: del img["sizes"]
-                        link["href"] = local_path
+                    point_link_at(link, f"{subfolder}/{edge_img}")
             
             # Sample images
             if out.get("sample_images"):
                 for entry in out["sample_images"]:
-                    img_type = entry.get("image_type")
-                    
                     for face in ["obverse", "reverse"]:
                         img_name = entry.get(f"{face}_image")
                         if img_name:
-                            matcher = create_matcher(img_name)
-                            link = soup.find("a", href=matcher)
+                            link = find_link(img_name)
                             if link:
-                                img = link.find("img")
-                                if img:
-                                    local_path = f"{images_dir}/{img_name}"
-                                    img["src"] = local_path
-                                    if "srcset" in img.attrs: del img["srcset"]
-                                    if "sizes" in img.attrs: del img["sizes"]
-                                    link["href"] = local_path
+                                point_link_at(link, f"{images_dir}/{img_name}")
 
         # Clear <head> content as requested
         if soup.head:
@@ -349,28 +204,36 @@ class CoinTypesScraper:
              comments_div = soup.find("div", id="fiche_comments")
              if comments_div:
                  comment_images_dir = "comment_images"
+                 comment_links = _links_by_filename(comments_div)
                  # img_entry is now a dict {"image": "...", "source_type": X}
                  for img_entry in out["comment_images"]:
                      img_name = img_entry["image"]
-                     # Match potential links
-                     link = comments_div.find("a", href=lambda h: h and img_name in h)
+                     link = _first_link(comment_links, img_name)
                      if link:
-                         img = link.find("img")
-                         if img:
-                             local_path = f"{comment_images_dir}/{img_name}"
-                             img["src"] = local_path
-                             if "srcset" in img.attrs: del img["srcset"]
-                             if "sizes" in img.attrs: del img["sizes"]
-                             link["href"] = local_path
+                         point_link_at(link, f"{comment_images_dir}/{img_name}")
 
         return str(soup)
 
     def _download_image(self, url, save_path):
-        content = self.basic_helper.fetch(url, is_image=True)
-        with open(save_path, "wb") as f:
-            f.write(content)
-
-    def download_coin_type_images(self, out, url_slug, coin_type_dir):
+        try:
+            self.image_downloads.download(url, save_path, self.basic_helper.download_file)
+        except OfflineCacheMiss:
+            # Offline replay only has pages; the image is fetched on the next online run
+            print(f"Offline: skipping image {url}")
+
+    async def _download_image_async(self, url, save_path, image_semaphore):
+        # Tasks waiting on another task's download of the same URL must not hold a semaphore slot
+        async def download(url, save_path):
+            async with image_semaphore:
+                return await self.basic_helper.download_file_async(url, save_path)
+
+        try:
+            await self.image_downloads.download_async(url, save_path, download)
+        except OfflineCacheMiss:
+            print(f"Offline: skipping image {url}")
+
+    def _image_jobs(self, out, url_slug, coin_type_dir):
+        """Yield (image_url, save_path, kind) for every image of a parsed coin type, creating the target folders."""
         # Edge image
         edge_img = out.get("edge_image")
         if edge_img:
@@ -383,7 +246,7 @@ class CoinTypesScraper:
             image_url = f"{self.base_refernce_image_url}{url_slug}/{name}-original{ext}"
             
             save_path = os.path.join(target_dir, edge_img)
-            self._download_image(image_url, save_path)
+            yield image_url, save_path, "edge"
 
         # Sample images
         if out.get("sample_images"):
@@ -408,7 +271,7 @@ class CoinTypesScraper:
                              image_url = f"{self.base_sales_image_url}{img_name}"
                         
                         save_path = os.path.join(images_dir, img_name)
-                        self._download_image(image_url, save_path)
+                        yield image_url, save_path, "sample"
         
         # Comment images
         if out.get("comment_images"):
@@ -429,27 +292,55 @@ class CoinTypesScraper:
                      image_url = f"{self.base_url}catalogue/images/{img_name}"
                      
                  save_path = os.path.join(comment_images_dir, img_name)
-                 self._download_image(image_url, save_path)
+                 yield image_url, save_path, "comment"
 
-    def parse_coin_type_page(self, out, coin_type_page):
-        soup = BeautifulSoup(coin_type_page, "html.parser")
+    def _queue_images(self, out, url_slug, coin_type_dir, skip_existing):
+        self.image_queue.enqueue_many(
+            (image_url, save_path, out["id"], kind)
+            for image_url, save_path, kind in self._image_jobs(out, url_slug, coin_type_dir)
+            if not (skip_existing and os.path.exists(save_path))
+        )
 
-        # Title and subtitle
-        self._parse_title(out, soup.select_one("#main_title h1"))
+    def download_coin_type_images(self, out, url_slug, coin_type_dir, skip_existing=False):
+        """Download the images of a coin type into coin_type_dir, or queue them with --defer-images."""
+        if self.image_queue is not None:
+            self._queue_images(out, url_slug, coin_type_dir, skip_existing)
+            return
+        for image_url, save_path, _ in self._image_jobs(out, url_slug, coin_type_dir):
+            if skip_existing and os.path.exists(save_path):
+                continue
+            self._download_image(image_url, save_path)
 
-        self._parse_reference_images(out, soup.select("#fiche_photo a.coin_pic"))
+    async def download_coin_type_images_async(self, out, url_slug, coin_type_dir, image_semaphore, skip_existing=False):
+        if self.image_queue is not None:
+            self._queue_images(out, url_slug, coin_type_dir, skip_existing)
+            return
+        async with asyncio.TaskGroup() as tg:
+            for image_url, save_path, _ in self._image_jobs(out, url_slug, coin_type_dir):
+                if skip_existing and os.path.exists(save_path):
+                    continue
+                tg.create_task(self._download_image_async(image_url, save_path, image_semaphore))
+
+    def parse_coin_type_page(self, out, coin_type_page):
+        """Fill out from a coin type page. Returns the parsed soup, untouched, for clean_html()."""
+        soup = make_soup(coin_type_page)
+        fields = COIN_TYPE_PAGE_FIELDS.extract(soup)
 
-        descriptions_section = soup.find("section", id="fiche_descriptions")
-        self._parse_edge(out, descriptions_section)
+        # Title and subtitle
+        if fields["title"]:
+            out["title"], out["subtitle"] = fields["title"]
 
-        self._parse_example_images(out, soup)
+        out["sample_images"].append(fields["reference_images"] or _reference_image_entry(None))
+        out["sample_images"].extend(fields["example_images"] or [])
+        out["sample_images"].extend(fields["sales_images"] or [])
 
-        self._parse_sales_images(out, soup)
+        out["edge_image"] = fields["edge_image"]
+        if fields["comment_images"] is not None:
+            out["comment_images"] = fields["comment_images"]
+        out["rarity_index"] = fields["rarity_index"]
 
-        self._parse_comment_images(out, soup)
+        return soup
 
-        self._parse_rarity_index(out, soup)
-  
     def parse_country_page(self, country_page_soup):
         root = country_page_soup.select_one("div.catalogue_search_results")
         if not root:
@@ -487,6 +378,27 @@ class CoinTypesScraper:
                     current["links"].append(a)
         return periods
 
+    @staticmethod
+    def listing_fingerprint(periods):
+        """sha256 over the (period, coin link) list extracted from a listing page."""
+        h = hashlib.sha256()
+        for period in periods:
+            for coin_type_link in period["links"]:
+                h.update(f"{period['period_text']}\t{coin_type_link['href']}\t{coin_type_link.get_text(' ', strip=True)}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    def listing_unchanged(self, issuer_url_slug, page, fingerprint):
+        if not self.skip_unchanged_listings or self.frontier.get_listing_fingerprint(issuer_url_slug, page) != fingerprint:
+            return False
+        print(f"Listing {issuer_url_slug} page {page} unchanged since its last complete crawl, skipping its coins")
+        return True
+
+    def check_listing(self, issuer_url_slug, page, periods):
+        """Fingerprint a parsed listing page and record the check. Returns (fingerprint, unchanged)."""
+        fingerprint = CoinTypesScraper.listing_fingerprint(periods)
+        self.frontier.record_listing_check(issuer_url_slug, page, fingerprint, sum(len(period["links"]) for period in periods))
+        return fingerprint, self.listing_unchanged(issuer_url_slug, page, fingerprint)
+
     def _get_next_page_number(self, soup):
         # <a rel="next" href="index.php?e=...&p=2">Next</a>
         next_a = soup.find("a", rel="next")
@@ -507,18 +419,20 @@ class CoinTypesScraper:
         link_text = coin_type_link.get_text(separator=" ", strip=True)
         file_name_prefix = self.basic_helper.slugify(link_text)
         
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        html_dir = os.path.join(script_dir, "html", issuer_record['numista_url_slug'])
+        html_dir = os.path.join(self.output_dir, "html", issuer_record['numista_url_slug'])
         coin_type_dir = os.path.join(html_dir, f"{file_name_prefix}_{id}")
         return file_name_prefix, coin_type_dir
 
+    def _image_present(self, path):
+        # A queued image counts: the downloader will fill it in
+        return os.path.exists(path) or (self.image_queue is not None and self.image_queue.is_queued(path))
+
     def check_if_exists(self, issuer_url_slug, coin_type_db_info):
         if not coin_type_db_info:
             return False
 
         # Reconstruct directory path using DB info
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        html_dir = os.path.join(script_dir, "html", issuer_url_slug)
+        html_dir = os.path.join(self.output_dir, "html", issuer_url_slug)
         coin_type_dir = os.path.join(html_dir, f"{coin_type_db_info['coin_type_slug']}_{coin_type_db_info["id"]}")
         file_name_prefix = coin_type_db_info['coin_type_slug']
 
@@ -535,7 +449,7 @@ class CoinTypesScraper:
             if stored_samples:
                 for sample_name in stored_samples:
                     img_path = os.path.join(images_dir, sample_name)
-                    if not os.path.exists(img_path):
+                    if not self._image_present(img_path):
                         samples_exist = False
                         break
 
@@ -544,7 +458,7 @@ class CoinTypesScraper:
             edge_image_exist = True
             if edge_image:
                 edge_img_path = os.path.join(coin_type_dir, "edge_image", edge_image)
-                if not os.path.exists(edge_img_path):
+                if not self._image_present(edge_img_path):
                     edge_image_exist = False
 
             # Check comment images
@@ -556,7 +470,7 @@ class CoinTypesScraper:
                     # img_entry is a dict from db helper now
                     img_name = img_entry["image"]
                     img_path = os.path.join(comment_images_dir, img_name)
-                    if not os.path.exists(img_path):
+                    if not self._image_present(img_path):
                         comment_images_exist = False
                         break
             
@@ -569,167 +483,539 @@ class CoinTypesScraper:
         return False
 
     def log_processed_page(self, issuer_slug, page):
-        with open(self.log_file_name, "a", encoding="utf-8") as f:
-            f.write(f"{issuer_slug},{page or 1}\n")
-
-    def cleanup_last_run(self):
-         print("Checking for last inserted coin type to cleanup...")
-         last_coin = self.db_helper.get_last_inserted_coin_type_with_issuer()
-         if last_coin:
-             id = last_coin["id"]
-             slug = last_coin["coin_type_slug"]
-             i_slug = last_coin["issuer_url_slug"]
-             
-             print(f"Found last inserted coin: {slug}_{id} (Issuer: {i_slug})")
-             
-             # Construct folder path
-             script_dir = os.path.dirname(os.path.abspath(__file__))
-             html_dir = os.path.join(script_dir, "html", i_slug)
-             coin_type_dir = os.path.join(html_dir, f"{slug}_{id}")
-             
-             if os.path.exists(coin_type_dir):
-                 try:
-                     shutil.rmtree(coin_type_dir)
-                     print(f"Deleted folder: {coin_type_dir}")
-                 except Exception as e:
-                     print(f"Error deleting folder {coin_type_dir}: {e}")
-             else:
-                 print(f"Folder not found: {coin_type_dir}")
-                 
-             # Delete from DB
-             self.db_helper.delete_coin_type(id)
-             print(f"Deleted coin type {id} from database.")
-         else:
-             print("No last inserted coin type found.")
+        self.frontier.start_page(issuer_slug, page or 1)
+
+    def _migrate_pages_log(self):
+        """Seed an empty frontier with the last entry of the pages.log written by older versions."""
+        if not os.path.exists(self.log_file_name):
+            return None, None
+        issuer_url_slug, page = _read_last_log_entry(self.log_file_name)
+        if issuer_url_slug:
+            print(f"Resuming from pages.log: {issuer_url_slug} page {page}")
+            self.frontier.start_page(issuer_url_slug, page)
+        return issuer_url_slug, page
+
+    def cleanup_interrupted_coins(self):
+        """Finish the coin types a crashed run left claimed, from the step the journal says they reached."""
+        for issuer_url_slug, page, id in self.frontier.release_interrupted_coins():
+            self.resume_coin_type(id)
+
+    def _listing_url(self, issuer_url_slug, page):
+        url = urljoin(self.base_url, f"/catalogue/index.php?e={issuer_url_slug}&r=&st=1&cat=y&im1=&im2=&ru=&ie=&ca=3&no=&v=&a=&dg=&i=&b=&m=&f=&t=&t2=&w=&mt=&u=&g=&q=200")
+        url += f"&p={page}"
+        return url
+
+    def _fetch_listing(self, issuer_url_slug, page):
+        country_page_text, _ = self.basic_helper.fetch_revalidated(self._listing_url(issuer_url_slug, page))
+        return make_soup(country_page_text)
+
+    def iter_listing_pages(self, issuer_url_slug, page):
+        """Yield (page, soup) for the listing of an issuer from page on, fetching listing_prefetch_depth pages ahead."""
+        return prefetch_pages(
+            page, lambda p: self._fetch_listing(issuer_url_slug, p),
+            lambda p, soup: self._get_next_page_number(soup), self.listing_prefetch_depth
+        )
 
-    def process(self, issuer_url_slug=None, page=None, coin_type_id=None):
+    def iter_listing_pages_async(self, issuer_url_slug, page, html_semaphore):
+        async def fetch_listing(p):
+            async with html_semaphore:
+                country_page_text, _ = await self.basic_helper.fetch_revalidated_async(self._listing_url(issuer_url_slug, p))
+            return make_soup(country_page_text)
+
+        return prefetch_pages_async(page, fetch_listing, lambda p, soup: self._get_next_page_number(soup), self.listing_prefetch_depth)
+
+    def _resolve_start(self, issuer_url_slug, page, coin_type_id):
         is_restart = issuer_url_slug is None and page is None and coin_type_id is None
         
-        if is_restart:
-            issuer_url_slug, page = _read_last_log_entry(self.log_file_name)
-
-        if is_restart and self.should_cleanup:
-            self.cleanup_last_run()
+        if is_restart and self.frontier.is_empty():
+            # First run on the frontier: only pages.log knows where the last crawl stopped.
+            # It covers all issuers, so a new shard simply starts from its first issuer.
+            if not self.frontier.shard:
+                issuer_url_slug, page = self._migrate_pages_log()
+        elif is_restart:
+            issuer_url_slug, page = self.frontier.get_resume_point()
+            if self.should_cleanup:
+                self.cleanup_interrupted_coins()
+        elif coin_type_id is None:
+            # An explicit start point begins a new crawl
+            self.frontier.reset()
 
         page = 1 if page is None else page
-        
+        return issuer_url_slug, page
+
+    def _iter_issuers(self, issuer_url_slug, page):
+        """Yield (issuer_record, start_page), skipping issuers before issuer_url_slug when resuming."""
         # If we have a target issuer (resume), we skip until we find it
         seeking_resume = issuer_url_slug is not None
 
-        issuer_records = self.issuers_db_helper.get_issuers()
-
-        for issuer_record in issuer_records:
+        for issuer_record in self.issuers_db_helper.get_issuers():
+            if not self.in_shard(issuer_record["numista_url_slug"]):
+                continue
             if seeking_resume:
                 if issuer_record["numista_url_slug"] != issuer_url_slug:
                     continue
                 # Found the resume point. 
                 # Stop seeking so subsequent issuers are processed normally.
                 seeking_resume = False
+                yield issuer_record, page
             else:
                 # Normal processing starts at page 1 for new issuers
-                page = 1
+                yield issuer_record, 1
+
+    def _new_out(self, id, issuer_record, period, file_name_prefix):
+        return {
+            "id": id,
+            "issuer_id": issuer_record["id"],
+            "title": None,
+            "subtitle": None,
+            "edge_image": None,
+            "period": period["period_text"],
+            "file_name_prefix": file_name_prefix,
+            "sample_images": [],
+            "comment_images": [],
+            "rarity_index": None,
+        }
 
-            while True:
-                url = urljoin(self.base_url, f"/catalogue/index.php?e={issuer_record['numista_url_slug']}&r=&st=1&cat=y&im1=&im2=&ru=&ie=&ca=3&no=&v=&a=&dg=&i=&b=&m=&f=&t=&t2=&w=&mt=&u=&g=&q=200")
-                url += f"&p={page}"
+    def store_coin_type(self, out, coin_type_page, coin_type_db_info, issuer_url_slug, coin_type_dir):
+        """Parse a fetched coin type page into out, save it to the DB and write the cleaned HTML."""
+        soup = self.parse_coin_type_page(out, coin_type_page)
 
-                print(f"Processing {issuer_record['numista_url_slug']} page {page}...")
-                
-                # Log progress immediately at start
-                self.log_processed_page(issuer_record["numista_url_slug"], page)
-                
-                country_page_text = self.basic_helper.fetch(url)
-                country_page_soup = BeautifulSoup(country_page_text, "html.parser")
-                
-                periods = self.parse_country_page(country_page_soup)
+        if not coin_type_db_info:
+            # Save coin type fully
+            self.db_helper.save_coin_type_full(out)
+
+        # Create dir if not exists (it shouldn't, unless created partially during this run? No, we checked exists above)
+        os.makedirs(coin_type_dir, exist_ok=True)
+
+        cleaned_page = self.clean_html(soup, out, issuer_url_slug)
+
+        file_path = os.path.join(coin_type_dir, "coin_type.html")
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(cleaned_page)
+
+    def restore_unchanged_coin_type(self, id, coin_type_page, issuer_url_slug, coin_type_dir):
+        """
+        Repair a stored coin type whose page revalidated as unchanged (304).
+        The parsed data is rebuilt from the DB instead of parsing the page and nothing is written
+        to the DB; only a missing coin_type.html is regenerated. Returns the rebuilt out dict
+        (the caller downloads the missing images), or None if the DB row is gone.
+        """
+        out = self.db_helper.get_coin_type_out(id)
+        if not out:
+            return None
+
+        os.makedirs(coin_type_dir, exist_ok=True)
+
+        file_path = os.path.join(coin_type_dir, "coin_type.html")
+        if not os.path.exists(file_path):
+            cleaned_page = self.clean_html(coin_type_page, out, issuer_url_slug)
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(cleaned_page)
+
+        return out
+
+    def _staging_dir(self, issuer_url_slug, coin_type_dir):
+        # Outside html/ so nothing reading the published folders sees half-written ones
+        return os.path.join(self.output_dir, "staging", issuer_url_slug, os.path.basename(coin_type_dir))
+
+    def stage_coin_type(self, out, cleaned_page, issuer_url_slug, coin_type_dir, replace=False, db_helper=None):
+        """
+        First half of storing a parsed new coin type (or the replacement of a stored one):
+        save it to the DB and write coin_type.html into a staging folder, recording each step
+        in the journal. Returns the staging folder, where its images go next.
+        """
+        db_helper = db_helper or self.db_helper
+        staging_dir = self._staging_dir(issuer_url_slug, coin_type_dir)
+        if os.path.exists(staging_dir):
+            shutil.rmtree(staging_dir)
+        os.makedirs(staging_dir)
+        self.journal.begin(out["id"], issuer_url_slug, coin_type_dir, staging_dir)
+
+        if replace:
+            print(f"Replacing stored coin type {out['id']}...")
+            db_helper.delete_coin_type(out["id"])
+        db_helper.save_coin_type_full(out)
+
+        with open(os.path.join(staging_dir, "coin_type.html"), "w", encoding="utf-8") as f:
+            f.write(cleaned_page)
+        self.journal.advance(out["id"], CoinJournalDbHelper.HTML_WRITTEN)
+        return staging_dir
+
+    def publish_coin_type(self, id, staging_dir, coin_type_dir):
+        """
+        Second half, once the images are in the staging folder: rename it into place (the old
+        folder of a replaced coin type is moved aside first) and commit the journal entry.
+        Safe to repeat after a crash at any point.
+        """
+        self.journal.advance(id, CoinJournalDbHelper.IMAGES_DONE)
+
+        old_dir = staging_dir + ".old"
+        if os.path.exists(staging_dir):
+            if os.path.exists(coin_type_dir):
+                if os.path.exists(old_dir):
+                    shutil.rmtree(old_dir)
+                os.rename(coin_type_dir, old_dir)
+            os.makedirs(os.path.dirname(coin_type_dir), exist_ok=True)
+            os.rename(staging_dir, coin_type_dir)
+            self.image_downloads.moved(staging_dir, coin_type_dir)
+        if os.path.exists(old_dir):
+            shutil.rmtree(old_dir)
+
+        self.journal.advance(id, CoinJournalDbHelper.COMMITTED)
+
+    def finish_coin_type(self, out, url_slug, staging_dir, coin_type_dir, skip_existing=False):
+        """Download the images of a staged coin type and publish it (with --defer-images: publish, then queue them)."""
+        if self.image_queue is not None:
+            self.publish_coin_type(out["id"], staging_dir, coin_type_dir)
+            self._queue_images(out, url_slug, coin_type_dir, skip_existing)
+            return
+        self.download_coin_type_images(out, url_slug, staging_dir, skip_existing=skip_existing)
+        self.publish_coin_type(out["id"], staging_dir, coin_type_dir)
+
+    async def finish_coin_type_async(self, out, url_slug, staging_dir, coin_type_dir, image_semaphore, skip_existing=False):
+        if self.image_queue is not None:
+            self.finish_coin_type(out, url_slug, staging_dir, coin_type_dir, skip_existing=skip_existing)
+            return
+        await self.download_coin_type_images_async(out, url_slug, staging_dir, image_semaphore, skip_existing=skip_existing)
+        self.publish_coin_type(out["id"], staging_dir, coin_type_dir)
+
+    def resume_coin_type(self, id):
+        """
+        Finish a coin type left unfinished in the journal by a crashed run: images_done only needs
+        publishing, html_written its images (from the DB, without refetching the page). A coin type
+        that did not get that far is removed from the DB and fetched again like a new one.
+        """
+        unfinished = self._resume_from_journal(id)
+        if unfinished is not None:
+            out, entry = unfinished
+            self.finish_coin_type(out, entry["issuer_url_slug"], entry["staging_dir"], entry["coin_type_dir"], skip_existing=True)
+
+    async def resume_coin_type_async(self, id, image_semaphore):
+        """resume_coin_type() for the asyncio crawler: the images of an html_written coin type are downloaded on the event loop."""
+        unfinished = self._resume_from_journal(id)
+        if unfinished is not None:
+            out, entry = unfinished
+            await self.finish_coin_type_async(out, entry["issuer_url_slug"], entry["staging_dir"], entry["coin_type_dir"], image_semaphore, skip_existing=True)
+
+    def _resume_from_journal(self, id):
+        """
+        The steps of resume_coin_type() that need no download. Returns (out, journal entry) of an
+        html_written coin type whose images are still to be downloaded and published, else None.
+        """
+        entry = self.journal.get_unfinished(id)
+        if entry is None:
+            return None
 
-                for period in periods:
-                    for coin_type_link in period["links"]:
-                        coin_type_url = coin_type_link["href"]
+        state = entry["state"]
+        staging_dir = entry["staging_dir"]
+        coin_type_dir = entry["coin_type_dir"]
 
-                        id = self.basic_helper.id_from_url_path(coin_type_url)
-                        if coin_type_id is not None and id != coin_type_id:
-                            continue
+        if state == CoinJournalDbHelper.HTML_WRITTEN:
+            out = self.db_helper.get_coin_type_out(id)
+            if out and os.path.exists(os.path.join(staging_dir, "coin_type.html")):
+                print(f"Resuming coin type {id}: downloading its images")
+                return out, entry
 
-                        # Check if we should force reprocess this specific coin
-                        force_reprocess = coin_type_id is not None and id == coin_type_id
-                        
-                        coin_type_db_info = self.db_helper.get_coin_type_full_info(id)
-
-                        if force_reprocess:
-                             print(f"Force reprocessing coin type {id}, deleting existing data...")
-                             
-                             # Delete DB record
-                             self.db_helper.delete_coin_type(id)
-                             
-                             # Calculate folder path to delete it
-                             # We need to calculate dir path now to delete it. The existing code calculates it later.
-                             # We can call get_coin_type_dir now.
-                             _, temp_coin_type_dir = self.get_coin_type_dir(coin_type_link, issuer_record, id)
-                             if os.path.exists(temp_coin_type_dir):
-                                 shutil.rmtree(temp_coin_type_dir)
-                                 print(f"Deleted folder {temp_coin_type_dir}")
-                             
-                             # Force info to None so check_if_exists returns False (or just skip check)
-                             coin_type_db_info = None
-
-                        if self.check_if_exists(issuer_record["numista_url_slug"], coin_type_db_info):
-                            continue
-
-                        # Need file_name_prefix for out dict
-                        file_name_prefix, coin_type_dir = self.get_coin_type_dir(coin_type_link, issuer_record, id)
-
-                        coin_type_page = self.basic_helper.fetch(urljoin(self.base_url, coin_type_url))
-
-                        if id is None:
-                            raise ValueError(f"Cannot extract coin type ID from URL: {coin_type_url}")
-
-                        out = {
-                            "id": id,
-                            "issuer_id": issuer_record["id"],
-                            "title": None,
-                            "subtitle": None,
-                            "edge_image": None,
-                            "period": period["period_text"],
-                            "file_name_prefix": file_name_prefix,
-                            "sample_images": [],
-                            "comment_images": [],
-                            "rarity_index": None,
-                        } 
-                        
-                        self.parse_coin_type_page(out, coin_type_page)
+        if state == CoinJournalDbHelper.IMAGES_DONE and (os.path.exists(staging_dir) or os.path.exists(coin_type_dir)):
+            print(f"Resuming coin type {id}: publishing {coin_type_dir}")
+            self.publish_coin_type(id, staging_dir, coin_type_dir)
+            return None
 
-                        if not coin_type_db_info:
-                            # Save coin type fully
-                            self.db_helper.save_coin_type_full(out)
+        print(f"Discarding unfinished coin type {id}, it will be fetched again")
+        self.db_helper.delete_coin_type(id)
+        if os.path.exists(staging_dir):
+            shutil.rmtree(staging_dir)
+        self.journal.discard(id)
+        return None
 
-                        # Create dir if not exists (it shouldn't, unless created partially during this run? No, we checked exists above)
-                        os.makedirs(coin_type_dir, exist_ok=True)
+    def _process_coin_type(self, id, coin_type_link, period, issuer_record, force_reprocess=False):
+        """Fetch, store and download one coin type of a listing page (or repair / skip it if already stored)."""
+        # A coin type claimed again after a crash (e.g. through a reclaimed lease)
+        self.resume_coin_type(id)
 
-                        cleaned_page = self.clean_html(coin_type_page, out, issuer_record['numista_url_slug'])
+        coin_type_url = coin_type_link["href"]
+        coin_type_db_info = self.db_helper.get_coin_type_full_info(id)
 
-                        file_path = os.path.join(coin_type_dir, "coin_type.html")
-                        with open(file_path, "w", encoding="utf-8") as f:
-                            f.write(cleaned_page)
+        if force_reprocess:
+             print(f"Force reprocessing coin type {id}...")
+             # The stored data is replaced once the new page has been parsed (see stage_coin_type)
+             coin_type_db_info = None
 
-                        self.download_coin_type_images(out, issuer_record['numista_url_slug'], coin_type_dir)
+        if self.check_if_exists(issuer_record["numista_url_slug"], coin_type_db_info):
+            return
 
-                        if coin_type_id is not None and id == coin_type_id:
-                             print(f"Finished processing targeted coin type {id}. Exiting.")
-                             return
-                
-                # Pagination
-                next_page = self._get_next_page_number(country_page_soup)
-                if next_page:
-                    page = next_page
-                else:
-                    break
+        # Need file_name_prefix for out dict
+        file_name_prefix, coin_type_dir = self.get_coin_type_dir(coin_type_link, issuer_record, id)
+
+        if coin_type_db_info:
+            # Stored but incomplete: revalidate, an unchanged page needs no parsing or DB writes
+            coin_type_page, not_modified = self.basic_helper.fetch_revalidated(urljoin(self.base_url, coin_type_url))
+            if not_modified:
+                out = self.restore_unchanged_coin_type(id, coin_type_page, issuer_record['numista_url_slug'], coin_type_dir)
+                if out:
+                    self.download_coin_type_images(out, issuer_record['numista_url_slug'], coin_type_dir, skip_existing=True)
+                    return
+        else:
+            coin_type_page = self.basic_helper.fetch(urljoin(self.base_url, coin_type_url))
+
+        out = self._new_out(id, issuer_record, period, file_name_prefix)
+
+        if coin_type_db_info:
+            # Repaired in place: only missing files are added
+            self.store_coin_type(out, coin_type_page, coin_type_db_info, issuer_record['numista_url_slug'], coin_type_dir)
+            self.download_coin_type_images(out, issuer_record['numista_url_slug'], coin_type_dir)
+            return
+
+        soup = self.parse_coin_type_page(out, coin_type_page)
+        cleaned_page = self.clean_html(soup, out, issuer_record['numista_url_slug'])
+        staging_dir = self.stage_coin_type(out, cleaned_page, issuer_record['numista_url_slug'], coin_type_dir, replace=force_reprocess)
+        self.finish_coin_type(out, issuer_record['numista_url_slug'], staging_dir, coin_type_dir)
+
+    def process(self, issuer_url_slug=None, page=None, coin_type_id=None):
+        issuer_url_slug, page = self._resolve_start(issuer_url_slug, page, coin_type_id)
+
+        for issuer_record, page in self._iter_issuers(issuer_url_slug, page):
+            for page, country_page_soup in self.iter_listing_pages(issuer_record['numista_url_slug'], page):
+                if coin_type_id is None:
+                    self.process_listing_page(issuer_record, page, country_page_soup)
+                elif self._process_targeted_coin_type(issuer_record, page, country_page_soup, coin_type_id):
+                    print(f"Finished processing targeted coin type {coin_type_id}. Exiting.")
+                    return
+
+    def process_listing_page(self, issuer_record, page, country_page_soup):
+        """Process the coin types of one fetched listing page, claiming them in the crawl frontier. Returns how many were processed."""
+        print(f"Processing {issuer_record['numista_url_slug']} page {page}... [{format_rate_metrics()}]")
+
+        # Record progress immediately at start
+        self.log_processed_page(issuer_record["numista_url_slug"], page)
+
+        periods = self.parse_country_page(country_page_soup)
+        fingerprint, unchanged = self.check_listing(issuer_record["numista_url_slug"], page, periods)
+
+        if unchanged:
+            periods = []
+
+        processed = 0
+        for period in periods:
+            for coin_type_link in period["links"]:
+                coin_type_url = coin_type_link["href"]
+
+                id = self.basic_helper.id_from_url_path(coin_type_url)
+                if id is None:
+                    raise ValueError(f"Cannot extract coin type ID from URL: {coin_type_url}")
+
+                # Coins finished before a crash are skipped without touching the DB or the disk
+                if not self.frontier.claim_coin(issuer_record["numista_url_slug"], page, id):
+                    continue
+
+                try:
+                    self._process_coin_type(id, coin_type_link, period, issuer_record)
+                except Exception as e:
+                    self.frontier.fail_coin(issuer_record["numista_url_slug"], page, id, e)
+                    raise
+                self.frontier.complete_coin(issuer_record["numista_url_slug"], page, id)
+                processed += 1
+
+        self.frontier.complete_page(issuer_record["numista_url_slug"], page, fingerprint)
+        return processed
+
+    def _process_targeted_coin_type(self, issuer_record, page, country_page_soup, coin_type_id):
+        """Reprocess coin_type_id if it is on this listing page (a targeted run leaves the frontier alone)."""
+        print(f"Processing {issuer_record['numista_url_slug']} page {page}... [{format_rate_metrics()}]")
+
+        for period in self.parse_country_page(country_page_soup):
+            for coin_type_link in period["links"]:
+                if self.basic_helper.id_from_url_path(coin_type_link["href"]) == coin_type_id:
+                    self._process_coin_type(coin_type_id, coin_type_link, period, issuer_record, force_reprocess=True)
+                    return True
+        return False
+
+    def process_coin_type_ids(self, coin_type_ids, fetch_workers=4, parse_workers=2, image_workers=4):
+        """
+        Reprocess the given coin types without walking the listing pages: issuer, slug and period
+        come from coin_types and each page is fetched directly from /catalogue/pieces{id}.html,
+        so a repair batch costs about one page request per coin (plus its images).
+        The coins go through CoinTypesPipeline concurrently; the old DB row and folder are only
+        replaced once the new page has been fetched and parsed. IDs not in the DB are skipped.
+        """
+        for id in coin_type_ids:
+            self.resume_coin_type(id)
+        targets = self.db_helper.get_coin_type_targets(coin_type_ids)
+
+        jobs = []
+        for id in coin_type_ids:
+            target = targets.get(id)
+            if not target:
+                print(f"Coin type {id} is not in the database, skipping (process() picks up new coin types)")
+                continue
+
+            issuer_record = target["issuer_record"]
+            file_name_prefix = target["coin_type_slug"]
+            coin_type_dir = os.path.join(self.output_dir, "html", issuer_record["numista_url_slug"], f"{file_name_prefix}_{id}")
+
+            jobs.append(CoinTypesPipeline.make_job(
+                id, urljoin(self.base_url, f"/catalogue/pieces{id}.html"), issuer_record, {"period_text": target["period"]},
+                None, file_name_prefix, coin_type_dir, replace=True
+            ))
+
+        print(f"Reprocessing {len(jobs)} coin types...")
+        CoinTypesPipeline(self, fetch_workers, parse_workers, image_workers).run_jobs(jobs)
+
+    def process_pipeline(self, issuer_url_slug=None, page=None, fetch_workers=4, parse_workers=2, image_workers=4, queue_size=16):
+        """
+        Threaded variant of process(): listing, page fetch, parse, DB writes and image downloads run
+        as separate stages joined by bounded queues (see CoinTypesPipeline).
+        """
+        issuer_url_slug, page = self._resolve_start(issuer_url_slug, page, None)
+
+        CoinTypesPipeline(self, fetch_workers, parse_workers, image_workers, queue_size).run(issuer_url_slug, page)
+
+    def process_async(self, issuer_url_slug=None, page=None, html_concurrency=4, image_concurrency=8, max_rps=5):
+        """
+        Asyncio variant of process(). The coin types of a listing page are crawled concurrently,
+        with separate concurrency limits for HTML pages and images and a global requests-per-second cap.
+
+        Resume semantics are the same as process(): pages and coins are claimed in the crawl frontier,
+        so after a crash the unfinished page is replayed, its done coins are skipped and the coins that
+        were in flight are cleaned up and fetched again.
+        """
+        issuer_url_slug, page = self._resolve_start(issuer_url_slug, page, None)
+
+        asyncio.run(self._process_async(issuer_url_slug, page, html_concurrency, image_concurrency, max_rps))
+
+    async def _process_async(self, issuer_url_slug, page, html_concurrency, image_concurrency, max_rps):
+        html_semaphore = asyncio.Semaphore(html_concurrency)
+        image_semaphore = asyncio.Semaphore(image_concurrency)
+
+        # The per-host adaptive limiters never go above the requested global cap
+        configure_rate_limits(max_rate=max_rps)
+        self.basic_helper.open_async_session(max_clients=html_concurrency + image_concurrency)
+
+        try:
+            for issuer_record, page in self._iter_issuers(issuer_url_slug, page):
+                async for page, country_page_soup in self.iter_listing_pages_async(issuer_record['numista_url_slug'], page, html_semaphore):
+                    print(f"Processing {issuer_record['numista_url_slug']} page {page}... [{format_rate_metrics()}]")
+
+                    # Log progress immediately at start
+                    self.log_processed_page(issuer_record["numista_url_slug"], page)
+
+                    periods = self.parse_country_page(country_page_soup)
+                    fingerprint, unchanged = self.check_listing(issuer_record["numista_url_slug"], page, periods)
+
+                    if unchanged:
+                        periods = []
+
+                    # Page is done only when every coin on it is
+                    async with asyncio.TaskGroup() as tg:
+                        for period in periods:
+                            for coin_type_link in period["links"]:
+                                tg.create_task(self._process_coin_type_async(coin_type_link, period, issuer_record, page, html_semaphore, image_semaphore))
+
+                    self.frontier.complete_page(issuer_record["numista_url_slug"], page, fingerprint)
+        finally:
+            await self.basic_helper.close_async_session()
+
+    async def _process_coin_type_async(self, coin_type_link, period, issuer_record, page, html_semaphore, image_semaphore):
+        coin_type_url = coin_type_link["href"]
+
+        id = self.basic_helper.id_from_url_path(coin_type_url)
+        if id is None:
+            raise ValueError(f"Cannot extract coin type ID from URL: {coin_type_url}")
+
+        if not self.frontier.claim_coin(issuer_record["numista_url_slug"], page, id):
+            return
+
+        try:
+            await self._store_coin_type_async(id, coin_type_link, period, issuer_record, html_semaphore, image_semaphore)
+        except Exception as e:
+            self.frontier.fail_coin(issuer_record["numista_url_slug"], page, id, e)
+            raise
+        self.frontier.complete_coin(issuer_record["numista_url_slug"], page, id)
+
+    async def _store_coin_type_async(self, id, coin_type_link, period, issuer_record, html_semaphore, image_semaphore):
+        # A coin type claimed again after a crash, as in _process_coin_type()
+        await self.resume_coin_type_async(id, image_semaphore)
+
+        coin_type_url = coin_type_link["href"]
+        coin_type_db_info = self.db_helper.get_coin_type_full_info(id)
+
+        if self.check_if_exists(issuer_record["numista_url_slug"], coin_type_db_info):
+            return
+
+        file_name_prefix, coin_type_dir = self.get_coin_type_dir(coin_type_link, issuer_record, id)
+
+        if coin_type_db_info:
+            async with html_semaphore:
+                coin_type_page, not_modified = await self.basic_helper.fetch_revalidated_async(urljoin(self.base_url, coin_type_url))
+            if not_modified:
+                out = self.restore_unchanged_coin_type(id, coin_type_page, issuer_record['numista_url_slug'], coin_type_dir)
+                if out:
+                    await self.download_coin_type_images_async(out, issuer_record['numista_url_slug'], coin_type_dir, image_semaphore, skip_existing=True)
+                    return
+        else:
+            async with html_semaphore:
+                coin_type_page = await self.basic_helper.fetch_async(urljoin(self.base_url, coin_type_url))
+
+        out = self._new_out(id, issuer_record, period, file_name_prefix)
+
+        if coin_type_db_info:
+            # Repaired in place: only missing files are added
+            self.store_coin_type(out, coin_type_page, coin_type_db_info, issuer_record['numista_url_slug'], coin_type_dir)
+            await self.download_coin_type_images_async(out, issuer_record['numista_url_slug'], coin_type_dir, image_semaphore)
+            return
+
+        soup = self.parse_coin_type_page(out, coin_type_page)
+        cleaned_page = self.clean_html(soup, out, issuer_record['numista_url_slug'])
+        staging_dir = self.stage_coin_type(out, cleaned_page, issuer_record['numista_url_slug'], coin_type_dir)
+        await self.finish_coin_type_async(out, issuer_record['numista_url_slug'], staging_dir, coin_type_dir, image_semaphore)
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Scrape Numista coin types")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="crawl with the asyncio engine")
+    parser.add_argument("--ids", type=lambda v: [int(x) for x in v.split(",") if x.strip()], help="comma-separated coin type IDs to reprocess directly, without walking listing pages")
+    shard_group = parser.add_mutually_exclusive_group()
+    shard_group.add_argument("--shard", type=CoinTypesScraper.parse_shard, help="crawl only shard i of N (e.g. 0/4) of the issuers; see coin_types_supervisor.py")
+    shard_group.add_argument("--issuers", type=lambda v: [x.strip() for x in v.split(",") if x.strip()], help="comma-separated issuer slugs to crawl")
+    parser.add_argument("--recheck-listings", action="store_true", help="check every coin even on listing pages that did not change since the last crawl")
+    parser.add_argument("--listing-prefetch", type=int, default=1, help="listing pages to fetch ahead of the one being processed (0 = off)")
+    parser.add_argument("--defer-images", action="store_true", help="queue images for image_downloader.py instead of downloading them during the crawl")
+    parser.add_argument("--pipeline", action="store_true", help="run the crawl as a threaded staged pipeline")
+    parser.add_argument("--fetch-workers", type=int, default=4, help="page fetch threads (--pipeline)")
+    parser.add_argument("--parse-workers", type=int, default=2, help="parse threads (--pipeline)")
+    parser.add_argument("--image-workers", type=int, default=4, help="image download threads (--pipeline)")
+    parser.add_argument("--queue-size", type=int, default=16, help="capacity of each stage queue (--pipeline)")
+    parser.add_argument("--html-concurrency", type=int, default=4, help="max concurrent HTML page requests (--async)")
+    parser.add_argument("--image-concurrency", type=int, default=8, help="max concurrent image requests (--async)")
+    parser.add_argument("--max-rps", type=float, default=5, help="global requests-per-second cap (--async)")
+    parser.add_argument("--rate-state", help="SQLite file shared by several scraper processes to throttle together")
+    parser.add_argument("--hosts-config", help="per-host concurrency/rate/timeout settings (default: scrappers/shared/fetch_hosts.json)")
+    BasicHelper.add_cache_arguments(parser)
+    add_html_parser_argument(parser)
+    args = parser.parse_args()
+
+    BasicHelper.configure_from_args(args)
+    configure_html_parser(args.html_parser)
+    if args.rate_state:
+        configure_rate_limits(state_path=args.rate_state)
+    if args.hosts_config:
+        load_hosts_config(args.hosts_config)
+
     scraper = CoinTypesScraper()
     scraper.should_cleanup = True
-    scraper.process()
+    scraper.skip_unchanged_listings = not args.recheck_listings
+    scraper.listing_prefetch_depth = args.listing_prefetch
+    if args.defer_images:
+        scraper.image_queue = ImageQueueDbHelper()
+    scraper.set_shard(args.shard, args.issuers)
+    if args.ids:
+        scraper.process_coin_type_ids(args.ids, fetch_workers=args.fetch_workers, parse_workers=args.parse_workers, image_workers=args.image_workers)
+    elif args.pipeline:
+        scraper.process_pipeline(fetch_workers=args.fetch_workers, parse_workers=args.parse_workers, image_workers=args.image_workers, queue_size=args.queue_size)
+    elif args.use_async:
+        scraper.process_async(html_concurrency=args.html_concurrency, image_concurrency=args.image_concurrency, max_rps=args.max_rps)
+    else:
+        scraper.process()
 
 if __name__ == '__main__':
-    raise SystemExit(main())
\ No newline at end of file
+    raise SystemExit(main())
@@ -0,0 +1,160 @@
+import os, sys
+import argparse
+import subprocess
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frontier_db_functions import FrontierDbHelper
+
+class ShardSupervisor:
+    """
+    Runs the coin types crawl as shard_count processes of coin_types_scrapper.py --shard i/N.
+
+    Every shard writes its output to logs/shard-<i>-of-<N>.log and checkpoints into the crawl
+    frontier under its own name. A shard that exits with an error is started again after
+    restart_delay seconds (at most max_restarts times) and resumes from that checkpoint.
+    The progress of all shards is read from the frontier and printed every report_interval seconds.
+
+    The shards share one rate-limit state file, so together they stay within each host's rate.
+    """
+    def __init__(self, shard_count, scraper_args=(), max_restarts=5, restart_delay=30, report_interval=60, log_dir=None):
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        self.scraper_path = os.path.join(script_dir, "coin_types_scrapper.py")
+        self.log_dir = log_dir or os.path.join(script_dir, "logs")
+        os.makedirs(self.log_dir, exist_ok=True)
+
+        self.shard_count = shard_count
+        self.scraper_args = list(scraper_args)
+        if "--rate-state" not in self.scraper_args:
+            db_dir = os.path.join(os.path.dirname(script_dir), "db")
+            self.scraper_args += ["--rate-state", os.path.join(db_dir, "rate_state.db")]
+
+        self.max_restarts = max_restarts
+        self.restart_delay = restart_delay
+        self.report_interval = report_interval
+
+        self.frontier = FrontierDbHelper()
+        self.processes = {}  # shard index -> Popen
+        self.restarts = {i: 0 for i in range(shard_count)}
+        self.pending = {}  # shard index -> time to (re)start it
+        self.finished = set()
+        self.gave_up = set()
+
+    def shard_name(self, index):
+        return f"{index}/{self.shard_count}"
+
+    def reset(self):
+        """Forget the checkpoints of all shards so the next run crawls everything again."""
+        for index in range(self.shard_count):
+            FrontierDbHelper(shard=self.shard_name(index)).reset()
+
+    def _start(self, index):
+        log_path = os.path.join(self.log_dir, f"shard-{index}-of-{self.shard_count}.log")
+        with open(log_path, "a", encoding="utf-8") as log_file:
+            log_file.write(f"\n=== Starting shard {self.shard_name(index)} at {time.strftime('%Y-%m-%d %H:%M:%S')} ===\n")
+            log_file.flush()
+            self.processes[index] = subprocess.Popen(
+                [sys.executable, "-u", self.scraper_path, "--shard", self.shard_name(index), *self.scraper_args],
+                stdout=log_file, stderr=subprocess.STDOUT, cwd=os.path.dirname(self.scraper_path)
+            )
+        print(f"Shard {self.shard_name(index)} started (pid {self.processes[index].pid}), log: {log_path}")
+
+    def _check(self, index, process):
+        code = process.poll()
+        if code is None:
+            return
+        del self.processes[index]
+
+        if code == 0:
+            print(f"Shard {self.shard_name(index)} finished")
+            self.finished.add(index)
+        elif self.restarts[index] < self.max_restarts:
+            self.restarts[index] += 1
+            print(f"Shard {self.shard_name(index)} exited with code {code}, restarting from its checkpoint in {self.restart_delay}s "
+                  f"({self.restarts[index]}/{self.max_restarts})")
+            self.pending[index] = time.time() + self.restart_delay
+        else:
+            print(f"Shard {self.shard_name(index)} exited with code {code}, giving up after {self.max_restarts} restarts")
+            self.gave_up.add(index)
+
+    def report(self):
+        progress = self.frontier.get_shard_progress([self.shard_name(i) for i in range(self.shard_count)])
+        total_pages = total_coins = total_failed = 0
+        for index in range(self.shard_count):
+            p = progress[self.shard_name(index)]
+            total_pages += p["pages_done"]
+            total_coins += p["coins_done"]
+            total_failed += p["coins_failed"]
+
+            if index in self.processes:
+                status = f"running (pid {self.processes[index].pid})"
+            elif index in self.pending:
+                status = "waiting to restart"
+            elif index in self.gave_up:
+                status = "failed"
+            else:
+                status = "finished"
+            print(f"  shard {self.shard_name(index)}: {status}, restarts {self.restarts[index]}, "
+                  f"{p['pages_done']} pages / {p['coins_done']} coins done, {p['coins_failed']} failed, at {p['current'] or '-'}")
+        print(f"Total: {total_pages} pages / {total_coins} coins done, {total_failed} failed")
+
+    def stop(self):
+        for process in self.processes.values():
+            process.terminate()
+        for process in self.processes.values():
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def run(self):
+        """Run until every shard has finished or been given up on. Returns the process exit code."""
+        for index in range(self.shard_count):
+            self._start(index)
+
+        next_report = time.time() + self.report_interval
+        try:
+            while self.processes or self.pending:
+                for index, process in list(self.processes.items()):
+                    self._check(index, process)
+
+                now = time.time()
+                for index, start_at in list(self.pending.items()):
+                    if now >= start_at:
+                        del self.pending[index]
+                        self._start(index)
+
+                if now >= next_report:
+                    self.report()
+                    next_report = now + self.report_interval
+
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("Stopping shards...")
+            self.stop()
+            raise
+
+        self.report()
+        return 1 if self.gave_up else 0
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the Numista coin types crawl as several shard processes. "
+                    "Unrecognized arguments are passed on to coin_types_scrapper.py (e.g. --async, --pipeline)."
+    )
+    parser.add_argument("--shards", type=int, required=True, help="number of shard processes")
+    parser.add_argument("--max-restarts", type=int, default=5, help="restarts allowed per shard before giving up on it")
+    parser.add_argument("--restart-delay", type=float, default=30, help="seconds to wait before restarting a crashed shard")
+    parser.add_argument("--report-interval", type=float, default=60, help="seconds between progress reports")
+    parser.add_argument("--log-dir", help="directory of the per-shard logs (default: coin_types/logs)")
+    parser.add_argument("--fresh", action="store_true", help="discard the shard checkpoints and crawl everything again")
+    args, scraper_args = parser.parse_known_args()
+
+    supervisor = ShardSupervisor(args.shards, scraper_args, args.max_restarts, args.restart_delay, args.report_interval, args.log_dir)
+    if args.fresh:
+        supervisor.reset()
+    return supervisor.run()
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,282 @@
+import sqlite3
+import os
+import threading
+import time
+
+class FrontierDbHelper:
+    """
+    Crawl frontier of the coin types scraper (replaces pages.log).
+
+    crawl_frontier has one row per listing page (coin_type_id = 0) and one per coin type found
+    on it. A row goes pending -> claimed -> done, or failed with its attempts and last error.
+    Resuming means picking the oldest page that is not done and skipping its done coins, so a
+    crash only redoes the coins that were in flight. Claims are single UPDATE statements, which
+    lets several workers share the table without taking the same coin twice.
+
+    One connection is shared by the threads of a run, serialized by a lock. Sharded crawls
+    (--shard) and refreshes run as separate processes on the same tables: the shard is part of
+    every key, so two shards that visit the same page or coin keep separate rows, and resuming,
+    resetting and releasing interrupted coins only touch the rows of this shard.
+    """
+    PENDING = "pending"
+    CLAIMED = "claimed"
+    DONE = "done"
+    FAILED = "failed"
+
+    PAGE = 0  # coin_type_id of a listing page row
+
+    TABLES = {
+        "crawl_frontier": """
+            shard TEXT NOT NULL DEFAULT '',
+            issuer_url_slug TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            coin_type_id INTEGER NOT NULL,
+            state TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            claimed_by TEXT,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (shard, issuer_url_slug, page, coin_type_id)
+        """,
+        # Survives reset(): it describes the site, not the progress of one crawl
+        "listing_fingerprints": """
+            shard TEXT NOT NULL DEFAULT '',
+            issuer_url_slug TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            fingerprint TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (shard, issuer_url_slug, page)
+        """,
+        # Every look at a listing page, for ranking the pages of a refresh (see coin_types_refresh.py)
+        "listing_checks": """
+            shard TEXT NOT NULL DEFAULT '',
+            issuer_url_slug TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            fingerprint TEXT NOT NULL,
+            coin_count INTEGER NOT NULL,
+            checks INTEGER NOT NULL,
+            changes INTEGER NOT NULL,
+            first_checked_at REAL NOT NULL,
+            checked_at REAL NOT NULL,
+            PRIMARY KEY (shard, issuer_url_slug, page)
+        """,
+    }
+
+    def __init__(self, worker_id=None, shard="", db_path=None):
+        self.db_path = db_path or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "coins.db")
+        self.db_connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self.db_connection.execute("PRAGMA journal_mode = WAL")
+        self.worker_id = worker_id or f"{os.getpid()}"
+        self.shard = shard
+        # A refresh (see coin_types_refresh.py) also trusts the pages other shards finished
+        self.fingerprints_from_any_shard = False
+        self._lock = threading.Lock()
+
+        for table, columns in FrontierDbHelper.TABLES.items():
+            self._create_table(table, columns)
+        self.db_connection.execute("CREATE INDEX IF NOT EXISTS crawl_frontier_state ON crawl_frontier(state, coin_type_id)")
+        self.db_connection.commit()
+
+    def _create_table(self, table, columns):
+        """Create a table, or rebuild one written before sharding, whose key lacks the shard (rows keep their order)."""
+        existing = self.db_connection.execute(f"PRAGMA table_info({table})").fetchall()
+        if not existing:
+            self.db_connection.execute(f"CREATE TABLE {table} ({columns})")
+            return
+        if any(name == "shard" and pk for _, name, _, _, _, pk in existing):
+            return
+        copied = ", ".join(name for _, name, *_ in existing)
+        self.db_connection.commit()
+        self.db_connection.executescript(f"""
+            BEGIN;
+            ALTER TABLE {table} RENAME TO {table}_unsharded;
+            CREATE TABLE {table} ({columns});
+            INSERT INTO {table} ({copied}) SELECT {copied} FROM {table}_unsharded ORDER BY rowid;
+            DROP TABLE {table}_unsharded;
+            COMMIT;
+        """)
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cur = self.db_connection.execute(sql, params)
+            self.db_connection.commit()
+            return cur
+
+    def is_empty(self):
+        with self._lock:
+            return self.db_connection.execute("SELECT 1 FROM crawl_frontier WHERE shard = ? LIMIT 1", (self.shard,)).fetchone() is None
+
+    def get_resume_point(self):
+        """(issuer_url_slug, page) of the oldest unfinished listing page, else of the last one; (None, None) if empty."""
+        with self._lock:
+            row = self.db_connection.execute(
+                "SELECT issuer_url_slug, page FROM crawl_frontier WHERE shard = ? AND coin_type_id = ? AND state != ? ORDER BY rowid LIMIT 1",
+                (self.shard, FrontierDbHelper.PAGE, FrontierDbHelper.DONE)
+            ).fetchone()
+            if row is None:
+                row = self.db_connection.execute(
+                    "SELECT issuer_url_slug, page FROM crawl_frontier WHERE shard = ? AND coin_type_id = ? ORDER BY rowid DESC LIMIT 1",
+                    (self.shard, FrontierDbHelper.PAGE)
+                ).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def reset(self):
+        """Forget all progress of this shard: the next crawl starts over."""
+        self._execute("DELETE FROM crawl_frontier WHERE shard = ?", (self.shard,))
+
+    def start_page(self, issuer_url_slug, page):
+        self._execute("""
+            INSERT INTO crawl_frontier (issuer_url_slug, page, coin_type_id, state, attempts, claimed_by, updated_at, shard)
+            VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+            ON CONFLICT(shard, issuer_url_slug, page, coin_type_id) DO UPDATE SET
+                state = CASE WHEN state = 'done' THEN state ELSE excluded.state END,
+                attempts = attempts + 1,
+                claimed_by = excluded.claimed_by,
+                updated_at = excluded.updated_at
+        """, (issuer_url_slug, page, FrontierDbHelper.PAGE, FrontierDbHelper.CLAIMED, self.worker_id, time.time(), self.shard))
+
+    def complete_page(self, issuer_url_slug, page, fingerprint=None):
+        """Mark a listing page done; with fingerprint, remember its links for the next crawl."""
+        self._set_state(issuer_url_slug, page, FrontierDbHelper.PAGE, FrontierDbHelper.DONE)
+        if fingerprint is not None:
+            self._execute("""
+                INSERT INTO listing_fingerprints (shard, issuer_url_slug, page, fingerprint, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(shard, issuer_url_slug, page) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    updated_at = excluded.updated_at
+            """, (self.shard, issuer_url_slug, page, fingerprint, time.time()))
+
+    def get_listing_fingerprint(self, issuer_url_slug, page):
+        """
+        Fingerprint of the page the last time all of its coins were done in this shard, or None.
+        With fingerprints_from_any_shard, a page this shard never finished falls back to the
+        newest fingerprint recorded by any shard.
+        """
+        with self._lock:
+            row = self.db_connection.execute(
+                "SELECT fingerprint FROM listing_fingerprints WHERE shard = ? AND issuer_url_slug = ? AND page = ?",
+                (self.shard, issuer_url_slug, page)
+            ).fetchone()
+            if row is None and self.fingerprints_from_any_shard:
+                row = self.db_connection.execute(
+                    "SELECT fingerprint FROM listing_fingerprints WHERE issuer_url_slug = ? AND page = ? ORDER BY updated_at DESC LIMIT 1",
+                    (issuer_url_slug, page)
+                ).fetchone()
+        return row[0] if row else None
+
+    def record_listing_check(self, issuer_url_slug, page, fingerprint, coin_count):
+        """Note that a listing page was fetched; changes counts the checks that found other links than the previous one."""
+        now = time.time()
+        self._execute("""
+            INSERT INTO listing_checks (shard, issuer_url_slug, page, fingerprint, coin_count, checks, changes, first_checked_at, checked_at)
+            VALUES (?, ?, ?, ?, ?, 1, 0, ?, ?)
+            ON CONFLICT(shard, issuer_url_slug, page) DO UPDATE SET
+                changes = changes + (fingerprint != excluded.fingerprint),
+                checks = checks + 1,
+                fingerprint = excluded.fingerprint,
+                coin_count = excluded.coin_count,
+                checked_at = excluded.checked_at
+        """, (self.shard, issuer_url_slug, page, fingerprint, coin_count, now, now))
+
+    def get_listing_checks(self):
+        """
+        {issuer_url_slug: {page: {coin_count, checks, changes, first_checked_at, checked_at}}}, from the
+        checks of every shard: the page is the same whichever crawl looked at it. coin_count is the latest one.
+        """
+        with self._lock:
+            rows = self.db_connection.execute(
+                "SELECT issuer_url_slug, page, coin_count, checks, changes, first_checked_at, checked_at FROM listing_checks ORDER BY checked_at"
+            ).fetchall()
+        checks = {}
+        for issuer_url_slug, page, coin_count, page_checks, changes, first_checked_at, checked_at in rows:
+            check = checks.setdefault(issuer_url_slug, {}).get(page)
+            if check is None:
+                checks[issuer_url_slug][page] = {
+                    "coin_count": coin_count,
+                    "checks": page_checks,
+                    "changes": changes,
+                    "first_checked_at": first_checked_at,
+                    "checked_at": checked_at,
+                }
+                continue
+            check["coin_count"] = coin_count
+            check["checks"] += page_checks
+            check["changes"] += changes
+            check["first_checked_at"] = min(check["first_checked_at"], first_checked_at)
+            check["checked_at"] = checked_at
+        return checks
+
+    def claim_coin(self, issuer_url_slug, page, coin_type_id):
+        """Take a coin for processing. False when it is already done or claimed by another worker."""
+        now = time.time()
+        with self._lock:
+            self.db_connection.execute("""
+                INSERT OR IGNORE INTO crawl_frontier (issuer_url_slug, page, coin_type_id, state, updated_at, shard)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (issuer_url_slug, page, coin_type_id, FrontierDbHelper.PENDING, now, self.shard))
+            cur = self.db_connection.execute("""
+                UPDATE crawl_frontier SET state = ?, attempts = attempts + 1, claimed_by = ?, updated_at = ?
+                WHERE shard = ? AND issuer_url_slug = ? AND page = ? AND coin_type_id = ? AND state IN (?, ?)
+            """, (FrontierDbHelper.CLAIMED, self.worker_id, now, self.shard, issuer_url_slug, page, coin_type_id,
+                  FrontierDbHelper.PENDING, FrontierDbHelper.FAILED))
+            self.db_connection.commit()
+            return cur.rowcount == 1
+
+    def complete_coin(self, issuer_url_slug, page, coin_type_id):
+        self._set_state(issuer_url_slug, page, coin_type_id, FrontierDbHelper.DONE)
+
+    def fail_coin(self, issuer_url_slug, page, coin_type_id, error):
+        self._set_state(issuer_url_slug, page, coin_type_id, FrontierDbHelper.FAILED, str(error))
+
+    def _set_state(self, issuer_url_slug, page, coin_type_id, state, error=None):
+        self._execute("""
+            UPDATE crawl_frontier SET state = ?, last_error = COALESCE(?, last_error), updated_at = ?
+            WHERE shard = ? AND issuer_url_slug = ? AND page = ? AND coin_type_id = ?
+        """, (state, error, time.time(), self.shard, issuer_url_slug, page, coin_type_id))
+
+    def release_interrupted_coins(self):
+        """
+        Coins left claimed by a run that crashed: put them back to pending and return their
+        (issuer_url_slug, page, coin_type_id) so their partial output can be removed.
+        """
+        with self._lock:
+            rows = self.db_connection.execute(
+                "SELECT issuer_url_slug, page, coin_type_id FROM crawl_frontier WHERE shard = ? AND state = ? AND coin_type_id != ?",
+                (self.shard, FrontierDbHelper.CLAIMED, FrontierDbHelper.PAGE)
+            ).fetchall()
+            self.db_connection.execute(
+                "UPDATE crawl_frontier SET state = ?, updated_at = ? WHERE shard = ? AND state = ? AND coin_type_id != ?",
+                (FrontierDbHelper.PENDING, time.time(), self.shard, FrontierDbHelper.CLAIMED, FrontierDbHelper.PAGE)
+            )
+            self.db_connection.commit()
+        return rows
+
+    def get_shard_progress(self, shards):
+        """{shard: {pages_done, coins_done, coins_failed, current}} for the given shard names."""
+        progress = {}
+        with self._lock:
+            for shard in shards:
+                pages_done, coins_done, coins_failed = self.db_connection.execute("""
+                    SELECT
+                        COALESCE(SUM(coin_type_id = ? AND state = ?), 0),
+                        COALESCE(SUM(coin_type_id != ? AND state = ?), 0),
+                        COALESCE(SUM(coin_type_id != ? AND state = ?), 0)
+                    FROM crawl_frontier WHERE shard = ?
+                """, (FrontierDbHelper.PAGE, FrontierDbHelper.DONE, FrontierDbHelper.PAGE, FrontierDbHelper.DONE,
+                      FrontierDbHelper.PAGE, FrontierDbHelper.FAILED, shard)).fetchone()
+                current = self.db_connection.execute(
+                    "SELECT issuer_url_slug, page FROM crawl_frontier WHERE shard = ? AND coin_type_id = ? ORDER BY updated_at DESC LIMIT 1",
+                    (shard, FrontierDbHelper.PAGE)
+                ).fetchone()
+                progress[shard] = {
+                    "pages_done": pages_done,
+                    "coins_done": coins_done,
+                    "coins_failed": coins_failed,
+                    "current": f"{current[0]} p{current[1]}" if current else None,
+                }
+        return progress
+
+    def close(self):
+        with self._lock:
+            self.db_connection.close()
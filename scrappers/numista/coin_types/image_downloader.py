@@ -0,0 +1,119 @@
+import os, sys
+import argparse
+import socket
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+
+from image_queue_db_functions import ImageQueueDbHelper
+from basic_functions import *
+from rate_limit_functions import configure_rate_limits, format_rate_metrics
+from fetch_config_functions import load_hosts_config
+from download_functions import SingleFlightDownloads
+
+class ImageDownloaderService:
+    """
+    Drains the image queue filled by CoinTypesScraper --defer-images, so image downloads do
+    not hold up the HTML and metadata crawl.
+
+    Worker threads lease jobs and stream each image into place through BasicHelper.download_file
+    (host budgets, adaptive rate limits and the circuit breaker apply as in the crawler).
+    An image that is linked from several coin types is downloaded once per run and
+    hardlinked to the other paths. Failures are retried with a growing delay; a
+    non-retryable HTTP error (e.g. 404) fails the job for good.
+    With follow, the service keeps polling for new jobs instead of stopping once the queue is empty.
+    """
+    def __init__(self, queue, workers=8, lease_seconds=600, poll_interval=5, follow=False):
+        self.queue = queue
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.follow = follow
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        self.basic_helper = BasicHelper()
+        self.image_downloads = SingleFlightDownloads()
+
+        self._lock = threading.Lock()
+        self.downloaded = 0
+        self.failed = 0
+
+    def run(self):
+        threads = [threading.Thread(target=self._work, name=f"image-{i}") for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print(f"Images downloaded: {self.downloaded}, failed: {self.failed} [{format_rate_metrics()}]")
+
+    def _work(self):
+        while True:
+            job = self.queue.claim(self.owner, self.lease_seconds)
+            if job is None:
+                if self.follow or self.queue.has_open_jobs():
+                    # Waiting for retries, other downloaders' leases or (follow) the crawler
+                    time.sleep(self.poll_interval)
+                    continue
+                return
+            self._download(job)
+
+    def _download(self, job):
+        save_path = job["save_path"]
+        try:
+            os.makedirs(os.path.dirname(save_path), exist_ok=True)
+            ok = self.image_downloads.download(job["url"], save_path, self.basic_helper.download_file)
+        except OfflineCacheMiss:
+            # Offline replay only has pages: leave the job for an online run
+            self.queue.fail(save_path, "offline")
+            return
+        except Exception as e:
+            print(f"Image {job['url']} failed (attempt {job['attempts'] + 1}): {e}")
+            self.queue.fail(save_path, e)
+            with self._lock:
+                self.failed += 1
+            return
+
+        if not ok:
+            self.queue.fail(save_path, "HTTP error", retry=False)
+            with self._lock:
+                self.failed += 1
+            return
+
+        self.queue.complete(save_path)
+        with self._lock:
+            self.downloaded += 1
+            if self.downloaded % 100 == 0:
+                print(f"Images downloaded: {self.downloaded} [{format_rate_metrics()}]")
+
+def main():
+    parser = argparse.ArgumentParser(description="Download the coin type images queued by coin_types_scrapper.py --defer-images")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent downloads")
+    parser.add_argument("--follow", action="store_true", help="keep waiting for new jobs instead of exiting when the queue is empty")
+    parser.add_argument("--max-attempts", type=int, default=5, help="attempts per image before it stays failed")
+    parser.add_argument("--retry-delay", type=float, default=60, help="seconds before the first retry; doubles with each attempt")
+    parser.add_argument("--max-rps", type=float, help="requests-per-second cap per host")
+    parser.add_argument("--rate-state", help="SQLite file shared by several scraper processes to throttle together")
+    parser.add_argument("--hosts-config", help="per-host concurrency/rate/timeout settings (default: scrappers/shared/fetch_hosts.json)")
+    parser.add_argument("--status", action="store_true", help="print the job counts and exit")
+    BasicHelper.add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    queue = ImageQueueDbHelper(max_attempts=args.max_attempts, retry_delay=args.retry_delay)
+    if args.status:
+        print(", ".join(f"{count} {state}" for state, count in sorted(queue.get_counts().items())) or "no jobs")
+        return
+
+    BasicHelper.configure_from_args(args)
+    if args.rate_state:
+        configure_rate_limits(state_path=args.rate_state)
+    if args.max_rps:
+        configure_rate_limits(max_rate=args.max_rps)
+    if args.hosts_config:
+        load_hosts_config(args.hosts_config)
+
+    ImageDownloaderService(queue, workers=args.workers, follow=args.follow).run()
+
+if __name__ == '__main__':
+    raise SystemExit(main())
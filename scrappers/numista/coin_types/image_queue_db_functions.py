@@ -0,0 +1,150 @@
+import sqlite3
+import os
+import threading
+import time
+
+class ImageQueueDbHelper:
+    """
+    Persistent queue of coin type images for the background downloader (image_downloader.py).
+
+    The scraper enqueues (url, save_path, coin_type_id, kind) instead of downloading; the
+    downloader leases jobs, retries failures with a growing delay and marks them done. A lease
+    that runs out (the downloader was killed) makes the job claimable again, and the .part
+    file of an interrupted transfer is resumed. Enqueueing the same save_path again is a no-op
+    while the job is open, and queues it again once it is done or failed.
+
+    One connection is shared by the threads of a process, serialized by a lock.
+    """
+    PENDING = "pending"
+    LEASED = "leased"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, max_attempts=5, retry_delay=60):
+        self.db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "coins.db")
+        self.db_connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self.db_connection.execute("PRAGMA journal_mode = WAL")
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+
+        self.db_connection.execute("""
+            CREATE TABLE IF NOT EXISTS image_jobs (
+                save_path TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                coin_type_id INTEGER,
+                kind TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                claimed_by TEXT,
+                lease_expires_at REAL,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.db_connection.execute("CREATE INDEX IF NOT EXISTS image_jobs_state ON image_jobs(state, next_attempt_at)")
+        self.db_connection.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cur = self.db_connection.execute(sql, params)
+            self.db_connection.commit()
+            return cur
+
+    def enqueue_many(self, jobs):
+        """jobs: iterable of (url, save_path, coin_type_id, kind)."""
+        now = time.time()
+        rows = [(url, str(save_path), coin_type_id, kind, ImageQueueDbHelper.PENDING, now) for url, save_path, coin_type_id, kind in jobs]
+        if not rows:
+            return
+        with self._lock:
+            self.db_connection.executemany("""
+                INSERT INTO image_jobs (url, save_path, coin_type_id, kind, state, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(save_path) DO UPDATE SET
+                    url = excluded.url,
+                    coin_type_id = excluded.coin_type_id,
+                    kind = excluded.kind,
+                    state = excluded.state,
+                    attempts = 0,
+                    next_attempt_at = 0,
+                    updated_at = excluded.updated_at
+                WHERE image_jobs.state IN ('done', 'failed')
+            """, rows)
+            self.db_connection.commit()
+
+    def is_queued(self, save_path):
+        """True while the image at save_path is waiting for (or being fetched by) the downloader."""
+        with self._lock:
+            row = self.db_connection.execute(
+                "SELECT 1 FROM image_jobs WHERE save_path = ? AND (state IN (?, ?) OR (state = ? AND attempts < ?))",
+                (str(save_path), ImageQueueDbHelper.PENDING, ImageQueueDbHelper.LEASED, ImageQueueDbHelper.FAILED, self.max_attempts)
+            ).fetchone()
+        return row is not None
+
+    def claim(self, owner, lease_seconds=600):
+        """Lease the next due job: {url, save_path, coin_type_id, kind, attempts} or None."""
+        now = time.time()
+        with self._lock:
+            self.db_connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.db_connection.execute("""
+                    SELECT save_path, url, coin_type_id, kind, attempts FROM image_jobs
+                    WHERE (state = ? AND next_attempt_at <= ?)
+                       OR (state = ? AND lease_expires_at < ?)
+                       OR (state = ? AND attempts < ? AND next_attempt_at <= ?)
+                    ORDER BY next_attempt_at, updated_at LIMIT 1
+                """, (ImageQueueDbHelper.PENDING, now, ImageQueueDbHelper.LEASED, now,
+                      ImageQueueDbHelper.FAILED, self.max_attempts, now)).fetchone()
+                if row is not None:
+                    self.db_connection.execute("""
+                        UPDATE image_jobs SET state = ?, attempts = attempts + 1, claimed_by = ?, lease_expires_at = ?, updated_at = ?
+                        WHERE save_path = ?
+                    """, (ImageQueueDbHelper.LEASED, owner, now + lease_seconds, now, row[0]))
+                self.db_connection.commit()
+            except BaseException:
+                self.db_connection.rollback()
+                raise
+        if row is None:
+            return None
+        return dict(zip(("save_path", "url", "coin_type_id", "kind", "attempts"), row))
+
+    def complete(self, save_path):
+        self._execute(
+            "UPDATE image_jobs SET state = ?, lease_expires_at = NULL, updated_at = ? WHERE save_path = ?",
+            (ImageQueueDbHelper.DONE, time.time(), str(save_path))
+        )
+
+    def fail(self, save_path, error, retry=True):
+        """Record a failed attempt; it is retried after retry_delay * 2^(attempts - 1) unless retry is False."""
+        now = time.time()
+        with self._lock:
+            row = self.db_connection.execute("SELECT attempts FROM image_jobs WHERE save_path = ?", (str(save_path),)).fetchone()
+            attempts = row[0] if row else 1
+            delay = min(self.retry_delay * 2 ** max(attempts - 1, 0), 6 * 3600)
+            self.db_connection.execute("""
+                UPDATE image_jobs SET state = ?, last_error = ?, lease_expires_at = NULL, next_attempt_at = ?,
+                    attempts = CASE WHEN ? THEN attempts ELSE ? END, updated_at = ?
+                WHERE save_path = ?
+            """, (ImageQueueDbHelper.FAILED, str(error), now + delay, retry, self.max_attempts, now, str(save_path)))
+            self.db_connection.commit()
+
+    def has_open_jobs(self):
+        """True while a job is pending, leased or left to retry."""
+        with self._lock:
+            row = self.db_connection.execute(
+                "SELECT 1 FROM image_jobs WHERE state IN (?, ?) OR (state = ? AND attempts < ?) LIMIT 1",
+                (ImageQueueDbHelper.PENDING, ImageQueueDbHelper.LEASED, ImageQueueDbHelper.FAILED, self.max_attempts)
+            ).fetchone()
+        return row is not None
+
+    def get_counts(self):
+        """{state: count}"""
+        with self._lock:
+            rows = self.db_connection.execute("SELECT state, COUNT(*) FROM image_jobs GROUP BY state").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self.db_connection.close()
@@ -0,0 +1,80 @@
+import sqlite3
+import os
+import threading
+import time
+
+class CoinJournalDbHelper:
+    """
+    Write journal of the coin types being stored (new ones and replacements).
+
+    A coin type is built in a staging folder and goes begun -> html_written (DB rows saved,
+    coin_type.html written) -> images_done -> committed (staging folder renamed into place).
+    After a crash the unfinished steps are picked up from the last recorded state instead of
+    throwing the coin type away: an html_written coin type only needs its images.
+
+    One connection is shared by the threads of a run, serialized by a lock.
+    """
+    BEGUN = "begun"
+    HTML_WRITTEN = "html_written"
+    IMAGES_DONE = "images_done"
+    COMMITTED = "committed"
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "coins.db")
+        self.db_connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self.db_connection.execute("PRAGMA journal_mode = WAL")
+        self._lock = threading.Lock()
+
+        self.db_connection.execute("""
+            CREATE TABLE IF NOT EXISTS coin_journal (
+                coin_type_id INTEGER PRIMARY KEY,
+                issuer_url_slug TEXT NOT NULL,
+                coin_type_dir TEXT NOT NULL,
+                staging_dir TEXT NOT NULL,
+                state TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.db_connection.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cur = self.db_connection.execute(sql, params)
+            self.db_connection.commit()
+            return cur
+
+    def begin(self, coin_type_id, issuer_url_slug, coin_type_dir, staging_dir):
+        self._execute("""
+            INSERT INTO coin_journal (coin_type_id, issuer_url_slug, coin_type_dir, staging_dir, state, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(coin_type_id) DO UPDATE SET
+                issuer_url_slug = excluded.issuer_url_slug,
+                coin_type_dir = excluded.coin_type_dir,
+                staging_dir = excluded.staging_dir,
+                state = excluded.state,
+                updated_at = excluded.updated_at
+        """, (coin_type_id, issuer_url_slug, coin_type_dir, staging_dir, CoinJournalDbHelper.BEGUN, time.time()))
+
+    def advance(self, coin_type_id, state):
+        self._execute(
+            "UPDATE coin_journal SET state = ?, updated_at = ? WHERE coin_type_id = ?",
+            (state, time.time(), coin_type_id)
+        )
+
+    def get_unfinished(self, coin_type_id):
+        """The journal entry of a coin type that was not committed, as a dict, or None."""
+        with self._lock:
+            row = self.db_connection.execute("""
+                SELECT coin_type_id, issuer_url_slug, coin_type_dir, staging_dir, state
+                FROM coin_journal WHERE coin_type_id = ? AND state != ?
+            """, (coin_type_id, CoinJournalDbHelper.COMMITTED)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("id", "issuer_url_slug", "coin_type_dir", "staging_dir", "state"), row))
+
+    def discard(self, coin_type_id):
+        self._execute("DELETE FROM coin_journal WHERE coin_type_id = ?", (coin_type_id,))
+
+    def close(self):
+        with self._lock:
+            self.db_connection.close()
@@ -0,0 +1,161 @@
+import os
+import sys
+import re
+import html
+import unicodedata
+
+# Field spec matcher (scrappers/numista)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from field_spec_functions import FieldSpec, FieldMatcher
+
+def cell_text(td):
+    return td.get_text(strip=True)
+
+def without_nbsp(text):
+    return text.replace('\xa0', ' ').replace('&nbsp;', ' ').strip()
+
+def denomination_parts(raw_text):
+    """(main value, parenthesis info, extra lines) of the text of the Value cell."""
+    info_1 = None
+    info_2 = None
+    main_value = None
+
+    # 1. Unescape HTML
+    cleaned_text = html.unescape(raw_text)
+
+    # 2. Normalize Unicode using NFC (Critical for preserving ½)
+    cleaned_text = unicodedata.normalize("NFC", cleaned_text)
+
+    # 3. Clean spaces
+    cleaned_text = cleaned_text.replace('\xa0', ' ').strip()
+
+    # 4. Extract Parenthesis Content -> info_1
+    match = re.search(r'\((.*?)\)', cleaned_text, re.DOTALL)
+    if match:
+        info_1 = match.group(1).strip()
+        cleaned_text = cleaned_text.replace(match.group(0), ' ').strip()
+
+    # 5. Split lines -> info_2
+    lines = [line.strip() for line in cleaned_text.split('\n') if line.strip()]
+    if lines:
+        main_value = lines[0]
+        if len(lines) > 1:
+            info_2 = ' '.join(lines[1:])
+    return main_value, info_1, info_2
+
+def measure(unit_suffix):
+    """Normalizer of a Weight/Diameter/Thickness cell: (numeric value, parenthesis info, raw text)."""
+    def parse(raw_text):
+        if not raw_text:
+            return None, None, None
+
+        # Check for parenthesis info
+        info_val = None
+        numeric_val = None
+
+        # Regex to find parenthesis content
+        match_info = re.search(r'\((.*?)\)', raw_text)
+        if match_info:
+            info_val = match_info.group(1).strip()
+            # Remove the info from raw text for numeric parsing
+            raw_text_clean = re.sub(r'\(.*?\)', '', raw_text).strip()
+        else:
+            raw_text_clean = raw_text
+
+        # Attempt to parse numeric
+        # Remove unit suffix if present
+        if unit_suffix and raw_text_clean.endswith(unit_suffix):
+            val_str = raw_text_clean[:-len(unit_suffix)].strip()
+        else:
+            val_str = raw_text_clean.strip()
+
+        try:
+            # Replace comma with dot just in case, though example showed 1.3
+            val_str = val_str.replace(',', '.')
+            if val_str:
+                numeric_val = float(val_str)
+        except ValueError:
+            # Failed to parse numeric
+            pass
+
+        return numeric_val, info_val, raw_text
+    return parse
+
+def size_parts(raw_text):
+    """(size without its mm unit, raw text) of the Size cell."""
+    final_value = without_nbsp(raw_text)
+
+    # Default unit "mm": if text ends with "mm", remove it.
+    if final_value.lower().endswith("mm"):
+        final_value = final_value[:-2].strip()
+    return final_value, raw_text
+
+def ruler_links(section):
+    """[{ruler_id, ruler_name, alt_period_name, period_years, extra}] of the ruler links of the section (their period spans are removed)."""
+    # Look for <a> with href containing "ruler.php?id=" inside the section
+    # The structure is usually <tr><th>Title</th><td><a>...</a></td></tr>
+    rulers = []
+    for ruler_link in section.select('a[href*="/catalogue/ruler.php?id="]'):
+        href = ruler_link.get('href')
+        # Parse ruler_id
+        match = re.search(r'id=(\d+)', href)
+        if not match:
+            continue
+        ruler_id = int(match.group(1))
+
+        # Parse period_years from span
+        # Example: <span dir="ltr">(<em>1901-1910</em>)</span>
+        span = ruler_link.find('span')
+        period_years = ""
+        if span:
+            period_years = span.get_text(strip=True)
+            if period_years.startswith('(') and period_years.endswith(')'):
+                period_years = period_years[1:-1].strip()
+            # Remove the span from the link to extract just the ruler name
+            # (only the ruler_link subtree is modified)
+            span.extract()
+
+        ruler_name = ruler_link.get_text(strip=True)
+        alt_period_name = None
+        extra = None
+
+        # 1. Clean period_name: Move content in () to alt_period_name
+        if ruler_name and ruler_name.strip().endswith(')'):
+            match = re.search(r'^(.*)\(([^)]+)\)$', ruler_name.strip())
+            if match:
+                ruler_name = match.group(1).strip()
+                alt_period_name = match.group(2).strip()
+
+        # 2. Handle hierarchy separator: "Context › Name"
+        if ruler_name and '›' in ruler_name:
+            parts = ruler_name.split('›')
+            # Assuming the last part is the name, and everything before is context
+            ruler_name = parts[-1].strip()
+            extra = '›'.join(parts[:-1]).strip()
+
+        rulers.append({
+            "ruler_id": ruler_id,
+            "ruler_name": ruler_name,
+            "alt_period_name": alt_period_name,
+            "period_years": period_years,
+            "extra": extra,
+        })
+    return rulers
+
+# The characteristics read by the post-pass scripts: <tr><th>Label</th><td>value</td></tr> rows
+# (some older layouts use a <td> label, tried when no <th> has it) and the ruler links.
+# One walk of a cleaned coin_type.html locates all of them.
+CHARACTERISTIC_FIELDS = FieldMatcher([
+    FieldSpec("composition", label="Composition", cells=("th", "td"), extract=cell_text, normalize=without_nbsp),
+    FieldSpec("denomination", label="Value", cells=("th", "td"), extract=lambda td: td.get_text(separator='\n', strip=True), normalize=denomination_parts),
+    FieldSpec("weight", label="Weight", extract=cell_text, normalize=measure("g")),
+    FieldSpec("diameter", label="Diameter", extract=cell_text, normalize=measure("mm")),
+    FieldSpec("thickness", label="Thickness", extract=cell_text, normalize=measure("mm")),
+    FieldSpec("shape", label="Shape", extract=cell_text),
+    FieldSpec("size", label="Size", cells=("th", "td"), extract=cell_text, normalize=size_parts),
+    FieldSpec("rulers", element_id="fiche_caracteristiques", tag_name="section", extract=ruler_links),
+])
+
+def extract_characteristics(soup, names=None):
+    """{field name: value} of CHARACTERISTIC_FIELDS (or just names) from a coin type page; None when not on the page."""
+    return CHARACTERISTIC_FIELDS.extract(soup, names)
@@ -1,6 +1,15 @@
 import os
+import sys
 import sqlite3
-from bs4 import BeautifulSoup
+
+# Shared HTML parser factory (scrappers/shared)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "shared"))
+from html_parser_functions import make_soup
+from characteristics_functions import extract_characteristics
+
+def extract_composition(soup):
+    """Text of the Composition cell of a coin type page, or None."""
+    return extract_characteristics(soup, ["composition"])["composition"]
 
 def main():
     # Paths
@@ -60,32 +69,16 @@ def main():
                 print(f"Error reading {coin_html_path}: {e}")
                 continue
                 
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Find Composition in table
-            # <tr><th>Composition</th><td>...</td></tr>
-            
-            composition_header = soup.find('th', string=lambda text: text and 'Composition' in text)
-            
-            # If not found in th, try first td
-            if not composition_header:
-                composition_header = soup.find('td', string=lambda text: text and 'Composition' in text)
-            
-            if composition_header:
-                value_td = composition_header.find_next_sibling('td')
-                
-                if value_td:
-                    raw_text = value_td.get_text(strip=True)
-                    # Replace nbsp
-                    cleaned_text = raw_text.replace('\xa0', ' ').replace('&nbsp;', ' ').strip()
-                    
-                    if cleaned_text:
-                        # Update DB
-                        try:
-                            cursor.execute("UPDATE coin_types SET composition = ? WHERE id = ?", (cleaned_text, coin_type_id))
-                            count_updated += 1
-                        except Exception as db_err:
-                            print(f"Error updating DB for coin {coin_type_id}: {db_err}")
+            soup = make_soup(html_content)
+            cleaned_text = extract_composition(soup)
+
+            if cleaned_text:
+                # Update DB
+                try:
+                    cursor.execute("UPDATE coin_types SET composition = ? WHERE id = ?", (cleaned_text, coin_type_id))
+                    count_updated += 1
+                except Exception as db_err:
+                    print(f"Error updating DB for coin {coin_type_id}: {db_err}")
 
     print(f"Finished processing {count_processed} coins.")
     print(f"Total coin types updated with composition: {count_updated}")
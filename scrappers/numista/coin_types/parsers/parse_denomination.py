@@ -1,9 +1,16 @@
 import os
+import sys
 import sqlite3
 import re
-import html
-import unicodedata
-from bs4 import BeautifulSoup
+
+# Shared HTML parser factory (scrappers/shared)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "shared"))
+from html_parser_functions import make_soup
+from characteristics_functions import extract_characteristics
+
+def extract_denomination(soup):
+    """(main value, parenthesis info, extra lines) of the Value cell of a coin type page."""
+    return extract_characteristics(soup, ["denomination"])["denomination"] or (None, None, None)
 
 def main():
     # Paths
@@ -82,48 +89,12 @@ def main():
                 print(f"Error reading {coin_html_path}: {e}")
                 continue
                 
-            soup = BeautifulSoup(html_content, 'html.parser')
+            soup = make_soup(html_content)
             
             # --- Parsing from HTML ---
-            
-            value_header = soup.find('th', string=lambda text: text and 'Value' in text)
-            if not value_header:
-                value_header = soup.find('td', string=lambda text: text and 'Value' in text)
-            
-            main_value = None
-            info_1 = None
-            info_2 = None
+            main_value, info_1, info_2 = extract_denomination(soup)
             alt_value = None
-            
-            # If we find the Value cell
-            if value_header:
-                value_td = value_header.find_next_sibling('td')
-                
-                if value_td:
-                    raw_text = value_td.get_text(separator='\n', strip=True)
-                    
-                    # 1. Unescape HTML
-                    cleaned_text = html.unescape(raw_text)
-                    
-                    # 2. Normalize Unicode using NFC (Critical for preserving ½)
-                    cleaned_text = unicodedata.normalize("NFC", cleaned_text)
-                    
-                    # 3. Clean spaces
-                    cleaned_text = cleaned_text.replace('\xa0', ' ').strip()
-                    
-                    # 4. Extract Parenthesis Content -> info_1
-                    match = re.search(r'\((.*?)\)', cleaned_text, re.DOTALL)
-                    if match:
-                        info_1 = match.group(1).strip()
-                        cleaned_text = cleaned_text.replace(match.group(0), ' ').strip()
-                    
-                    # 5. Split lines -> info_2
-                    lines = [line.strip() for line in cleaned_text.split('\n') if line.strip()]
-                    if lines:
-                        main_value = lines[0]
-                        if len(lines) > 1:
-                            info_2 = ' '.join(lines[1:])
-            
+
             # If no value found in HTML, main_value remains None.
             # We skip validation/calc if main_value is None, BUT
             # we might want to carry over existing DB value? 
@@ -1,7 +1,17 @@
 import os
+import sys
 import sqlite3
-import re
-from bs4 import BeautifulSoup
+
+# Shared HTML parser factory (scrappers/shared)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "shared"))
+from html_parser_functions import make_soup
+from characteristics_functions import extract_characteristics
+
+def extract_dimensions(soup):
+    """(value, info, raw text) of the weight, diameter and thickness, flattened in that order."""
+    fields = extract_characteristics(soup, ["weight", "diameter", "thickness"])
+    missing = (None, None, None)
+    return (fields["weight"] or missing) + (fields["diameter"] or missing) + (fields["thickness"] or missing)
 
 def main():
     # Paths
@@ -61,61 +71,8 @@ def main():
                 print(f"Error reading {coin_html_path}: {e}")
                 continue
                 
-            soup = BeautifulSoup(html_content, 'html.parser')
-            # Helper to parse fields
-            def parse_field(field_name, unit_suffix):
-                # Find th with text
-                th = soup.find('th', string=lambda text: text and field_name in text)
-                if not th:
-                    return None, None, None
-
-                td = th.find_next_sibling('td')
-                if not td:
-                    return None, None, None
-
-                raw_text = td.get_text(strip=True)
-                if not raw_text:
-                    return None, None, None
-                
-                # Check for parenthesis info
-                info_val = None
-                numeric_val = None
-                
-                # Regex to find parenthesis content
-                match_info = re.search(r'\((.*?)\)', raw_text)
-                if match_info:
-                    info_val = match_info.group(1).strip()
-                    # Remove the info from raw text for numeric parsing
-                    raw_text_clean = re.sub(r'\(.*?\)', '', raw_text).strip()
-                else:
-                    raw_text_clean = raw_text
-
-                # Attempt to parse numeric
-                # Remove unit suffix if present
-                if unit_suffix and raw_text_clean.endswith(unit_suffix):
-                    val_str = raw_text_clean[:-len(unit_suffix)].strip()
-                else:
-                    val_str = raw_text_clean.strip()
-
-                try:
-                    # Replace comma with dot just in case, though example showed 1.3
-                    val_str = val_str.replace(',', '.')
-                    if val_str:
-                         numeric_val = float(val_str)
-                except ValueError:
-                    # Failed to parse numeric
-                    pass
-                
-                return numeric_val, info_val, raw_text
-
-            # 1. Weight (g)
-            weight, weight_info, weight_raw = parse_field("Weight", "g")
-            
-            # 2. Diameter (mm) -> column 'diametre'
-            diameter, diameter_info, diameter_raw = parse_field("Diameter", "mm")
-            
-            # 3. Thickness (mm)
-            thickness, thickness_info, thickness_raw = parse_field("Thickness", "mm")
+            soup = make_soup(html_content)
+            weight, weight_info, weight_raw, diameter, diameter_info, diameter_raw, thickness, thickness_info, thickness_raw = extract_dimensions(soup)
 
             # Update DB logic
             
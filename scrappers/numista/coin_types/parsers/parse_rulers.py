@@ -1,7 +1,15 @@
 import os
+import sys
 import sqlite3
-import re
-from bs4 import BeautifulSoup
+
+# Shared HTML parser factory (scrappers/shared)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "shared"))
+from html_parser_functions import make_soup
+from characteristics_functions import extract_characteristics
+
+def extract_rulers(soup):
+    """Ruler links of the characteristics section: [{ruler_id, ruler_name, alt_period_name, period_years, extra}]."""
+    return extract_characteristics(soup, ["rulers"])["rulers"] or []
 
 def main():
     # Paths
@@ -70,132 +78,86 @@ def main():
                 print(f"Error reading {coin_html_path}: {e}")
                 continue
                 
-            soup = BeautifulSoup(html_content, 'html.parser')
+            soup = make_soup(html_content)
             
-            # Find section id="fiche_caracteristiques"
-            section = soup.find('section', id="fiche_caracteristiques")
-            if not section:
-                continue
+            for ruler in extract_rulers(soup):
+                ruler_id = ruler["ruler_id"]
+                ruler_name = ruler["ruler_name"]
+                alt_period_name = ruler["alt_period_name"]
+                period_years = ruler["period_years"]
+                extra = ruler["extra"]
+
+                # Lookup issuer_id for this coin_type
+                cursor.execute("SELECT issuer_id FROM coin_types WHERE id = ?", (coin_type_id,))
+                row = cursor.fetchone()
                 
-            # Find table row with ruler link
-            # Look for <a> with href containing "ruler.php?id=" inside the section
-            # The structure is usually <tr><th>Title</th><td><a>...</a></td></tr>
-            # We search specifically for the link.
-            ruler_links = section.select('a[href*="/catalogue/ruler.php?id="]')
-            
-            for ruler_link in ruler_links:
-                href = ruler_link.get('href')
-                # Parse ruler_id
-                match = re.search(r'id=(\d+)', href)
-                if match:
-                    ruler_id = int(match.group(1))
-                    
-                    # Parse period_years from span
-                    # Example: <span dir="ltr">(<em>1901-1910</em>)</span>
-                    # We need to find the span relative to the current ruler_link
-                    # Note: BeautifulSoup object extraction modifies the tree, so finding span inside the element 
-                    # before modifying it is important. However, 'ruler_link' is a tag object.
-                    span = ruler_link.find('span')
-                    period_years = ""
-                    if span:
-                        period_years = span.get_text(strip=True)
-                        if period_years.startswith('(') and period_years.endswith(')'):
-                            period_years = period_years[1:-1].strip()
-                        # Remove the span from the link to extract just the ruler name
-                        # Be careful if we are iterating, modifying the tree might affect things if not careful,
-                        # but here we are modifying the 'ruler_link' subtree which is fine.
-                        span.extract()
+                if row:
+                    issuer_id = row[0]
+                    if issuer_id is not None:
+                        # --- 1. Insert/Get ID from issuers_rulers_rel_new ---
                         
-                    ruler_name = ruler_link.get_text(strip=True)
-                    alt_period_name = None
-                    extra = None
-
-                    # 1. Clean period_name: Move content in () to alt_period_name
-                    if ruler_name and ruler_name.strip().endswith(')'):
-                        match = re.search(r'^(.*)\(([^)]+)\)$', ruler_name.strip())
-                        if match:
-                            ruler_name = match.group(1).strip()
-                            alt_period_name = match.group(2).strip()
-
-                    # 2. Handle hierarchy separator: "Context › Name"
-                    if ruler_name and '›' in ruler_name:
-                        parts = ruler_name.split('›')
-                        # Assuming the last part is the name, and everything before is context
-                        ruler_name = parts[-1].strip()
-                        extra = '›'.join(parts[:-1]).strip()
-                    
-                    
-                    # Lookup issuer_id for this coin_type
-                    cursor.execute("SELECT issuer_id FROM coin_types WHERE id = ?", (coin_type_id,))
-                    row = cursor.fetchone()
-                    
-                    if row:
-                        issuer_id = row[0]
-                        if issuer_id is not None:
-                            # --- 1. Insert/Get ID from issuers_rulers_rel_new ---
+                        # Check if record already exists in issuers_rulers_rel_new
+                        # Use ruler_id, period_years
+                        cursor.execute("SELECT id FROM issuers_rulers_rel_new WHERE issuer_id = ? AND ruler_id = ? AND period_years = ?", (issuer_id, ruler_id, period_years))
+                        exists = cursor.fetchone()
+                        
+                        ruling_authority_id = None
+                        
+                        if exists:
+                            ruling_authority_id = exists[0]
+                        else:
+                            cursor.execute("""
+                                INSERT INTO issuers_rulers_rel_new (issuer_id, ruler_id, ruling_authority, alt_ruling_authority, period_years, extra) 
+                                VALUES (?, ?, ?, ?, ?, ?)
+                            """, (issuer_id, ruler_id, ruler_name, alt_period_name, period_years, extra))
+                            ruling_authority_id = cursor.lastrowid
+                            count_inserted += 1
                             
-                            # Check if record already exists in issuers_rulers_rel_new
-                            # Use ruler_id, period_years
-                            cursor.execute("SELECT id FROM issuers_rulers_rel_new WHERE issuer_id = ? AND ruler_id = ? AND period_years = ?", (issuer_id, ruler_id, period_years))
-                            exists = cursor.fetchone()
+                        # --- 2. Insert into coin_type_ruling_authorities ---
+                        
+                        if ruling_authority_id:
+                            # Determine is_match
                             
-                            ruling_authority_id = None
+                            is_match = 0
                             
-                            if exists:
-                                ruling_authority_id = exists[0]
-                            else:
-                                cursor.execute("""
-                                    INSERT INTO issuers_rulers_rel_new (issuer_id, ruler_id, ruling_authority, alt_ruling_authority, period_years, extra) 
-                                    VALUES (?, ?, ?, ?, ?, ?)
-                                """, (issuer_id, ruler_id, ruler_name, alt_period_name, period_years, extra))
-                                ruling_authority_id = cursor.lastrowid
-                                count_inserted += 1
-                                
-                            # --- 2. Insert into coin_type_ruling_authorities ---
+                            # We need details from issuers table for the check
+                            cursor.execute("SELECT name, numista_name, numista_territory_type FROM issuers WHERE id = ?", (issuer_id,))
+                            issuer_row = cursor.fetchone()
                             
-                            if ruling_authority_id:
-                                # Determine is_match
+                            if issuer_row:
+                                i_name, i_numista_name, i_numista_territory_type = issuer_row
                                 
-                                is_match = 0
+                                # Construct variants for issuer_name
+                                variant1 = f"{i_numista_name}, {i_numista_territory_type}" if i_numista_territory_type else i_numista_name
+                                variant2 = i_numista_name
+                                variant3 = i_name
                                 
-                                # We need details from issuers table for the check
-                                cursor.execute("SELECT name, numista_name, numista_territory_type FROM issuers WHERE id = ?", (issuer_id,))
-                                issuer_row = cursor.fetchone()
+                                # Check for match in old table
+                                # Logic:
+                                # ruler_id = ruler_id
+                                # AND (years_text = period_years OR period_years IS Empty)
+                                # AND (issuer_name IN variants)
                                 
-                                if issuer_row:
-                                    i_name, i_numista_name, i_numista_territory_type = issuer_row
-                                    
-                                    # Construct variants for issuer_name
-                                    variant1 = f"{i_numista_name}, {i_numista_territory_type}" if i_numista_territory_type else i_numista_name
-                                    variant2 = i_numista_name
-                                    variant3 = i_name
-                                    
-                                    # Check for match in old table
-                                    # Logic:
-                                    # ruler_id = ruler_id
-                                    # AND (years_text = period_years OR period_years IS Empty)
-                                    # AND (issuer_name IN variants)
-                                    
-                                    p_years_val = period_years if period_years else ""
-                                    
-                                    query_match = """
-                                        SELECT 1 FROM issuers_rulers_rel 
-                                        WHERE ruler_id = ? 
-                                        AND (years_text = ? OR ? = '')
-                                        AND (issuer_name = ? OR issuer_name = ? OR issuer_name = ?)
-                                    """
-                                    cursor.execute(query_match, (ruler_id, p_years_val, p_years_val, variant1, variant2, variant3))
-                                    if cursor.fetchone():
-                                        is_match = 1
+                                p_years_val = period_years if period_years else ""
                                 
-                                # Insert into coin_type_ruling_authorities
-                                # Check existence first
-                                cursor.execute("SELECT 1 FROM coin_type_ruling_authorities WHERE coin_type_id = ? AND ruling_authority_id = ?", (coin_type_id, ruling_authority_id))
-                                if not cursor.fetchone():
-                                    cursor.execute("""
-                                        INSERT INTO coin_type_ruling_authorities (coin_type_id, ruling_authority_id, is_match)
-                                        VALUES (?, ?, ?)
-                                    """, (coin_type_id, ruling_authority_id, is_match))
+                                query_match = """
+                                    SELECT 1 FROM issuers_rulers_rel 
+                                    WHERE ruler_id = ? 
+                                    AND (years_text = ? OR ? = '')
+                                    AND (issuer_name = ? OR issuer_name = ? OR issuer_name = ?)
+                                """
+                                cursor.execute(query_match, (ruler_id, p_years_val, p_years_val, variant1, variant2, variant3))
+                                if cursor.fetchone():
+                                    is_match = 1
+                            
+                            # Insert into coin_type_ruling_authorities
+                            # Check existence first
+                            cursor.execute("SELECT 1 FROM coin_type_ruling_authorities WHERE coin_type_id = ? AND ruling_authority_id = ?", (coin_type_id, ruling_authority_id))
+                            if not cursor.fetchone():
+                                cursor.execute("""
+                                    INSERT INTO coin_type_ruling_authorities (coin_type_id, ruling_authority_id, is_match)
+                                    VALUES (?, ?, ?)
+                                """, (coin_type_id, ruling_authority_id, is_match))
 
     print(f"Finished processing {count_processed} coins.")
     print(f"Total new records inserted into issuers_rulers_rel_new: {count_inserted}")
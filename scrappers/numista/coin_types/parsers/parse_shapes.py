@@ -1,7 +1,16 @@
 import os
+import sys
 import sqlite3
 import re
-from bs4 import BeautifulSoup
+
+# Shared HTML parser factory (scrappers/shared)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "shared"))
+from html_parser_functions import make_soup
+from characteristics_functions import extract_characteristics
+
+def extract_shape(soup):
+    """Text of the Shape cell of a coin type page, or None."""
+    return extract_characteristics(soup, ["shape"])["shape"]
 
 def main():
     # Paths
@@ -63,32 +72,21 @@ def main():
                 print(f"Error reading {coin_html_path}: {e}")
                 continue
                 
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Find Shape in table
-            # Looking for <tr><th>Shape</th><td>Round</td></tr>
-            # We can search for the 'th' with text "Shape" and get the next sibling 'td'
-            
-            shape_th = soup.find('th', string=lambda text: text and 'Shape' in text)
-            if shape_th:
-                shape_td = shape_th.find_next_sibling('td')
-                if shape_td:
-                    shape_text = shape_td.get_text(strip=True)
-                    
-                    if shape_text:
-                        lookup_key = shape_text.lower()
-                        
-                        if lookup_key in shapes_map:
-                            shape_id = shapes_map[lookup_key]
-                            
-                            # Update coin_types
-                            cursor.execute("UPDATE coin_types SET shape_id = ? WHERE id = ?", (shape_id, coin_type_id))
-                            count_updated += 1
-                        else:
-                            # Log exception to table
-                            # Check if already exists to avoid dupes? Or just insert? User just said "write records".
-                            # Let's simple insert.
-                            cursor.execute("INSERT INTO shape_exceptions (coin_type_id, shape) VALUES (?, ?)", (coin_type_id, shape_text))
+            soup = make_soup(html_content)
+            shape_text = extract_shape(soup)
+
+            if shape_text:
+                lookup_key = shape_text.lower()
+
+                if lookup_key in shapes_map:
+                    shape_id = shapes_map[lookup_key]
+
+                    # Update coin_types
+                    cursor.execute("UPDATE coin_types SET shape_id = ? WHERE id = ?", (shape_id, coin_type_id))
+                    count_updated += 1
+                else:
+                    # Log exception to table
+                    cursor.execute("INSERT INTO shape_exceptions (coin_type_id, shape) VALUES (?, ?)", (coin_type_id, shape_text))
 
     print(f"Finished processing {count_processed} coins.")
     print(f"Total coin types updated with shape: {count_updated}")
@@ -1,7 +1,16 @@
 import os
+import sys
 import sqlite3
 import re
-from bs4 import BeautifulSoup
+
+# Shared HTML parser factory (scrappers/shared)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "shared"))
+from html_parser_functions import make_soup
+from characteristics_functions import extract_characteristics
+
+def extract_size(soup):
+    """(size without its mm unit, raw text of the Size cell) of a coin type page, or (None, None)."""
+    return extract_characteristics(soup, ["size"])["size"] or (None, None)
 
 def main():
     # Paths
@@ -62,69 +71,26 @@ def main():
                 print(f"Error reading {coin_html_path}: {e}")
                 continue
                 
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Find Size in table
-            # <tr><th>Size</th><td>...</td></tr>
-            # OR first td is 'Size'
-            
-            size_header = soup.find('th', string=lambda text: text and 'Size' in text)
-            
-            # If not found in th, try first td (sometimes headers are tds in older layouts or different tables?)
-            # User said: "<tr> with <th> or first <td> having text 'Size'"
-            if not size_header:
-                size_header = soup.find('td', string=lambda text: text and 'Size' in text)
-                
-                # Verify it is indeed the 'header' cell (e.g. previous sibling is None or it's the first child)
-                # But simple text match might be enough for now given typical Numista layout
-            
-            if size_header:
-                # Value is in the next td
-                # If size_header is th, next sibling td
-                # If size_header is td, next sibling td
-                
-                value_td = size_header.find_next_sibling('td')
-                
-                if value_td:
-                    raw_text = value_td.get_text(strip=True)
-                    # Replace nbsp
-                    cleaned_text = raw_text.replace('\xa0', ' ').replace('&nbsp;', ' ').strip()
-                    
-                    # Logic: Try to parse out value
-                    # Default unit "mm". 
-                    # If text ends with "mm", remove it.
-                    
-                    final_value = cleaned_text
-                    
-                    # Store raw text for exception logging if needed??
-                    # User: "try to parse out the string... insert into size field... If ... issue ... write ... raw text into parse_exceptions"
-                    
-                    # I will assume "issue" means if we fail to extract a clean value?
-                    # But text extraction usually works.
-                    # Let's clean the unit.
-                    
-                    is_mm = False
-                    if final_value.lower().endswith("mm"):
-                        final_value = final_value[:-2].strip()
-                        is_mm = True
-                    
-                    # If it was empty or weird?
-                    if not final_value:
-                         continue
+            soup = make_soup(html_content)
+            final_value, raw_text = extract_size(soup)
+
+            # If it was empty or weird?
+            if not final_value:
+                continue
 
-                    # Update DB
-                    try:
-                        cursor.execute("UPDATE coin_types SET size = ? WHERE id = ?", (final_value, coin_type_id))
-                        count_updated += 1
-                        
-                    except Exception as db_err:
-                        # Log to parse_exceptions
-                        print(f"Error updating DB for coin {coin_type_id}: {db_err}")
-                        try:
-                            cursor.execute("INSERT OR REPLACE INTO parse_exceptions (coin_type_id, size) VALUES (?, ?)", (coin_type_id, raw_text))
-                            count_exceptions += 1
-                        except:
-                            pass
+            # Update DB
+            try:
+                cursor.execute("UPDATE coin_types SET size = ? WHERE id = ?", (final_value, coin_type_id))
+                count_updated += 1
+                
+            except Exception as db_err:
+                # Log to parse_exceptions
+                print(f"Error updating DB for coin {coin_type_id}: {db_err}")
+                try:
+                    cursor.execute("INSERT OR REPLACE INTO parse_exceptions (coin_type_id, size) VALUES (?, ?)", (coin_type_id, raw_text))
+                    count_exceptions += 1
+                except:
+                    pass
 
     print(f"Finished processing {count_processed} coins.")
     print(f"Total coin types updated with size: {count_updated}")
@@ -0,0 +1,198 @@
+import sqlite3
+import os
+import threading
+import time
+import uuid
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+class WorkQueueDbHelper:
+    """
+    Crawl work queue shared by several scraper nodes, in Postgres (dsn, e.g. the mintada_db
+    server) or in a SQLite file (sqlite_path, for several processes on one host).
+
+    crawl_tasks holds listing pages ("page:<issuer>:<page>") and coin types ("coin:<id>").
+    A worker claims a task with a lease: the task is its own until lease_expires_at, which
+    its heartbeat keeps pushing forward. A node that dies stops heartbeating, the lease runs
+    out and the next claim hands the task to another worker. Enqueueing and completing are
+    idempotent, so a task that ran twice after a lost lease is harmless.
+    Lease times come from the workers' clocks; the nodes are expected to run NTP.
+    """
+    PENDING = "pending"
+    LEASED = "leased"
+    DONE = "done"
+    FAILED = "failed"
+
+    PAGE = "page"
+    COIN = "coin"
+
+    def __init__(self, dsn=None, sqlite_path=None, max_attempts=3, retry_delay=60):
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+
+        if dsn:
+            if psycopg2 is None:
+                raise RuntimeError("A Postgres work queue needs psycopg2 (pip install psycopg2-binary)")
+            self.is_postgres = True
+            self.db_connection = psycopg2.connect(dsn)
+        else:
+            self.is_postgres = False
+            self.db_path = sqlite_path or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "work_queue.db")
+            # Transactions are opened explicitly (BEGIN IMMEDIATE) so a claim is one atomic step
+            self.db_connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            self.db_connection.execute("PRAGMA journal_mode = WAL")
+
+        self._run("""
+            CREATE TABLE IF NOT EXISTS crawl_tasks (
+                task_key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                issuer_url_slug TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                coin_type_id INTEGER,
+                payload TEXT,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                lease_owner TEXT,
+                lease_token TEXT,
+                lease_expires_at DOUBLE PRECISION,
+                updated_at DOUBLE PRECISION NOT NULL
+            )
+        """)
+        self._run("CREATE INDEX IF NOT EXISTS crawl_tasks_state ON crawl_tasks(state, kind)")
+
+    def _sql(self, sql):
+        return sql.replace("?", "%s") if self.is_postgres else sql
+
+    def _run(self, sql, params=(), fetch=None):
+        """Run one statement in its own transaction; fetch is None, "one" or "all". Returns (rows, rowcount)."""
+        with self._lock:
+            if self.is_postgres:
+                with self.db_connection, self.db_connection.cursor() as cur:
+                    cur.execute(self._sql(sql), params)
+                    rows = cur.fetchone() if fetch == "one" else cur.fetchall() if fetch == "all" else None
+                    return rows, cur.rowcount
+            cur = self.db_connection.execute(sql, params)
+            rows = cur.fetchone() if fetch == "one" else cur.fetchall() if fetch == "all" else None
+            return rows, cur.rowcount
+
+    def _add(self, task_key, kind, issuer_url_slug, page, coin_type_id=None, payload=None):
+        _, rowcount = self._run("""
+            INSERT INTO crawl_tasks (task_key, kind, issuer_url_slug, page, coin_type_id, payload, state, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(task_key) DO NOTHING
+        """, (task_key, kind, issuer_url_slug, page, coin_type_id, payload, WorkQueueDbHelper.PENDING, time.time()))
+        return rowcount == 1
+
+    def add_page(self, issuer_url_slug, page, payload=None):
+        """Queue a listing page. False when it is already queued or done."""
+        return self._add(f"page:{issuer_url_slug}:{page}", WorkQueueDbHelper.PAGE, issuer_url_slug, page, None, payload)
+
+    def add_coin(self, issuer_url_slug, page, coin_type_id, payload):
+        """Queue a coin type found on a listing page; payload is what the worker needs to process it (JSON)."""
+        return self._add(f"coin:{coin_type_id}", WorkQueueDbHelper.COIN, issuer_url_slug, page, coin_type_id, payload)
+
+    def claim(self, owner, lease_seconds):
+        """
+        Lease the next task: coin types before listing pages (keeps the queue short), pending
+        tasks, leases that ran out and failed tasks due for a retry. Returns a dict or None.
+        """
+        now = time.time()
+        token = uuid.uuid4().hex
+        claimable = """
+            state = ?
+            OR (state = ? AND lease_expires_at < ?)
+            OR (state = ? AND attempts < ? AND updated_at < ?)
+        """
+        claimable_params = (WorkQueueDbHelper.PENDING, WorkQueueDbHelper.LEASED, now,
+                            WorkQueueDbHelper.FAILED, self.max_attempts, now - self.retry_delay)
+        update = """
+            UPDATE crawl_tasks SET state = ?, attempts = attempts + 1, lease_owner = ?, lease_token = ?,
+                lease_expires_at = ?, updated_at = ?
+            WHERE task_key = ?
+        """
+        columns = "task_key, kind, issuer_url_slug, page, coin_type_id, payload, state"
+
+        with self._lock:
+            if self.is_postgres:
+                # SKIP LOCKED: concurrent claimers each get a different row without waiting
+                with self.db_connection, self.db_connection.cursor() as cur:
+                    cur.execute(self._sql(f"""
+                        SELECT {columns} FROM crawl_tasks WHERE {claimable}
+                        ORDER BY (kind = 'page'), updated_at LIMIT 1 FOR UPDATE SKIP LOCKED
+                    """), claimable_params)
+                    row = cur.fetchone()
+                    if row is not None:
+                        cur.execute(self._sql(update), (WorkQueueDbHelper.LEASED, owner, token, now + lease_seconds, now, row[0]))
+            else:
+                cur = self.db_connection.cursor()
+                cur.execute("BEGIN IMMEDIATE")
+                try:
+                    row = cur.execute(f"""
+                        SELECT {columns} FROM crawl_tasks WHERE {claimable}
+                        ORDER BY (kind = 'page'), updated_at LIMIT 1
+                    """, claimable_params).fetchone()
+                    if row is not None:
+                        cur.execute(update, (WorkQueueDbHelper.LEASED, owner, token, now + lease_seconds, now, row[0]))
+                    cur.execute("COMMIT")
+                except BaseException:
+                    cur.execute("ROLLBACK")
+                    raise
+
+        if row is None:
+            return None
+        task = dict(zip(("task_key", "kind", "issuer_url_slug", "page", "coin_type_id", "payload"), row))
+        task["token"] = token
+        task["reclaimed"] = row[6] == WorkQueueDbHelper.LEASED
+        return task
+
+    def heartbeat(self, tokens, lease_seconds):
+        """Extend the leases still held under tokens; returns how many were extended."""
+        if not tokens:
+            return 0
+        now = time.time()
+        placeholders = ", ".join("?" for _ in tokens)
+        _, rowcount = self._run(f"""
+            UPDATE crawl_tasks SET lease_expires_at = ?
+            WHERE state = ? AND lease_token IN ({placeholders})
+        """, (now + lease_seconds, WorkQueueDbHelper.LEASED, *tokens))
+        return rowcount
+
+    def complete(self, task_key):
+        """Mark a task done, whoever holds its lease. Completing it again is a no-op (returns False)."""
+        _, rowcount = self._run("""
+            UPDATE crawl_tasks SET state = ?, lease_token = NULL, lease_expires_at = NULL, updated_at = ?
+            WHERE task_key = ? AND state != ?
+        """, (WorkQueueDbHelper.DONE, time.time(), task_key, WorkQueueDbHelper.DONE))
+        return rowcount == 1
+
+    def fail(self, task_key, token, error):
+        """Record a failed attempt, unless the lease has meanwhile passed to another worker."""
+        self._run("""
+            UPDATE crawl_tasks SET state = ?, last_error = ?, lease_token = NULL, lease_expires_at = NULL, updated_at = ?
+            WHERE task_key = ? AND lease_token = ?
+        """, (WorkQueueDbHelper.FAILED, str(error), time.time(), task_key, token))
+
+    def has_open_tasks(self):
+        """True while something is pending, leased or left to retry (a leased page may still queue coins)."""
+        row, _ = self._run("""
+            SELECT 1 FROM crawl_tasks WHERE state IN (?, ?) OR (state = ? AND attempts < ?) LIMIT 1
+        """, (WorkQueueDbHelper.PENDING, WorkQueueDbHelper.LEASED, WorkQueueDbHelper.FAILED, self.max_attempts), fetch="one")
+        return row is not None
+
+    def get_counts(self):
+        """{(kind, state): count}"""
+        rows, _ = self._run("SELECT kind, state, COUNT(*) FROM crawl_tasks GROUP BY kind, state", fetch="all")
+        return {(kind, state): count for kind, state, count in rows}
+
+    def reset(self):
+        """Empty the queue so the next seed starts a new crawl."""
+        self._run("DELETE FROM crawl_tasks")
+
+    def close(self):
+        with self._lock:
+            self.db_connection.close()
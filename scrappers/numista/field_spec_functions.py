@@ -0,0 +1,139 @@
+import re
+from bs4 import Tag, NavigableString
+
+class FieldSpec:
+    """
+    One field of a page: where it is and how its value is read. A spec has exactly one locator:
+
+        element_id  the first element with this id (of tag_name, if given)
+        label       the first table cell whose text contains the label; cells are the cell names
+                    tried in order of preference, and the located node is the <td> after that cell
+        heading     (section id, prefix): the first <h3> of that <section> whose text starts with prefix
+        text        the first string of the page containing this text
+
+    extract(node) reads the value from the located node and normalize(value), if given, cleans it.
+    A field that is not on the page is None; neither function is called for it.
+    """
+    def __init__(self, name, extract, normalize=None, element_id=None, tag_name=None, label=None, cells=("th",), heading=None, text=None):
+        if sum(locator is not None for locator in (element_id, label, heading, text)) != 1:
+            raise ValueError(f"Field {name} needs exactly one of element_id, label, heading or text")
+        self.name = name
+        self.extract = extract
+        self.normalize = normalize
+        self.element_id = element_id
+        self.tag_name = tag_name
+        self.label = label
+        self.cells = cells
+        self.heading = heading
+        self.text = text
+
+class FieldMatcher:
+    """
+    FieldSpecs compiled into lookups that find every field in a single walk of the page, instead
+    of one soup.find() per field. The walk stops as soon as every field is located, so adding a
+    field adds a dictionary or regex check per node rather than another traversal.
+    """
+    def __init__(self, fields):
+        self.fields = list(fields)
+        self._ids = {}
+        self._labels = {}
+        self._headings = []
+        self._texts = {}
+        for spec in self.fields:
+            if spec.element_id is not None:
+                self._ids.setdefault(spec.element_id, []).append(spec)
+            elif spec.label is not None:
+                self._labels.setdefault(spec.label, []).append(spec)
+            elif spec.heading is not None:
+                self._headings.append(spec)
+            else:
+                self._texts.setdefault(spec.text, []).append(spec)
+
+        self._cell_names = {cell for spec in self.fields if spec.label is not None for cell in spec.cells}
+        self._label_regex = FieldMatcher._any_of(self._labels)
+        self._text_regex = FieldMatcher._any_of(self._texts)
+
+    @staticmethod
+    def _any_of(keys):
+        return re.compile("|".join(re.escape(key) for key in keys)) if keys else None
+
+    @staticmethod
+    def _in_section(node, section_id):
+        return any(parent.name == "section" and parent.get("id") == section_id for parent in node.parents)
+
+    def locate(self, soup):
+        """{field name: located node} for the fields found on the page, in one walk of soup."""
+        found = {}
+        label_cells = {}  # (field name, cell name) -> first cell with the label
+        remaining = {spec.name for spec in self.fields}
+
+        for node in soup.descendants:
+            if isinstance(node, Tag):
+                specs = self._ids.get(node.get("id")) if self._ids else None
+                if specs:
+                    for spec in specs:
+                        if spec.name not in found and (spec.tag_name is None or spec.tag_name == node.name):
+                            found[spec.name] = node
+                            remaining.discard(spec.name)
+
+                if node.name in self._cell_names:
+                    cell_text = node.string
+                    if cell_text and self._label_regex.search(cell_text):
+                        for label, specs in self._labels.items():
+                            if label not in cell_text:
+                                continue
+                            for spec in specs:
+                                if node.name in spec.cells and (spec.name, node.name) not in label_cells:
+                                    label_cells[(spec.name, node.name)] = node
+                                    if node.name == spec.cells[0]:
+                                        remaining.discard(spec.name)
+
+                elif node.name == "h3" and self._headings:
+                    heading_text = None
+                    for spec in self._headings:
+                        section_id, prefix = spec.heading
+                        if spec.name in found or not FieldMatcher._in_section(node, section_id):
+                            continue
+                        if heading_text is None:
+                            heading_text = node.get_text(strip=True).lower()
+                        if heading_text.startswith(prefix.lower()):
+                            found[spec.name] = node
+                            remaining.discard(spec.name)
+
+            elif self._text_regex is not None and isinstance(node, NavigableString) and self._text_regex.search(node):
+                for text, specs in self._texts.items():
+                    if text in node:
+                        for spec in specs:
+                            if spec.name not in found:
+                                found[spec.name] = node
+                                remaining.discard(spec.name)
+
+            if not remaining:
+                break
+
+        for specs in self._labels.values():
+            for spec in specs:
+                for cell in spec.cells:
+                    header = label_cells.get((spec.name, cell))
+                    if header is not None:
+                        # Only the preferred cell that was found counts, even without a value next to it
+                        value_cell = header.find_next_sibling("td")
+                        if value_cell is not None:
+                            found[spec.name] = value_cell
+                        break
+        return found
+
+    def extract(self, soup, names=None):
+        """{field name: value} for all the fields, or for names; None for the fields not on the page."""
+        located = self.locate(soup)
+        values = {}
+        for spec in self.fields:
+            if names is not None and spec.name not in names:
+                continue
+            node = located.get(spec.name)
+            if node is None:
+                values[spec.name] = None
+                continue
+            value = spec.extract(node)
+            values[spec.name] = spec.normalize(value) if spec.normalize is not None else value
+        return values
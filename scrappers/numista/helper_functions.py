@@ -1,10 +1,12 @@
-from bs4 import BeautifulSoup, Tag, NavigableString
+from bs4 import Tag, NavigableString, CData
 import re
 from urllib.parse import urljoin, urlparse, parse_qs
 from pathlib import Path
 from curl_cffi import requests as creq
 from curl_cffi import requests as creq
 from basic_functions import *
+from html_parser_functions import make_soup
+from field_spec_functions import FieldSpec, FieldMatcher
 import os
 
 ALNUM = re.compile(r"[A-Za-z0-9]")
@@ -102,13 +104,28 @@ def _text_after_strong(p: Tag) -> str:
     # no <strong>: just plain text
     return p.get_text(" ", strip=True)
 
-def _strong_value_pair(container: Tag, key: str) -> str:
-    """Find a label text (like 'Rarity index') and return the <strong> value following it."""
-    label_node = container.find(string=lambda t: key in t)
-    if not label_node:
-        return ""
-    strong = label_node.find_next("strong")
-    return strong.get_text(strip=True) if strong else None
+def _split_on_double_br(node: Tag) -> list[str]:
+    """Text of node cut at every run of two or more <br>, read from the tree instead of re-parsing its HTML."""
+    parts, current, brs = [], [], 0
+    for el in node.descendants:
+        if isinstance(el, Tag):
+            if el.name == "br":
+                brs += 1
+            continue
+        # Same strings as get_text(): no comments, doctypes...
+        if el.__class__ not in (NavigableString, CData):
+            continue
+        text = el.strip()
+        if not text:
+            continue
+        if brs >= 2 and current:
+            parts.append(" ".join(current))
+            current = []
+        brs = 0
+        current.append(text)
+    if current:
+        parts.append(" ".join(current))
+    return parts
 
 def _collect_face_descriptions(h3: Tag) -> list[str]:
     desc = []
@@ -135,12 +152,7 @@ def _collect_face_descriptions(h3: Tag) -> list[str]:
                             div.decompose()
                 
                 # If the paragraph contains double (or more) <br>, split into separate descriptions.
-                html = sib.decode_contents()
-                parts = [p.strip() for p in re.split(r'(?:<br\s*/?>\s*){2,}', html, flags=re.I) if p.strip()]
-                for part in parts:
-                    t = BeautifulSoup(part, "html.parser").get_text(" ", strip=True)
-                    if t:
-                        desc.append(t)
+                desc.extend(_split_on_double_br(sib))
             elif sib.name == "h3":
                 break  # next face section begins
     return desc
@@ -188,7 +200,7 @@ def _parse_engravers(p: Tag) -> list[str]:
     if not p:
         return []
 
-    p_clone = p.__copy__() if hasattr(p, "__copy__") else BeautifulSoup(str(p), "html.parser").p
+    p_clone = p.__copy__() if hasattr(p, "__copy__") else make_soup(str(p)).p
     strong = p_clone.find("strong")
     if strong:
         strong.decompose()
@@ -221,7 +233,7 @@ def _parse_comments_structured(comments_div):
         """Create a structured segment from HTML content."""
         if not content:
             return None
-        soup = BeautifulSoup(content, "html.parser")
+        soup = make_soup(content)
         text = " ".join(soup.stripped_strings)
         img = soup.find("img")
         a = soup.find("a")
@@ -255,17 +267,6 @@ def _parse_comments_structured(comments_div):
     
     return results
     
-def _find_description_h3(section: Tag, paragraph_name: str) -> Tag | None:
-    target = paragraph_name.lower()
-    if section is None:
-        return None
-        
-    for h in section.find_all("h3"):
-        text = h.get_text(strip=True).lower()
-        if text.startswith(target):   # matches both 'Mint' and 'Mints'
-            return h
-    return None   
-
 def _section_siblings(h3):
     """Yield element siblings after h3 until the next <h3>."""
     for sib in h3.next_siblings:
@@ -301,19 +302,220 @@ def extract_filename_from_url(url: str, strip_original: bool = False) -> str | N
             
     return filename
 
+def _links_by_filename(root: Tag) -> dict:
+    """
+    Index the <a href> elements under root by the file name of their href, in one traversal.
+    Returns {file name: [(position in the document, anchor), ...]}.
+    """
+    links = {}
+    for position, a in enumerate(root.find_all("a", href=True)):
+        filename = extract_filename_from_url(a["href"])
+        if filename:
+            links.setdefault(filename, []).append((position, a))
+    return links
+
+def _first_link(links: dict, *filenames) -> Tag | None:
+    """The first anchor in document order of a _links_by_filename() index that points at one of filenames."""
+    candidates = [links[name][0] for name in filenames if name in links]
+    return min(candidates, key=lambda candidate: candidate[0])[1] if candidates else None
+
+def _coin_type_title(main_title: Tag):
+    """(title, subtitle) of the <h1> of the main title: the text before its inline <span>, and the span."""
+    title_h1 = main_title.find("h1")
+    if title_h1 is None:
+        return None, None
+
+    # subtitle = text inside the first <span> (if any)
+    span = title_h1.find("span")
+    subtitle = basic_helper.clean_text(span.get_text(" ", strip=True)) if span else None
+
+    # title = text up to (but not including) that <span>, preserving punctuation/spaces
+    title_chunks = []
+    for child in title_h1.children:
+        if isinstance(child, NavigableString):
+            title_chunks.append(str(child))
+        elif isinstance(child, Tag):
+            if child.name == "span":
+                break  # stop at subtitle
+            title_chunks.append(child.get_text(" ", strip=True))
+    title = basic_helper.clean_text("".join(title_chunks)) if title_chunks else None
+    return title, subtitle
+
+def _reference_image_entry(fiche_photo: Tag | None) -> dict:
+    """The catalogue obverse/reverse pictures (image_type 1); both None without a photo block."""
+    main_image_entry = {
+        "obverse_image": None,
+        "reverse_image": None,
+        "image_type": 1
+    }
+
+    valid_links = []
+    for a in (fiche_photo.select("a.coin_pic") if fiche_photo else []):
+        img = a.find("img")
+        if not img:
+            continue
+
+        src = img.get("src", "")
+        if "no-obverse" in src or "no-reverse" in src:
+            continue
+        valid_links.append(a)
+
+    if len(valid_links) == 2:
+        obverse_a = valid_links[0]
+        reverse_a = valid_links[1]
+
+        main_image_entry["obverse_image"] = extract_filename_from_url(obverse_a["href"], strip_original=True) if obverse_a.has_attr("href") else None
+        main_image_entry["reverse_image"] = extract_filename_from_url(reverse_a["href"], strip_original=True) if reverse_a.has_attr("href") else None
+    else:
+        for idx, a in enumerate(valid_links):
+            img = a.find("img")
+            # img is guaranteed to exist because of valid_links filter
+
+            # Decide kind
+            kind = None
+            alt_lc = (img.get("alt") or "").lower()
+
+            if alt_lc.endswith("obverse"):
+                kind = "obverse"
+            elif alt_lc.endswith("reverse"):
+                kind = "reverse"
+            else:
+                # fallback by order: 1st -> obverse, 2nd -> reverse
+                kind = "obverse" if idx == 0 else ("reverse" if idx == 1 else None)
+
+            image_name = extract_filename_from_url(a["href"], strip_original=True) if a.has_attr("href") else None
+
+            # Assign to the right field
+            if kind == "obverse":
+                main_image_entry["obverse_image"] = image_name
+            elif kind == "reverse":
+                main_image_entry["reverse_image"] = image_name
+
+    return main_image_entry
+
+def _edge_image(edge_h3: Tag) -> str | None:
+    """File name of the first picture after the Edge heading, without its -original suffix."""
+    for sib in _section_siblings(edge_h3):
+        image_url = None
+
+        # Check if sib itself is the <a> tag
+        if sib.name == "a" and sib.has_attr("href") and sib.find("img"):
+            image_url = sib["href"].strip()
+        else:
+            # Fallback to img
+            if sib.name == "img" and sib.has_attr("src"):
+                image_url = sib["src"].strip()
+
+        if image_url is not None:
+            found_filename = extract_filename_from_url(image_url, strip_original=True)
+            if found_filename:
+                return found_filename
+    return None
+
+def _example_image_entries(examples_div: Tag) -> list[dict]:
+    """One obverse/reverse entry (image_type 2) per example of the examples list."""
+    entries = []
+    for example_image_div in examples_div.find_all("div", class_="example_image"):
+        # Each should have 2 links (obverse/reverse)
+        links = [a for a in example_image_div.find_all("a", href=True) if a.find("img")]
+        if len(links) >= 2:
+            # Obverse is usually first, Reverse second
+            entries.append({
+                "obverse_image": extract_filename_from_url(links[0]["href"]),
+                "reverse_image": extract_filename_from_url(links[1]["href"]),
+                "image_type": 2
+            })
+        elif len(links) == 1:
+            # If only one image, use it for both
+            image = extract_filename_from_url(links[0]["href"])
+            entries.append({
+                "obverse_image": image,
+                "reverse_image": image,
+                "image_type": 2
+            })
+    return entries
+
+def _sales_image_entries(sales_table: Tag) -> list[dict]:
+    """One obverse/reverse entry (image_type 3) per sale with pictures."""
+    entries = []
+    for picture_td in sales_table.find_all("td", class_="sale_pictures"):
+        links = [a for a in picture_td.find_all("a", href=True) if a.find("img")]
+        if not links:
+            continue
+
+        obverse_image = extract_filename_from_url(links[0]["href"])
+        # A single picture is used for both faces
+        reverse_image = extract_filename_from_url(links[1]["href"]) if len(links) >= 2 else obverse_image
+
+        if obverse_image and reverse_image:
+            entries.append({
+                "obverse_image": obverse_image,
+                "reverse_image": reverse_image,
+                "image_type": 3
+            })
+    return entries
+
+def _comment_image_entries(comments_div: Tag) -> list[dict]:
+    """[{"image": file name, "source_type": 1 catalogue / 2 forum}] of the pictures in the comments."""
+    entries = []
+    for a in comments_div.find_all("a", href=True):
+        if not a.find("img"):
+            continue
+
+        href = a["href"]
+        image_name = extract_filename_from_url(href)
+        if image_name:
+            entries.append({
+                "image": image_name,
+                "source_type": 2 if "/forum/images/" in href else 1
+            })
+    return entries
+
+def _strong_after(label_node) -> str | None:
+    """Text of the first <strong> after a label, e.g. the value of 'Numista Rarity index'."""
+    strong = label_node.find_next("strong")
+    return strong.get_text(strip=True) if strong else None
+
+def _rarity_index(value) -> int | None:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+# Where each field of a coin type page is and how it is read; parse_coin_type_page() fills
+# out from a single walk of the page (see field_spec_functions.py)
+COIN_TYPE_PAGE_FIELDS = FieldMatcher([
+    FieldSpec("title", element_id="main_title", extract=_coin_type_title),
+    FieldSpec("reference_images", element_id="fiche_photo", extract=_reference_image_entry),
+    FieldSpec("edge_image", heading=("fiche_descriptions", "edge"), extract=_edge_image),
+    FieldSpec("example_images", element_id="examples_list", tag_name="div", extract=_example_image_entries),
+    FieldSpec("sales_images", element_id="sales_list", tag_name="table", extract=_sales_image_entries),
+    FieldSpec("comment_images", element_id="fiche_comments", tag_name="div", extract=_comment_image_entries),
+    FieldSpec("rarity_index", text="Numista Rarity index", extract=_strong_after, normalize=_rarity_index),
+])
+
 __all__ = [
     "_read_last_log_entry",
     "_parse_year_range",
     "_text_after_strong",
-    "_strong_value_pair",
     "_collect_face_descriptions",
     "_find_face_paragraph",
     "_parse_letterings",
     "_parse_engravers",
     "_parse_comments_structured",
-    "_find_description_h3",
     "_section_siblings",
     "extract_filename_from_url",
+    "_links_by_filename",
+    "_first_link",
+    "_coin_type_title",
+    "_reference_image_entry",
+    "_edge_image",
+    "_example_image_entries",
+    "_sales_image_entries",
+    "_comment_image_entries",
+    "_strong_after",
+    "_rarity_index",
+    "COIN_TYPE_PAGE_FIELDS",
 ]
 
 
@@ -3,12 +3,14 @@ import os
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'shared')))
 
 import re
+import argparse
 from basic_functions import *
+from html_parser_functions import make_soup, configure_html_parser, add_html_parser_argument
 from issuers_db_functions import *
 from urllib.parse import urljoin, urlparse, parse_qs, parse_qsl, urlunparse
-from bs4 import BeautifulSoup
 
 import csv
 
@@ -66,7 +68,7 @@ class IssuersCoinScraper:
         
         if issuer_a:
             # clone to avoid mutating original tree
-            clone = BeautifulSoup(str(issuer_a), "html.parser").a
+            clone = make_soup(str(issuer_a)).a
             em_tag = clone.find("em")
             if em_tag:
                 raw_territory_type = em_tag.get_text(" ", strip=True)
@@ -118,7 +120,7 @@ class IssuersCoinScraper:
         return records
 
     def _parse_issuers(self, issuers_page):
-        soup = BeautifulSoup(issuers_page, "html.parser")
+        soup = make_soup(issuers_page)
 
         # Find the <ul> with the specific class
         #ul = soup.find("ul", class_="liste_pays")
@@ -192,6 +194,14 @@ class IssuersCoinScraper:
         print("Done.")
 
 def main():
+    parser = argparse.ArgumentParser(description="Scrape Numista issuers")
+    BasicHelper.add_cache_arguments(parser)
+    add_html_parser_argument(parser)
+    args = parser.parse_args()
+
+    BasicHelper.configure_from_args(args)
+    configure_html_parser(args.html_parser)
+
     scraper = IssuersCoinScraper()
     #scraper.process()
     scraper.check_missing_issuers()
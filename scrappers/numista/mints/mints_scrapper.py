@@ -3,12 +3,13 @@ import os
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'shared')))
 
 import re
 from basic_functions import *
+from html_parser_functions import make_soup
 from mints_db_functions import *
 from urllib.parse import urljoin, urlparse, parse_qs, parse_qsl, urlunparse
-from bs4 import BeautifulSoup
 
 class MintsCoinScraper:
     def __init__(self):
@@ -33,7 +34,7 @@ class MintsCoinScraper:
             name = strong.get_text(strip=True)
 
         # remaining text inside the <a> after removing <strong>
-        clone = BeautifulSoup(str(mint_a), "html.parser").a
+        clone = make_soup(str(mint_a)).a
         for s in clone.find_all("strong"):
             s.decompose()
         remaining = self.basic_helper.clean_text(clone.get_text(" ", strip=True) or "")
@@ -73,7 +74,7 @@ class MintsCoinScraper:
         }
 
     def _parse_mints(self, mints_page):
-        soup = BeautifulSoup(mints_page, "html.parser")
+        soup = make_soup(mints_page)
 
         # Find the <ul> inside <div id="main">
         main_div = soup.find("main", id="main")
@@ -3,12 +3,14 @@ import os
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'shared')))
 
 import re
+import argparse
 from basic_functions import *
+from html_parser_functions import make_soup, configure_html_parser, add_html_parser_argument
 from rulers_db_functions import *
 from urllib.parse import urljoin, urlparse, parse_qs, parse_qsl, urlunparse
-from bs4 import BeautifulSoup
 
 class RulersIssuersScraper:
     def __init__(self):
@@ -41,7 +43,7 @@ class RulersIssuersScraper:
         return {"ruler_id": ruler_id, "ruler_name": name, "years": years}
 
     def _parse_rulers(self, rulers_page):
-        soup = BeautifulSoup(rulers_page, "html.parser")
+        soup = make_soup(rulers_page)
 
         # Find the <ul> inside <div id="main">
         main_div = soup.find("main", id="main")
@@ -101,7 +103,7 @@ class RulersIssuersScraper:
         return rulers    
 
     def _parse_ruler(self, ruler_page, ruler_id, ruler_name):
-        soup = BeautifulSoup(ruler_page, "html.parser")
+        soup = make_soup(ruler_page)
 
         main_title = soup.find("header", id="main_title")
         name = None
@@ -212,7 +214,7 @@ class RulersIssuersScraper:
 
             # Fallback 2: Check info_html
             if not title and info_html:
-                soup_info = BeautifulSoup(info_html, "html.parser")
+                soup_info = make_soup(info_html)
                 first_p = soup_info.find("p")
                 if first_p:
                     p_text = first_p.get_text(strip=True)
@@ -323,6 +325,14 @@ class RulersIssuersScraper:
                     f.write(str(current_id))
 
 def main():
+    parser = argparse.ArgumentParser(description="Scrape Numista rulers")
+    BasicHelper.add_cache_arguments(parser)
+    add_html_parser_argument(parser)
+    args = parser.parse_args()
+
+    BasicHelper.configure_from_args(args)
+    configure_html_parser(args.html_parser)
+
     scraper = RulersIssuersScraper()
     scraper.process_issuers_rulers()
 
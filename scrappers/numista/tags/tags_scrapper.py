@@ -3,12 +3,13 @@ import os
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'shared')))
 
 import re
 from basic_functions import *
+from html_parser_functions import make_soup
 from tags_db_functions import *
 from urllib.parse import urljoin, urlparse, parse_qs, parse_qsl, urlunparse
-from bs4 import BeautifulSoup
 
 class TagsCoinScraper:
     def __init__(self):
@@ -62,7 +63,7 @@ class TagsCoinScraper:
         }
 
     def _parse_tags(self, tags_page):
-        soup = BeautifulSoup(tags_page, "html.parser")
+        soup = make_soup(tags_page)
 
         # Find the <ul> inside <div id="main">
         main_div = soup.find("main", id="main")
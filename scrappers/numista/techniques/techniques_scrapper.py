@@ -3,12 +3,13 @@ import os
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'shared')))
 
 import re
 from basic_functions import *
+from html_parser_functions import make_soup
 from techniques_db_functions import *
 from urllib.parse import urljoin, urlparse, parse_qs, parse_qsl, urlunparse
-from bs4 import BeautifulSoup
 
 class MintsCoinScraper:
     def __init__(self):
@@ -41,7 +42,7 @@ class MintsCoinScraper:
         }
 
     def _parse_techniques(self, mints_page):
-        soup = BeautifulSoup(mints_page, "html.parser")
+        soup = make_soup(mints_page)
 
         # Find the <ul>
         ul = soup.find("ul", id="technique_list")
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+
+class BlockedPageDetected(Exception):
+    """The site answered with a challenge or ban page instead of content."""
+
+class ChallengePageDetected(BlockedPageDetected):
+    pass
+
+class IpBanDetected(BlockedPageDetected):
+    pass
+
+class CircuitBreaker:
+    """
+    Process-wide breaker for one site, shared by every thread and asyncio task fetching from it.
+
+    The first challenge/ban page trips it: from then on nobody is let through until the cooldown
+    has passed. Then exactly one caller is admitted as the probe while the others keep waiting.
+    If the probe gets real content everyone resumes; if it is blocked again the cooldown doubles
+    (up to max_cooldown). Retrying on our own while blocked only prolongs the block.
+
+    Callers that defer the probe (image downloads: a challenge usually only shows up on pages)
+    leave it to a waiting caller that does not; with none waiting they probe themselves, so a
+    breaker tripped by a page fetch that then gave up still closes again.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name, cooldown=60.0, max_cooldown=1800.0, poll_interval=1.0):
+        self.name = name
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self.state = CircuitBreaker.CLOSED
+        self.cooldown = cooldown
+        self.open_until = 0.0
+        self.trips = 0
+        self._eager_waiters = 0  # callers in wait() that do not defer the probe
+
+    def _admit(self, defer_probe):
+        """Returns (is_probe, seconds_to_wait); seconds_to_wait is None when the caller may go."""
+        with self._lock:
+            if self.state == CircuitBreaker.CLOSED:
+                return False, None
+
+            now = time.time()
+            can_probe = not defer_probe or self._eager_waiters == 0
+            if self.state == CircuitBreaker.OPEN and now >= self.open_until and can_probe:
+                self.state = CircuitBreaker.HALF_OPEN
+                print(f"Circuit breaker {self.name}: probing...")
+                return True, None
+
+            if self.state == CircuitBreaker.OPEN:
+                return False, max(self.poll_interval, self.open_until - now)
+            return False, self.poll_interval
+
+    def _count_waiter(self, defer_probe, n):
+        if not defer_probe:
+            with self._lock:
+                self._eager_waiters += n
+
+    def wait(self, defer_probe=False):
+        """Block while the breaker is open. Returns True when the caller is the probe and must report back."""
+        self._count_waiter(defer_probe, 1)
+        try:
+            while True:
+                probe, delay = self._admit(defer_probe)
+                if delay is None:
+                    return probe
+                time.sleep(delay)
+        finally:
+            self._count_waiter(defer_probe, -1)
+
+    async def wait_async(self, defer_probe=False):
+        self._count_waiter(defer_probe, 1)
+        try:
+            while True:
+                probe, delay = self._admit(defer_probe)
+                if delay is None:
+                    return probe
+                await asyncio.sleep(delay)
+        finally:
+            self._count_waiter(defer_probe, -1)
+
+    def trip(self, reason, probe=False):
+        with self._lock:
+            now = time.time()
+            if probe:
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            elif self.state != CircuitBreaker.CLOSED:
+                # A request sent before the trip came back blocked as well
+                return
+            else:
+                self.cooldown = self.base_cooldown
+                self.trips += 1
+
+            self.state = CircuitBreaker.OPEN
+            self.open_until = now + self.cooldown
+            print(f"Circuit breaker {self.name} open ({reason}), pausing all fetchers for {self.cooldown:.0f}s")
+
+    def record_success(self, probe):
+        if not probe:
+            return
+        with self._lock:
+            self.state = CircuitBreaker.CLOSED
+            self.cooldown = self.base_cooldown
+            print(f"Circuit breaker {self.name} closed, resuming")
+
+    def record_failure(self, probe):
+        """The probe failed for an unrelated reason (timeout, 5xx...): let the next caller probe."""
+        if not probe:
+            return
+        with self._lock:
+            if self.state == CircuitBreaker.HALF_OPEN:
+                self.state = CircuitBreaker.OPEN
+                self.open_until = time.time()
+
+# Process-wide registry, one breaker per site
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def circuit_breaker(name, **kwargs):
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, **kwargs)
+            _breakers[name] = breaker
+        return breaker
@@ -0,0 +1,299 @@
+import asyncio
+import json
+import os
+import re
+import shutil
+import threading
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+class IncompleteDownload(Exception):
+    """The transfer ended before the announced length arrived, or a resumed range did not line up."""
+
+class PartialDownload:
+    """
+    An interrupted download: <save_path>.part holds the bytes received so far and
+    <save_path>.part.json the URL, validators (ETag / Last-Modified) and total length
+    they belong to. The next attempt asks only for the missing range, with If-Range so
+    the server sends the whole file again if it has changed in the meantime.
+    """
+    def __init__(self, url, save_path):
+        self.url = url
+        self.save_path = str(save_path)
+        self.part_path = self.save_path + ".part"
+        self.meta_path = self.part_path + ".json"
+        self.offset = 0
+        self.length = None
+        self.meta = self._load_meta()
+
+    def _load_meta(self):
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("url") == self.url else None
+
+    def _write_meta(self, etag, last_modified, length):
+        self.meta = {"url": self.url, "etag": etag, "last_modified": last_modified, "length": length}
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def request_headers(self, headers):
+        """Headers for the next attempt: Range/If-Range when there is something to resume."""
+        self.offset = 0
+        if self.meta is None or not os.path.exists(self.part_path):
+            self.discard()
+            return headers
+
+        self.offset = os.path.getsize(self.part_path)
+        self.length = self.meta.get("length")
+        if self.offset == 0:
+            return headers
+
+        headers = dict(headers)
+        headers["Range"] = f"bytes={self.offset}-"
+        validator = self.meta.get("etag") or self.meta.get("last_modified")
+        if validator:
+            headers["If-Range"] = validator
+        return headers
+
+    def is_complete(self):
+        return self.offset > 0 and self.length is not None and self.offset == self.length
+
+    def open(self, status, response_headers):
+        """Open the .part file for the body of a 200/206 response, validating a resumed range."""
+        etag = response_headers.get("ETag")
+        last_modified = response_headers.get("Last-Modified")
+
+        if status == 206 and self.offset > 0:
+            match = re.match(r"bytes (\d+)-(\d+)/(\d+|\*)", response_headers.get("Content-Range") or "")
+            total = int(match.group(3)) if match and match.group(3) != "*" else None
+            if not match or int(match.group(1)) != self.offset or (self.length is not None and total != self.length):
+                self.discard()
+                raise IncompleteDownload(f"Range response for {self.url} does not match the partial file, restarting")
+            if self.length is None:
+                self._write_meta(self.meta.get("etag"), self.meta.get("last_modified"), total)
+                self.length = total
+            return open(self.part_path, "ab")
+
+        # Full body: a fresh download, or the file changed and If-Range sent everything
+        content_length = response_headers.get("Content-Length")
+        self.offset = 0
+        self.length = int(content_length) if content_length and content_length.isdigit() else None
+        self._write_meta(etag, last_modified, self.length)
+        return open(self.part_path, "wb")
+
+    def finish(self, f):
+        """Check the .part file against the expected length and flush it to disk."""
+        f.flush()
+        size = f.tell()
+        if self.length is not None and size != self.length:
+            raise IncompleteDownload(f"Incomplete download of {self.url}: {size} of {self.length} bytes")
+        os.fsync(f.fileno())
+
+    def commit(self):
+        os.replace(self.part_path, self.save_path)
+        self._remove(self.meta_path)
+
+    def discard(self):
+        self._remove(self.part_path)
+        self._remove(self.meta_path)
+        self.meta = None
+        self.offset = 0
+        self.length = None
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def _check_status(partial, r):
+    if r.status_code == 416:
+        # The range no longer exists on the server: start over
+        partial.discard()
+        raise IncompleteDownload(f"Range not satisfiable for {partial.url}, restarting")
+    if r.status_code >= 400:
+        r.raise_for_status()
+
+def stream_download(get, url, save_path, headers, on_response=None, timeout=30):
+    """
+    One download attempt through get (Session.get of a curl_cffi session), resuming a previous
+    .part file when possible. The body is written in chunks, so memory stays constant, and renamed
+    into save_path only once complete. On errors the .part file is kept for the next attempt;
+    call discard_partial_download() when giving up for good.
+    on_response(r) is called as soon as the response headers arrive.
+    """
+    partial = PartialDownload(url, save_path)
+    request_headers = partial.request_headers(headers)
+    if partial.is_complete():
+        partial.commit()
+        return
+
+    r = get(url, headers=request_headers, timeout=timeout, stream=True)
+    try:
+        if on_response is not None:
+            on_response(r)
+        _check_status(partial, r)
+
+        with partial.open(r.status_code, r.headers) as f:
+            for chunk in r.iter_content(DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+            partial.finish(f)
+    finally:
+        r.close()
+
+    partial.commit()
+
+async def stream_download_async(session, url, save_path, headers, on_response=None, timeout=30):
+    """Asyncio counterpart of stream_download() for a curl_cffi AsyncSession."""
+    partial = PartialDownload(url, save_path)
+    request_headers = partial.request_headers(headers)
+    if partial.is_complete():
+        partial.commit()
+        return
+
+    r = await session.get(url, headers=request_headers, timeout=timeout, stream=True)
+    try:
+        if on_response is not None:
+            on_response(r)
+        _check_status(partial, r)
+
+        with partial.open(r.status_code, r.headers) as f:
+            async for chunk in r.aiter_content(DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+            partial.finish(f)
+    finally:
+        await r.aclose()
+
+    partial.commit()
+
+def discard_partial_download(save_path):
+    PartialDownload(None, save_path).discard()
+
+def write_file_atomic(save_path, content):
+    """Write a whole body through a .part file and rename it into place."""
+    part_path = str(save_path) + ".part"
+    try:
+        with open(part_path, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(part_path, save_path)
+    except BaseException:
+        PartialDownload._remove(part_path)
+        raise
+
+class SingleFlightDownloads:
+    """
+    Run-scoped index of downloaded URLs -> local files, with single-flight coalescing.
+
+    The first caller for a URL downloads it; callers arriving while that download is in flight
+    wait for it instead of starting their own, and later callers get the file hardlinked (or
+    copied, where links are not supported) to their own path. If the leader fails, the waiting
+    callers fall back to downloading themselves.
+    Threads use download(), asyncio tasks download_async(); both share the same index.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._files = {}
+        self._inflight = {}
+        self._inflight_async = {}
+        self.reused = 0
+
+    def _lookup(self, url, save_path):
+        """Serve url from the index. Returns True on success, None when it has to be downloaded."""
+        with self._lock:
+            src = self._files.get(url)
+        if src is None:
+            return None
+        if os.path.abspath(src) == os.path.abspath(save_path):
+            return True
+        try:
+            link_or_copy(src, save_path)
+        except FileNotFoundError:
+            # The earlier copy was removed since: forget it
+            with self._lock:
+                if self._files.get(url) == src:
+                    del self._files[url]
+            return None
+        with self._lock:
+            self.reused += 1
+        return True
+
+    def _record(self, url, save_path, ok):
+        if ok:
+            with self._lock:
+                self._files[url] = str(save_path)
+
+    def moved(self, old_dir, new_dir):
+        """Follow files downloaded into old_dir after that folder was renamed to new_dir."""
+        prefix = os.path.join(str(old_dir), "")
+        with self._lock:
+            for url, path in self._files.items():
+                if path.startswith(prefix):
+                    self._files[url] = os.path.join(str(new_dir), path[len(prefix):])
+
+    def download(self, url, save_path, download):
+        """download(url, save_path) -> bool does the actual transfer."""
+        if self._lookup(url, save_path):
+            return True
+
+        with self._lock:
+            event = self._inflight.get(url)
+            leader = event is None
+            if leader:
+                event = self._inflight[url] = threading.Event()
+
+        if not leader:
+            event.wait()
+            if self._lookup(url, save_path):
+                return True
+            return download(url, save_path)
+
+        try:
+            ok = download(url, save_path)
+            self._record(url, save_path, ok)
+            return ok
+        finally:
+            with self._lock:
+                del self._inflight[url]
+            event.set()
+
+    async def download_async(self, url, save_path, download):
+        """download(url, save_path) is a coroutine function returning bool."""
+        if self._lookup(url, save_path):
+            return True
+
+        event = self._inflight_async.get(url)
+        if event is not None:
+            await event.wait()
+            if self._lookup(url, save_path):
+                return True
+            return await download(url, save_path)
+
+        event = self._inflight_async[url] = asyncio.Event()
+        try:
+            ok = await download(url, save_path)
+            self._record(url, save_path, ok)
+            return ok
+        finally:
+            del self._inflight_async[url]
+            event.set()
+
+def link_or_copy(src, dst):
+    """Hardlink src to dst (copy when the file system refuses), replacing dst atomically."""
+    # Not ".part": that name may hold a resumable download of dst
+    tmp_path = str(dst) + ".link"
+    PartialDownload._remove(tmp_path)
+    try:
+        os.link(src, tmp_path)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
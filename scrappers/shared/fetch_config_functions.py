@@ -0,0 +1,69 @@
+import asyncio
+import json
+import os
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from urllib.parse import urlparse
+
+from rate_limit_functions import host_limiter
+
+# Per-host fetch settings shared by the Numista and uCoin scrapers
+DEFAULT_HOSTS_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fetch_hosts.json")
+
+# Keys handed to the host's HostRateLimiter
+LIMITER_SETTINGS = ["rate", "min_rate", "max_rate", "burst", "slow_latency"]
+
+class HostBudget:
+    """
+    Connection budget of one host: at most max_concurrency requests in flight (across threads,
+    or across the tasks of the event loop), the host's rate limiter and its request timeout.
+    """
+    def __init__(self, host, settings):
+        self.host = host
+        self.max_concurrency = settings.get("max_concurrency", 4)
+        self.timeout = settings.get("timeout", 30)
+        self.limiter = host_limiter(host, **{k: settings[k] for k in LIMITER_SETTINGS if k in settings})
+
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self._async_semaphore = None
+
+    @contextmanager
+    def slot(self):
+        with self._semaphore:
+            yield
+
+    @asynccontextmanager
+    async def slot_async(self):
+        # Created lazily so it belongs to the running event loop
+        if self._async_semaphore is None:
+            self._async_semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._async_semaphore:
+            yield
+
+_hosts_config = None
+_budgets = {}
+_budgets_lock = threading.Lock()
+
+def load_hosts_config(path=None):
+    """(Re)load the per-host settings. Budgets already handed out keep their settings."""
+    global _hosts_config
+    with open(path or DEFAULT_HOSTS_CONFIG_PATH, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    with _budgets_lock:
+        _hosts_config = config
+    return config
+
+def host_settings(host):
+    if _hosts_config is None:
+        load_hosts_config()
+    return {**_hosts_config.get("default", {}), **_hosts_config.get(host, {})}
+
+def host_budget(url_or_host):
+    host = urlparse(url_or_host).netloc if "://" in url_or_host else url_or_host
+    settings = host_settings(host)
+    with _budgets_lock:
+        budget = _budgets.get(host)
+        if budget is None:
+            budget = HostBudget(host, settings)
+            _budgets[host] = budget
+        return budget
@@ -0,0 +1,37 @@
+import os
+from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
+
+# Tree builders the scrapers are checked against (see work/benchmarks/bench_html_parsers.py).
+# lxml is an optional dependency: pip install lxml
+HTML_PARSERS = ("html.parser", "lxml")
+
+_parser = None
+
+def configure_html_parser(name):
+    """
+    Select the BeautifulSoup tree builder used by make_soup() in this process.
+    None keeps the current one; a builder that is not installed raises here rather than
+    on the first page.
+    """
+    global _parser
+    if name is None:
+        return
+    if name not in HTML_PARSERS:
+        raise ValueError(f"Unknown HTML parser {name}: expected one of {', '.join(HTML_PARSERS)}")
+    if builder_registry.lookup(name) is None:
+        raise RuntimeError(f"The {name} HTML parser is not installed (pip install {name})")
+    _parser = name
+
+def html_parser_name():
+    if _parser is None:
+        # SCRAPER_HTML_PARSER selects the builder for scripts without a --html-parser option
+        configure_html_parser(os.environ.get("SCRAPER_HTML_PARSER") or "html.parser")
+    return _parser
+
+def make_soup(markup, parser=None):
+    """BeautifulSoup of markup with the configured tree builder (html.parser unless configured otherwise)."""
+    return BeautifulSoup(markup, parser or html_parser_name())
+
+def add_html_parser_argument(parser):
+    parser.add_argument("--html-parser", choices=HTML_PARSERS, help="BeautifulSoup tree builder (default: $SCRAPER_HTML_PARSER or html.parser)")
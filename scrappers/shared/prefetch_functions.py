@@ -0,0 +1,103 @@
+import asyncio
+import queue
+import threading
+
+# Marks the end of the chain in the look-ahead queue
+_END = object()
+
+def prefetch_pages(first, fetch, next_page, depth=1):
+    """
+    Walk a chain of listing pages, fetching up to depth pages ahead of the caller.
+
+    fetch(page) returns the page content; next_page(page, content) returns the following
+    page or None. A background thread does the fetching (and whatever parsing next_page
+    needs), so the next listing page is ready by the time the caller is done with the coin
+    types of the current one. Yields (page, content) in order. An error in the background
+    thread is raised to the caller when it reaches that page. Leaving the loop early stops
+    the thread. depth=0 fetches each page only when it is needed, with no thread.
+    """
+    if depth <= 0:
+        page = first
+        while page is not None:
+            content = fetch(page)
+            yield page, content
+            page = next_page(page, content)
+        return
+
+    ahead = queue.Queue()
+    # One slot per page fetched but not yet taken by the caller
+    slots = threading.Semaphore(depth)
+    stop = threading.Event()
+
+    def walk():
+        page = first
+        try:
+            while page is not None:
+                # Give up when the caller is gone instead of waiting for a slot forever
+                while not slots.acquire(timeout=0.5):
+                    if stop.is_set():
+                        return
+                if stop.is_set():
+                    return
+                content = fetch(page)
+                ahead.put((page, content, None))
+                page = next_page(page, content)
+        except Exception as e:
+            ahead.put((page, None, e))
+            return
+        ahead.put(_END)
+
+    thread = threading.Thread(target=walk, name="listing-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = ahead.get()
+            if item is _END:
+                return
+            slots.release()
+            page, content, error = item
+            if error is not None:
+                raise error
+            yield page, content
+    finally:
+        stop.set()
+
+async def prefetch_pages_async(first, fetch, next_page, depth=1):
+    """Asyncio counterpart of prefetch_pages(): fetch is a coroutine function, the look-ahead runs as a task."""
+    if depth <= 0:
+        page = first
+        while page is not None:
+            content = await fetch(page)
+            yield page, content
+            page = next_page(page, content)
+        return
+
+    ahead = asyncio.Queue()
+    slots = asyncio.Semaphore(depth)
+
+    async def walk():
+        page = first
+        try:
+            while page is not None:
+                await slots.acquire()
+                content = await fetch(page)
+                ahead.put_nowait((page, content, None))
+                page = next_page(page, content)
+        except Exception as e:
+            ahead.put_nowait((page, None, e))
+            return
+        ahead.put_nowait(_END)
+
+    task = asyncio.create_task(walk())
+    try:
+        while True:
+            item = await ahead.get()
+            if item is _END:
+                return
+            slots.release()
+            page, content, error = item
+            if error is not None:
+                raise error
+            yield page, content
+    finally:
+        task.cancel()
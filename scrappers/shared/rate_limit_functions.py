@@ -0,0 +1,243 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+def parse_retry_after(value):
+    """Retry-After is either delay-seconds or an HTTP date. Returns seconds to wait, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class SharedLimiterState:
+    """
+    Limiter state kept in a small SQLite file so several processes on one machine
+    throttle a host together. Every update runs in a BEGIN IMMEDIATE transaction.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.db_connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.db_connection.execute("PRAGMA journal_mode = WAL")
+        self.db_connection.execute("""
+            CREATE TABLE IF NOT EXISTS limiter_state (
+                host TEXT PRIMARY KEY,
+                rate REAL NOT NULL,
+                tat REAL NOT NULL,
+                blocked_until REAL NOT NULL
+            )
+        """)
+
+    def update(self, host, default_rate, fn):
+        """Run fn(rate, tat, blocked_until) -> (result, rate, tat, blocked_until) atomically for host."""
+        with self._lock:
+            self.db_connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.db_connection.execute(
+                    "SELECT rate, tat, blocked_until FROM limiter_state WHERE host = ?", (host,)
+                ).fetchone()
+                rate, tat, blocked_until = row if row else (default_rate, 0.0, 0.0)
+                result, rate, tat, blocked_until = fn(rate, tat, blocked_until)
+                self.db_connection.execute("""
+                    INSERT INTO limiter_state (host, rate, tat, blocked_until) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(host) DO UPDATE SET rate=excluded.rate, tat=excluded.tat, blocked_until=excluded.blocked_until
+                """, (host, rate, tat, blocked_until))
+                self.db_connection.execute("COMMIT")
+                return result
+            except Exception:
+                self.db_connection.execute("ROLLBACK")
+                raise
+
+class HostRateLimiter:
+    """
+    Token bucket for one host with AIMD rate adaptation.
+
+    The bucket is implemented as GCRA: its whole state is the "theoretical arrival time" of the
+    next request, which is cheap to keep in memory or in a SharedLimiterState row.
+    Every caller reserves the next slot and sleeps until it comes up, so the limiter is shared
+    safely by threads (wait) and asyncio tasks (wait_async).
+
+    After each response the rate adapts: a 429 (or 503) halves it and honours Retry-After by
+    blocking the host, slow responses shrink it a little, and every fast success adds a small
+    constant back, up to max_rate. Both decreases happen at most once per request interval, so
+    a burst of requests that were throttled or slow together counts once. The latency fed back
+    is the time on the wire, not the wait for a slot.
+    """
+    def __init__(self, host, rate=2.0, min_rate=0.2, max_rate=10.0, burst=1,
+                 increase=0.05, decrease_factor=0.5, slow_latency=5.0, state=None):
+        self.host = host
+        self.rate = min(max_rate, max(min_rate, rate))
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = max(1, burst)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.slow_latency = slow_latency
+        self.state = state
+
+        self._lock = threading.Lock()
+        self._tat = 0.0
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self.throttled = 0
+        self.requests = 0
+        self.latency = None  # moving average, seconds
+
+    def _reserve_slot(self, rate, tat, blocked_until):
+        now = time.time()
+        interval = 1.0 / rate
+        tolerance = (self.burst - 1) * interval
+        start = max(now, blocked_until)
+        tat = max(tat, start)
+        delay = max(0.0, tat - tolerance - now, start - now)
+        return delay, rate, tat + interval, blocked_until
+
+    def reserve(self):
+        """Take the next slot. Returns the seconds the caller has to wait before sending."""
+        if self.state is not None:
+            return self.state.update(self.host, self.rate, self._reserve_slot)
+
+        with self._lock:
+            delay, _, self._tat, _ = self._reserve_slot(self.rate, self._tat, self._blocked_until)
+            return delay
+
+    def wait(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _adapt(self, rate, tat, blocked_until, status, latency, retry_after):
+        now = time.time()
+        reason = None
+
+        if status in (429, 503):
+            self.throttled += 1
+            if retry_after:
+                blocked_until = max(blocked_until, now + retry_after)
+            # Several in-flight requests usually hit the same limit: decrease once per burst of 429s
+            if now - self._last_decrease > 1.0 / rate:
+                rate *= self.decrease_factor
+                self._last_decrease = now
+                reason = f"HTTP {status}"
+        elif latency is not None and latency > self.slow_latency:
+            # Requests in flight together are slow together: shrink once per interval as well
+            if now - self._last_decrease > 1.0 / rate:
+                rate *= 0.9
+                self._last_decrease = now
+                reason = f"slow response {latency:.1f}s"
+        elif status is not None and status < 400:
+            rate += self.increase
+
+        rate = min(self.max_rate, max(self.min_rate, rate))
+        return reason, rate, tat, blocked_until
+
+    def on_response(self, status, latency=None, retry_after=None):
+        """Feed the outcome of a request back into the limiter. status None means a transport error."""
+        with self._lock:
+            self.requests += 1
+        if latency is not None:
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+
+        if isinstance(retry_after, str):
+            retry_after = parse_retry_after(retry_after)
+
+        if self.state is not None:
+            reason = self.state.update(
+                self.host, self.rate,
+                lambda rate, tat, blocked: self._adapt(rate, tat, blocked, status, latency, retry_after)
+            )
+        else:
+            with self._lock:
+                reason, self.rate, self._tat, self._blocked_until = self._adapt(
+                    self.rate, self._tat, self._blocked_until, status, latency, retry_after
+                )
+
+        if reason:
+            print(f"Rate limit for {self.host} lowered to {self.current_rate():.2f} req/s ({reason})")
+
+    def current_rate(self):
+        if self.state is not None:
+            return self.state.update(self.host, self.rate, lambda rate, tat, blocked: (rate, rate, tat, blocked))
+        return self.rate
+
+    def metrics(self):
+        return {
+            "host": self.host,
+            "rate": round(self.current_rate(), 3),
+            "throttled": self.throttled,
+            "requests": self.requests,
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+        }
+
+# Process-wide registry: every fetcher asking for the same host gets the same limiter
+_limiters = {}
+_limiters_lock = threading.Lock()
+_limiter_defaults = {}
+_shared_state = None
+
+def configure_rate_limits(state_path=None, **defaults):
+    """
+    Set defaults (rate, max_rate, ...) for limiters created from now on and, with state_path,
+    share limiter state with other processes through that SQLite file.
+    Existing limiters get the new min_rate and are capped at the new max_rate right away.
+    """
+    global _shared_state
+    with _limiters_lock:
+        _limiter_defaults.update(defaults)
+        if state_path:
+            os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+            _shared_state = SharedLimiterState(state_path)
+        for limiter in _limiters.values():
+            if "max_rate" in defaults:
+                limiter.max_rate = min(limiter.max_rate, defaults["max_rate"])
+            if "min_rate" in defaults:
+                limiter.min_rate = defaults["min_rate"]
+            limiter.rate = min(limiter.max_rate, max(limiter.min_rate, limiter.rate))
+            if state_path:
+                limiter.state = _shared_state
+
+def host_limiter(url_or_host, **overrides):
+    """
+    The limiter of a host, created on first use from overrides (per-host settings) and the
+    configure_rate_limits() defaults. A configured max_rate is a global cap: it only ever lowers
+    a host's own max_rate.
+    """
+    host = urlparse(url_or_host).netloc if "://" in url_or_host else url_or_host
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            settings = {**_limiter_defaults, **overrides}
+            if "max_rate" in _limiter_defaults and "max_rate" in overrides:
+                settings["max_rate"] = min(_limiter_defaults["max_rate"], overrides["max_rate"])
+            limiter = HostRateLimiter(host, state=_shared_state, **settings)
+            _limiters[host] = limiter
+        return limiter
+
+def rate_limit_metrics():
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.metrics() for limiter in limiters]
+
+def requests_sent():
+    """Requests answered (or failed) so far in this process, over all hosts."""
+    return sum(m["requests"] for m in rate_limit_metrics())
+
+def format_rate_metrics():
+    metrics = rate_limit_metrics()
+    if not metrics:
+        return "no requests yet"
+    return ", ".join(f"{m['host']}: {m['rate']:.2f} req/s" for m in metrics)
@@ -0,0 +1,49 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+from curl_cffi import requests as creq
+from curl_cffi import CurlHttpVersion
+
+class SessionPool:
+    """
+    Pool of persistent curl_cffi sessions.
+    Each session keeps its connections alive between requests, so consecutive
+    fetches from the same host reuse the TCP/TLS connection (HTTP/2 when the
+    server offers it) instead of paying a fresh handshake every time.
+    A session is not thread safe, so it is checked out for one request at a time.
+    """
+    def __init__(self, size=4, impersonate="chrome136"):
+        self.size = max(1, size)
+        self.impersonate = impersonate
+        self._idle = queue.LifoQueue()  # LIFO: prefer the most recently used (warm) session
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new_session(self):
+        return creq.Session(impersonate=self.impersonate, http_version=CurlHttpVersion.V2TLS)
+
+    @contextmanager
+    def session(self):
+        try:
+            s = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            # Pool exhausted: wait for another thread to give a session back
+            s = self._new_session() if can_create else self._idle.get()
+        try:
+            yield s
+        finally:
+            self._idle.put(s)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
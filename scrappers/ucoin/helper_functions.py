@@ -1,4 +1,4 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag, NavigableString
 import re
 from urllib.parse import urljoin, urlparse, parse_qs
 from pathlib import Path
@@ -32,18 +32,20 @@ def _find_section_table(soup: BeautifulSoup, label: str):
     return h3.find_next("table", class_="tbl coin-desc")     
 
 def _text_after_label(span):
-    frag = _fragment_after_label(span)
-    if frag is None:
-        return None
-    tmp = BeautifulSoup(frag, "html.parser")
-    return _clean_text(tmp.get_text(" ", strip=True))  
-
-def _fragment_after_label(span):
-    # HTML fragment consisting of everything after the label <span> inside its parent <p>
     if not span:
         return None
-    html = "".join(str(sib) for sib in span.next_siblings)  # includes <br>, <a>, etc.
-    return html
+    return _clean_text(" ".join(_strings_after_label(span)))
+
+def _strings_after_label(span):
+    # Stripped text of everything after the label <span> inside its parent <p> (<br>, <a>, etc. included),
+    # read from the page tree instead of re-parsing that HTML fragment
+    for sib in span.next_siblings:
+        if isinstance(sib, Tag):
+            yield from sib.stripped_strings
+        elif type(sib) is NavigableString:
+            text = sib.strip()
+            if text:
+                yield text
 
 def _first_link_theme_key(p_tag):
     if not p_tag:
@@ -57,11 +59,9 @@ def _first_link_theme_key(p_tag):
 
 def _list_after_label(span):
     # Return list of items split by <br> (using newline separator)
-    frag = _fragment_after_label(span)
-    if frag is None:
+    if not span:
         return []
-    tmp = BeautifulSoup(frag, "html.parser")
-    items = [ _clean_text(x) for x in tmp.get_text("\n", strip=True).split("\n") ]
+    items = [ _clean_text(x) for x in "\n".join(_strings_after_label(span)).split("\n") ]
     return [x for x in items if x]
 
 def _to_int_or_none(s: str) -> int | None:
@@ -1,19 +1,33 @@
 import os, sys
-from curl_cffi import requests as creq
 from bs4 import BeautifulSoup
 import sqlite3
 import re
 from urllib.parse import urljoin, urlparse, parse_qs, parse_qsl, urlunparse
 from db_functions import *
-from helper_functions import _clean_text, _label_span, _find_section_table, _text_after_label, _fragment_after_label, _first_link_theme_key, _list_after_label, _to_int_or_none, _build_coin_image_paths, _ensure_coin_image_folder, _read_cookie_file, _extract_data_from_coin_image_link, _read_last_log_entry
+from helper_functions import _clean_text, _label_span, _find_section_table, _text_after_label, _first_link_theme_key, _list_after_label, _to_int_or_none, _build_coin_image_paths, _ensure_coin_image_folder, _read_cookie_file, _extract_data_from_coin_image_link, _read_last_log_entry
 import time
 import random
 import logging
 
+# Fetch-layer pieces shared with the Numista scraper
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "shared"))
+from rate_limit_functions import format_rate_metrics
+from session_pool_functions import SessionPool
+from fetch_config_functions import host_budget
+from circuit_breaker_functions import circuit_breaker, BlockedPageDetected, IpBanDetected
+from download_functions import stream_download, discard_partial_download, IncompleteDownload
+from prefetch_functions import prefetch_pages
+from html_parser_functions import make_soup
+
 class CoinScraper:
-    def __init__(self, issue_type=1):
+    def __init__(self, issue_type=1, prefetch_depth=1):
         cookie = _read_cookie_file()
 
+        # Listing pages fetched ahead of the one being processed
+        self.prefetch_depth = prefetch_depth
+        # Keep-alive sessions: one for this thread and one per page fetched ahead
+        self.session_pool = SessionPool(size=1 + prefetch_depth)
+
         self.issue_type = issue_type
         self.base_url = "https://en.ucoin.net"
         self.base_image_url = "https://i.ucoin.net/coin/"
@@ -65,20 +79,53 @@ class CoinScraper:
         )
 
     def fetch(self, url: str, is_image:bool=False) -> str:
+        budget = host_budget(url)
+        limiter = budget.limiter
+        breaker = circuit_breaker("ucoin")
+
         delay = 1
         max_retries = 5
         for attempt in range(1, max_retries + 1):
+            probe = False
             try:
-                r = creq.get(url, headers=self.headers, impersonate="chrome136", timeout=30)
+                probe = breaker.wait(defer_probe=is_image)
+                limiter.wait()
+
+                with budget.slot(), self.session_pool.session() as session:
+                    # Timed from here: waiting for a slot or a session says nothing about the host
+                    started = time.monotonic()
+                    try:
+                        r = session.get(url, headers=self.headers, timeout=budget.timeout)
+                    except Exception:
+                        limiter.on_response(None, time.monotonic() - started)
+                        raise
+                    limiter.on_response(r.status_code, time.monotonic() - started, r.headers.get("Retry-After"))
 
                 r.raise_for_status()
                 if is_image:
+                    breaker.record_success(probe)
                     return r.content
-                else:
-                    return r.text
+
+                if CoinScraper.is_ip_ban_page(r.text):
+                    raise IpBanDetected("Access blocked: Detected IP ban message on the page.")
+                breaker.record_success(probe)
+                return r.text
             except Exception as e:
+                if isinstance(e, BlockedPageDetected):
+                    # Pause every fetcher until a single probe gets through again
+                    breaker.trip(str(e), probe)
+                    if attempt == max_retries:
+                        raise
+                    continue
+
+                breaker.record_failure(probe)
                 msg = str(e)
-                if "TLS connect error" in msg or "curl: (35)" in msg:
+                response = getattr(e, "response", None)
+                if response is not None and response.status_code == 429:
+                    # the host limiter has already slowed down and honours Retry-After
+                    if attempt == max_retries:
+                        raise
+                elif "TLS connect error" in msg or "curl: (35)" in msg:
                     if attempt == max_retries:
                         raise
                     time.sleep(delay)
@@ -87,6 +134,52 @@ class CoinScraper:
                     # some other error: raise immediately
                     raise
 
+    def download(self, url: str, file_path) -> None:
+        """
+        Stream url into file_path through a .part file. A transfer cut short (timeout, dropped
+        connection) keeps its .part file and is resumed with a Range request on the next attempt.
+        """
+        budget = host_budget(url)
+        limiter = budget.limiter
+        breaker = circuit_breaker("ucoin")
+
+        delay = 1
+        max_retries = 5
+        for attempt in range(1, max_retries + 1):
+            probe = False
+            try:
+                # A challenge usually only shows up on pages: images probe only when no page fetch is waiting
+                probe = breaker.wait(defer_probe=True)
+                limiter.wait()
+
+                with budget.slot(), self.session_pool.session() as session:
+                    started = time.monotonic()
+                    on_response = lambda r: limiter.on_response(r.status_code, time.monotonic() - started, r.headers.get("Retry-After"))
+                    stream_download(session.get, url, file_path, self.headers, on_response, budget.timeout)
+                breaker.record_success(probe)
+                return
+            except Exception as e:
+                breaker.record_failure(probe)
+                msg = str(e)
+                response = getattr(e, "response", None)
+                status = response.status_code if response is not None else None
+                if status == 429:
+                    if attempt == max_retries:
+                        raise
+                elif isinstance(e, IncompleteDownload) or "curl: (18)" in msg or "curl: (28)" in msg or "TLS connect error" in msg or "curl: (35)" in msg:
+                    if attempt == max_retries:
+                        raise
+                    time.sleep(delay)
+                    delay *= 2  # exponential backoff
+                else:
+                    if status is not None and status >= 400:
+                        discard_partial_download(file_path)
+                    raise
+
+    @staticmethod
+    def is_ip_ban_page(html: str) -> bool:
+        return "Oops!" in html and "your IP" in html and "blocked" in html
+
     def map_coin_type_info_field(self, header_text: str) -> str | None:
         h = _clean_text(header_text).lower().rstrip(":")
         if h in self.coin_type_info_field_map:
@@ -116,8 +209,7 @@ class CoinScraper:
         except (IndexError, AttributeError):
             return None
 
-    def has_no_result(html: str) -> bool:
-        soup = BeautifulSoup(html, "html.parser")
+    def has_no_result(soup: BeautifulSoup) -> bool:
         return soup.select_one("p.no-result") is not None
 
     def populate_countries(self, db_connection, db_cursor):
@@ -131,20 +223,19 @@ class CoinScraper:
             db_upsert_country(db_cursor, cl["name"], url_slug, cl["url"])
             db_connection.commit()    
 
-    def find_mintage_table(html: str):
+    def find_mintage_table(soup: BeautifulSoup):
         """Return the <table> element under the <h3>Mintage, Worth</h3> heading."""
-        soup = BeautifulSoup(html, "html.parser")
         h3 = soup.find("h3", string=lambda s: s and re.search(r"mintage", s, re.I))
         if not h3:
             return None
         return h3.find_next("table")
 
-    def parse_mintage_table(html: str):
+    def parse_mintage_table(soup: BeautifulSoup):
         """
         Parse the 'Mintage, Worth' table into a list of rows:
         [{'year': int|None, 'mark': str|None, 'unc': int|None, 'bu': int|None, 'proof': int|None}, ...]
         """
-        tbl = CoinScraper.find_mintage_table(html)
+        tbl = CoinScraper.find_mintage_table(soup)
         if not tbl:
             return []
         
@@ -226,9 +317,8 @@ class CoinScraper:
 
         return out
 
-    def find_obverse_reverse_tables(html: str):
+    def find_obverse_reverse_tables(soup: BeautifulSoup):
         """Return (obverse_table, reverse_table) as BeautifulSoup elements (or None)."""
-        soup = BeautifulSoup(html, "html.parser")
         obverse_tbl = _find_section_table(soup, "Obverse")
         reverse_tbl = _find_section_table(soup, "Reverse")
         return obverse_tbl, reverse_tbl    
@@ -277,8 +367,7 @@ class CoinScraper:
 
         return out    
 
-    def parse_coin_type_info_table(self, html: str):
-        soup = BeautifulSoup(html, "html.parser")
+    def parse_coin_type_info_table(self, soup: BeautifulSoup):
         table = soup.select_one("table.tbl.coin-info")
         if not table:
             return {}
@@ -310,8 +399,7 @@ class CoinScraper:
 
         return {"tid": tid, "country_url_slug": country_url_slug, "url": url}
 
-    def parse_coin_types_tables(self, html: str):
-        soup = BeautifulSoup(html, "html.parser")
+    def parse_coin_types_tables(self, soup: BeautifulSoup):
         coin_type_links = []
         for table in soup.select("table.coin"):
             a = table.select_one('td.coin-info a.value[href]')
@@ -325,12 +413,13 @@ class CoinScraper:
             coin_type_links.append(coin_type_link)
 
         if len(coin_type_links) == 0 and soup.find(text="Oops!") and "your IP" in soup.text and "blocked" in soup.text:
-            raise Exception("Access blocked: Detected IP ban message on the page.")
+            circuit_breaker("ucoin").trip("IP ban page")
+            raise IpBanDetected("Access blocked: Detected IP ban message on the page.")
         
         return coin_type_links
 
     def parse_country_links(self, html: str):
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html)
         links = []
         for a in soup.select("li.cntry > a[href]"):
             name_el = a.select_one(".wrap") or a
@@ -340,8 +429,7 @@ class CoinScraper:
                 links.append({"name": name, "url": href})
         return links
 
-    def parse_coin_gallery(html: str):
-        soup = BeautifulSoup(html, "html.parser")
+    def parse_coin_gallery(soup: BeautifulSoup):
         gallery = soup.find("div", class_="gallery")
         if not gallery:
             return []
@@ -390,13 +478,13 @@ class CoinScraper:
         return list(coins.values())
 
     def iter_pages(self, first_url: str, country_url_slug: str, start_page: int | None = None):
-        first_html = self.fetch(first_url)
-        soup = BeautifulSoup(first_html, "html.parser")
+        # Each listing page is parsed once; the pages are yielded as soups
+        first_soup = make_soup(self.fetch(first_url))
 
         # default = only one page
         max_page = 1
 
-        pages_div = soup.select_one("div.pages")
+        pages_div = first_soup.select_one("div.pages")
         if pages_div:
             last_link = pages_div.select("a[href]")[-1]
             # try text first, else extract from query
@@ -410,15 +498,28 @@ class CoinScraper:
         parsed = urlparse(first_url)
         base_params = dict(parse_qsl(parsed.query))
 
-        for page_num in range(start, max_page + 1):
+        def page_url(page_num):
             if "page=" in first_url:
-                new_url = re.sub(r'(page=)\d+', rf'\1{page_num}', first_url)
-            else:
-                new_url = f"{first_url}&page={page_num}"
+                return re.sub(r'(page=)\d+', rf'\1{page_num}', first_url)
+            return f"{first_url}&page={page_num}"
+
+        def fetch_page(page_num):
+            if page_num == 1 and "page=" not in first_url:
+                # The page fetched above
+                return first_soup
+            return make_soup(self.fetch(page_url(page_num)))
 
+        def next_page(page_num, soup):
+            return page_num + 1 if page_num < max_page else None
+
+        if start > max_page:
+            return
+
+        # The following pages are fetched in the background while the caller works on this one
+        for page_num, soup in prefetch_pages(start, fetch_page, next_page, self.prefetch_depth):
             logging.info(f"{country_url_slug}, {page_num}")
 
-            yield self.fetch(new_url)
+            yield soup
 
     def fetch_coin_image(self, coin_image, country_url_slug, coin_type_page_link, is_obverse):
         url, coin_image_file_name = _build_coin_image_paths(self.base_image_url, coin_image, is_obverse)
@@ -432,13 +533,11 @@ class CoinScraper:
         if "coin/77/283/77283218-" in url or "coin/71/684/71684506-" in url or "coin/66/550/66550079-" in url or "coin/66/550/66550099-" in url:
             return
 
-        image = self.fetch(url, True)
-
-        with open(file_path, "wb") as f:
-            f.write(image)
+        self.download(url, file_path)
 
     def process_coin_type(self, coin_type_page_link, country_id, country_url_slug):
-        coin_type_page = self.fetch(urljoin(self.base_url, coin_type_page_link["url"]))  
+        # One tree for all the parse_* functions below
+        coin_type_page = make_soup(self.fetch(urljoin(self.base_url, coin_type_page_link["url"])))
 
         coin_type_info = self.parse_coin_type_info_table(coin_type_page)
 
@@ -492,7 +591,7 @@ class CoinScraper:
                 continue
             self.process_page(coin_types_page, country_id, country_url_slug)
 
-            time.sleep(2)
+            print(f"Rate limits: {format_rate_metrics()}")
 
     def process_coin_type_ids(self, coin_type_ids):
 
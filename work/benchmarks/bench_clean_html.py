@@ -0,0 +1,71 @@
+"""
+Benchmark of CoinTypesScraper.clean_html() against the number of pictures on the page.
+
+Saved coin type pages are parsed once with parse_coin_type_page() and the parsed tree is
+cleaned with clean_html(); only the cleaning is timed. Pages are grouped by the number of
+images clean_html() points at the local copies (edge, sample and comment images), so a
+cost that grows with the pictures shows up as a growing ms/page across the groups.
+
+Pages come from a folder of saved .html files (--pages) or, by default, from the coin type
+pages in the Numista response cache (scrappers/numista/cache, filled by --cache runs).
+
+Usage: python work/benchmarks/bench_clean_html.py [--pages DIR] [--cache-dir DIR] [--limit N] [--rounds N]
+"""
+import argparse
+import os
+import time
+
+from bench_parse_once import load_pages_from_cache, load_pages_from_dir, new_out, new_scraper
+
+# Upper bounds of the picture count groups
+GROUPS = (5, 20, 50, 100, 200, 500)
+
+def image_count(out):
+    count = 1 if out.get("edge_image") else 0
+    for entry in out.get("sample_images") or []:
+        count += bool(entry.get("obverse_image")) + bool(entry.get("reverse_image"))
+    return count + len(out.get("comment_images") or [])
+
+def time_clean(scraper, page, rounds):
+    """(pictures, best CPU seconds of clean_html over rounds) for one page."""
+    best = None
+    for _ in range(rounds):
+        out = new_out(scraper)
+        soup = scraper.parse_coin_type_page(out, page)
+        start = time.process_time()
+        scraper.clean_html(soup, out, "bench")
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return image_count(out), best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", help="folder of saved coin type pages (*.html, searched recursively)")
+    parser.add_argument("--cache-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "scrappers", "numista", "cache"))
+    parser.add_argument("--limit", type=int, default=200, help="pages to load")
+    parser.add_argument("--rounds", type=int, default=3, help="timed rounds; the best one is reported")
+    args = parser.parse_args()
+
+    pages = load_pages_from_dir(args.pages, args.limit) if args.pages else load_pages_from_cache(args.cache_dir, args.limit)
+    if not pages:
+        print("No saved coin type pages found: pass --pages DIR or crawl with --cache first")
+        return 1
+
+    scraper = new_scraper()
+    groups = {}
+    for page in pages:
+        pictures, elapsed = time_clean(scraper, page, args.rounds)
+        bound = next((bound for bound in GROUPS if pictures <= bound), None)
+        groups.setdefault(bound, []).append((pictures, elapsed))
+
+    print(f"{'pictures':>10} {'pages':>6} {'ms/page':>9} {'ms/picture':>11}")
+    for bound in sorted(groups, key=lambda bound: float("inf") if bound is None else bound):
+        timings = groups[bound]
+        pictures = sum(p for p, _ in timings)
+        elapsed = sum(e for _, e in timings)
+        label = f"<= {bound}" if bound is not None else f"> {GROUPS[-1]}"
+        per_picture = f"{elapsed / pictures * 1000:11.3f}" if pictures else f"{'-':>11}"
+        print(f"{label:>10} {len(timings):6} {elapsed / len(timings) * 1000:9.2f} {per_picture}")
+
+if __name__ == "__main__":
+    raise SystemExit(main())
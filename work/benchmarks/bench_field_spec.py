@@ -0,0 +1,82 @@
+"""
+Benchmark of the declarative field specs (scrappers/numista/field_spec_functions.py).
+
+Reports the CPU per page of
+  - COIN_TYPE_PAGE_FIELDS: every field parse_coin_type_page() reads, located in one walk
+  - the coin_types/parsers characteristics, read the way the post-pass scripts read them (one
+    extract_*() call, hence one walk, per script) and all at once with extract_characteristics()
+next to the cost of building the tree, which the field lookups come on top of.
+
+Coin type pages come from --pages or the Numista response cache, as in bench_parse_once.py;
+the cleaned pages from --cleaned-pages (default: scrappers/numista/coin_types/html).
+
+Usage: python work/benchmarks/bench_field_spec.py [--pages DIR] [--cache-dir DIR] [--cleaned-pages DIR] [--limit N] [--rounds N]
+"""
+import argparse
+import os
+import sys
+import time
+
+from bench_parse_once import load_pages_from_cache, load_pages_from_dir
+
+NUMISTA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "scrappers", "numista")
+sys.path.append(os.path.join(NUMISTA_DIR, "coin_types", "parsers"))
+
+from helper_functions import COIN_TYPE_PAGE_FIELDS
+from html_parser_functions import make_soup
+from characteristics_functions import extract_characteristics
+from parse_composition import extract_composition
+from parse_denomination import extract_denomination
+from parse_dimensions import extract_dimensions
+from parse_rulers import extract_rulers
+from parse_shapes import extract_shape
+from parse_size import extract_size
+
+SCRIPT_EXTRACTORS = (extract_composition, extract_denomination, extract_dimensions, extract_rulers, extract_shape, extract_size)
+
+def bench(fn, pages, rounds):
+    """Best CPU seconds per page of fn(soup) over rounds; each round gets fresh trees (the ruler links are edited in place)."""
+    best = None
+    for _ in range(rounds):
+        soups = [make_soup(page) for page in pages]
+        start = time.process_time()
+        for soup in soups:
+            fn(soup)
+        elapsed = (time.process_time() - start) / len(pages)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def per_script(soup):
+    for extract in SCRIPT_EXTRACTORS:
+        extract(soup)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", help="folder of saved coin type pages (*.html, searched recursively)")
+    parser.add_argument("--cache-dir", default=os.path.join(NUMISTA_DIR, "cache"))
+    parser.add_argument("--cleaned-pages", default=os.path.join(NUMISTA_DIR, "coin_types", "html"), help="folder of cleaned coin_type.html files")
+    parser.add_argument("--limit", type=int, default=200, help="pages to load of each kind")
+    parser.add_argument("--rounds", type=int, default=3, help="timed rounds; the best one is reported")
+    args = parser.parse_args()
+
+    pages = load_pages_from_dir(args.pages, args.limit) if args.pages else load_pages_from_cache(args.cache_dir, args.limit)
+    cleaned = load_pages_from_dir(args.cleaned_pages, args.limit) if os.path.isdir(args.cleaned_pages) else []
+    if not pages and not cleaned:
+        print("No saved pages found: pass --pages / --cleaned-pages or crawl with --cache first")
+        return 1
+
+    if pages:
+        start = time.process_time()
+        for page in pages:
+            make_soup(page)
+        tree = (time.process_time() - start) / len(pages)
+        print(f"coin type pages:       {len(pages)}")
+        print(f"  tree build:          {tree * 1000:.2f} ms CPU/page")
+        print(f"  page fields:         {bench(COIN_TYPE_PAGE_FIELDS.extract, pages, args.rounds) * 1000:.2f} ms CPU/page")
+    if cleaned:
+        print(f"cleaned pages:         {len(cleaned)}")
+        print(f"  one walk per script: {bench(per_script, cleaned, args.rounds) * 1000:.2f} ms CPU/page ({len(SCRIPT_EXTRACTORS)} scripts)")
+        print(f"  one walk for all:    {bench(extract_characteristics, cleaned, args.rounds) * 1000:.2f} ms CPU/page")
+
+if __name__ == "__main__":
+    raise SystemExit(main())
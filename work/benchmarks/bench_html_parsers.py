@@ -0,0 +1,279 @@
+"""
+Equivalence check and benchmark of the BeautifulSoup tree builders (scrappers/shared/html_parser_functions.py).
+
+Every extractor of the scrapers is run on a corpus of saved pages once per builder in
+HTML_PARSERS; the outputs are compared with those of html.parser (the builder the scrapers
+were written against) and the CPU per page of each builder is reported. A builder is only
+safe to select with --html-parser / SCRAPER_HTML_PARSER once this reports no mismatches on
+a real corpus: the exit code is 1 if any extractor disagrees.
+
+The corpus:
+  - the Numista response cache (scrappers/numista/cache, filled by --cache runs): coin type,
+    listing, issuers, rulers, ruler, mints, tags and techniques pages, told apart by URL
+  - --coin-pages DIR: extra raw coin type pages (*.html, searched recursively)
+  - --cleaned-pages DIR: the cleaned coin_type.html files read by coin_types/parsers/*.py
+    (default: scrappers/numista/coin_types/html)
+  - --ucoin-pages DIR: saved uCoin coin type and listing pages
+
+Usage: python work/benchmarks/bench_html_parsers.py [--cache-dir DIR] [--coin-pages DIR] [--cleaned-pages DIR]
+                                                    [--ucoin-pages DIR] [--limit N] [--rounds N]
+"""
+import argparse
+import difflib
+import glob
+import importlib
+import os
+import pprint
+import sqlite3
+import sys
+import time
+import zlib
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+NUMISTA_DIR = os.path.join(ROOT, "scrappers", "numista")
+
+sys.path.append(os.path.join(NUMISTA_DIR, "coin_types"))
+sys.path.append(os.path.join(NUMISTA_DIR, "coin_types", "parsers"))
+for folder in ("issuers", "rulers", "mints", "tags", "techniques"):
+    sys.path.append(os.path.join(NUMISTA_DIR, folder))
+
+from bs4 import Tag
+from coin_types_scrapper import CoinTypesScraper
+from basic_functions import BasicHelper
+from html_parser_functions import HTML_PARSERS, configure_html_parser, make_soup
+from issuers_scrapper import IssuersCoinScraper
+from rulers_issuers_scrapper import RulersIssuersScraper
+from mints_scrapper import MintsCoinScraper
+from tags_scrapper import TagsCoinScraper
+import techniques_scrapper
+from parse_composition import extract_composition
+from parse_denomination import extract_denomination
+from parse_dimensions import extract_dimensions
+from parse_rulers import extract_rulers
+from parse_shapes import extract_shape
+from parse_size import extract_size
+
+# Response cache URL fragment -> page kind
+CACHE_PAGE_KINDS = [
+    ("/catalogue/pieces", "coin_type"),
+    ("/catalogue/index.php", "listing"),
+    ("/catalogue/pays.php", "issuers"),
+    ("/catalogue/rulers.php", "rulers"),
+    ("/catalogue/ruler.php", "ruler"),
+    ("/catalogue/mints.php", "mints"),
+    ("/catalogue/tags.php", "tags"),
+    ("/catalogue/techniques.php", "techniques"),
+]
+
+def new_scraper(scraper_class):
+    # Parsing needs neither the databases nor the network
+    scraper = scraper_class.__new__(scraper_class)
+    scraper.basic_helper = BasicHelper()
+    return scraper
+
+def import_ucoin():
+    """The uCoin CoinScraper class. Both scrapers have a helper_functions module, so the Numista one is set aside meanwhile."""
+    numista_helper_functions = sys.modules.pop("helper_functions", None)
+    sys.path.insert(0, os.path.join(ROOT, "scrappers", "ucoin"))
+    try:
+        return importlib.import_module("scrapper").CoinScraper
+    finally:
+        sys.path.pop(0)
+        sys.modules["ucoin_helper_functions"] = sys.modules.pop("helper_functions")
+        if numista_helper_functions is not None:
+            sys.modules["helper_functions"] = numista_helper_functions
+
+def numista_extractors():
+    """Page kind -> [(extractor name, function of the page text)]."""
+    coin_types = new_scraper(CoinTypesScraper)
+    issuers = new_scraper(IssuersCoinScraper)
+    rulers = new_scraper(RulersIssuersScraper)
+    mints = new_scraper(MintsCoinScraper)
+    tags = new_scraper(TagsCoinScraper)
+    techniques = new_scraper(techniques_scrapper.MintsCoinScraper)
+
+    def coin_type(page):
+        out = coin_types._new_out(0, {"id": 0, "numista_url_slug": "bench"}, {"period_text": ""}, "bench")
+        soup = coin_types.parse_coin_type_page(out, page)
+        return out, coin_types.clean_html(soup, out, "bench")
+
+    def listing(page):
+        soup = make_soup(page)
+        return coin_types.parse_country_page(soup), coin_types._get_next_page_number(soup)
+
+    def cleaned(extract):
+        return lambda page: extract(make_soup(page))
+
+    return {
+        "coin_type": [("coin type page + clean_html", coin_type)],
+        "listing": [("listing page", listing)],
+        "issuers": [("issuers", issuers._parse_issuers)],
+        "rulers": [("rulers", rulers._parse_rulers)],
+        "ruler": [("ruler", lambda page: rulers._parse_ruler(page, 0, None))],
+        "mints": [("mints", mints._parse_mints)],
+        "tags": [("tags", tags._parse_tags)],
+        "techniques": [("techniques", techniques._parse_techniques)],
+        "cleaned": [
+            ("parsers/composition", cleaned(extract_composition)),
+            ("parsers/denomination", cleaned(extract_denomination)),
+            ("parsers/dimensions", cleaned(extract_dimensions)),
+            ("parsers/rulers", cleaned(extract_rulers)),
+            ("parsers/shapes", cleaned(extract_shape)),
+            ("parsers/size", cleaned(extract_size)),
+        ],
+    }
+
+def ucoin_extractors():
+    CoinScraper = import_ucoin()
+
+    def parsed(extract):
+        return lambda page: extract(make_soup(page))
+
+    def face_tables(soup):
+        return [CoinScraper.parse_coin_face_table(None, table) for table in CoinScraper.find_obverse_reverse_tables(soup)]
+
+    return {
+        "ucoin": [
+            ("ucoin mintage table", parsed(CoinScraper.parse_mintage_table)),
+            ("ucoin face tables", parsed(face_tables)),
+            ("ucoin gallery", parsed(CoinScraper.parse_coin_gallery)),
+            ("ucoin no-result check", parsed(CoinScraper.has_no_result)),
+        ],
+    }
+
+def load_dir(pages_dir, limit, pattern="*.html"):
+    paths = sorted(glob.glob(os.path.join(pages_dir, "**", pattern), recursive=True))[:limit]
+    pages = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+    return pages
+
+def load_cache(cache_dir, limit):
+    """Page kind -> [page text] from the Numista response cache."""
+    pages = {}
+    db_path = os.path.join(cache_dir, "cache.db")
+    if not os.path.exists(db_path):
+        return pages
+    db_connection = sqlite3.connect(db_path)
+    rows = db_connection.execute("SELECT url, body_hash, encoding FROM responses WHERE status = 200").fetchall()
+    db_connection.close()
+
+    for url, body_hash, encoding in rows:
+        kind = next((kind for fragment, kind in CACHE_PAGE_KINDS if fragment in url), None)
+        if kind is None or len(pages.get(kind, [])) >= limit:
+            continue
+        with open(os.path.join(cache_dir, "bodies", body_hash[:2], body_hash), "rb") as f:
+            pages.setdefault(kind, []).append(zlib.decompress(f.read()).decode(encoding or "utf-8", errors="replace"))
+    return pages
+
+def normalize(value):
+    """Extractor output made comparable across builders: tags become their HTML."""
+    if isinstance(value, Tag):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    return value
+
+def first_difference(expected, actual, builder):
+    lines = difflib.unified_diff(
+        pprint.pformat(expected, width=120).splitlines(), pprint.pformat(actual, width=120).splitlines(),
+        HTML_PARSERS[0], builder, n=1, lineterm=""
+    )
+    return "\n".join(list(lines)[:12])
+
+def run(extract, pages):
+    outputs = []
+    for page in pages:
+        try:
+            outputs.append(normalize(extract(page)))
+        except Exception as e:
+            outputs.append(f"raised {type(e).__name__}: {e}")
+    return outputs
+
+def bench(extract, pages, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.process_time()
+        run(extract, pages)
+        elapsed = (time.process_time() - start) / len(pages)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cache-dir", default=os.path.join(NUMISTA_DIR, "cache"))
+    parser.add_argument("--coin-pages", help="folder of saved raw coin type pages")
+    parser.add_argument("--cleaned-pages", default=os.path.join(NUMISTA_DIR, "coin_types", "html"), help="folder of cleaned coin_type.html files")
+    parser.add_argument("--ucoin-pages", help="folder of saved uCoin pages")
+    parser.add_argument("--limit", type=int, default=200, help="pages to load per page kind")
+    parser.add_argument("--rounds", type=int, default=3, help="timed rounds; the best one is reported")
+    parser.add_argument("--show", type=int, default=3, help="mismatching pages to show per extractor")
+    args = parser.parse_args()
+
+    corpus = load_cache(args.cache_dir, args.limit)
+    if args.coin_pages:
+        corpus.setdefault("coin_type", []).extend(load_dir(args.coin_pages, args.limit))
+    if os.path.isdir(args.cleaned_pages):
+        corpus["cleaned"] = load_dir(args.cleaned_pages, args.limit, "coin_type.html")
+    extractors = numista_extractors()
+    if args.ucoin_pages:
+        corpus["ucoin"] = load_dir(args.ucoin_pages, args.limit)
+        extractors.update(ucoin_extractors())
+
+    corpus = {kind: pages for kind, pages in corpus.items() if pages}
+    if not corpus:
+        print("No saved pages found: crawl with --cache first or pass --coin-pages / --cleaned-pages / --ucoin-pages")
+        return 1
+
+    available = []
+    for name in HTML_PARSERS:
+        try:
+            configure_html_parser(name)
+            available.append(name)
+        except RuntimeError as e:
+            print(f"Skipping {name}: {e}")
+    reference = HTML_PARSERS[0]
+
+    mismatches = 0
+    rows = []
+    for kind, pages in corpus.items():
+        for name, extract in extractors[kind]:
+            configure_html_parser(reference)
+            expected = run(extract, pages)
+            timings = {reference: bench(extract, pages, args.rounds)}
+            differing = {}
+            for builder in available[1:]:
+                configure_html_parser(builder)
+                actual = run(extract, pages)
+                differing[builder] = [i for i, (e, a) in enumerate(zip(expected, actual)) if e != a]
+                for i in differing[builder][:args.show]:
+                    print(f"--- {name}: page {i} differs under {builder}\n{first_difference(expected[i], actual[i], builder)}\n")
+                mismatches += len(differing[builder])
+                timings[builder] = bench(extract, pages, args.rounds)
+            rows.append((name, len(pages), differing, timings))
+
+    configure_html_parser(reference)
+    header = f"{'extractor':32} {'pages':>6}"
+    for builder in available:
+        header += f" {builder + ' ms':>15}"
+    for builder in available[1:]:
+        header += f" {builder + ' diff':>12} {'speedup':>8}"
+    print(header)
+    for name, count, differing, timings in rows:
+        line = f"{name:32} {count:6}"
+        for builder in available:
+            line += f" {timings[builder] * 1000:15.2f}"
+        for builder in available[1:]:
+            line += f" {len(differing[builder]):12} {timings[reference] / timings[builder]:7.2f}x"
+        print(line)
+
+    if mismatches:
+        print(f"{mismatches} mismatching outputs: keep {reference}")
+        return 1
+    print("All extractors agree")
+
+if __name__ == "__main__":
+    raise SystemExit(main())
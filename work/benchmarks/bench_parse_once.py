@@ -0,0 +1,116 @@
+"""
+Before/after benchmark for parsing each coin type page once.
+
+Runs saved coin type pages through
+  - parse_coin_type_page(page) + clean_html(page): two html.parser passes (the old behaviour)
+  - clean_html(parse_coin_type_page(page)): one pass, the soup rewritten in place (the new behaviour)
+and reports the CPU per coin of each, after checking that both produce the same parsed
+data and the same cleaned HTML. The html.parser tree building is timed on its own as well:
+it is the part that is done once instead of twice.
+
+Pages come from a folder of saved .html files (--pages) or, by default, from the
+coin type pages in the Numista response cache (scrappers/numista/cache, filled by --cache runs).
+
+Usage: python work/benchmarks/bench_parse_once.py [--pages DIR] [--cache-dir DIR] [--limit N] [--rounds N]
+"""
+import argparse
+import glob
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from bs4 import BeautifulSoup
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "scrappers", "numista", "coin_types"))
+
+from coin_types_scrapper import CoinTypesScraper
+from basic_functions import BasicHelper
+
+def load_pages_from_dir(pages_dir, limit):
+    paths = sorted(glob.glob(os.path.join(pages_dir, "**", "*.html"), recursive=True))[:limit]
+    pages = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+    return pages
+
+def load_pages_from_cache(cache_dir, limit):
+    db_path = os.path.join(cache_dir, "cache.db")
+    if not os.path.exists(db_path):
+        return []
+    db_connection = sqlite3.connect(db_path)
+    rows = db_connection.execute(
+        "SELECT body_hash, encoding FROM responses WHERE url LIKE '%/catalogue/pieces%' AND status = 200 LIMIT ?", (limit,)
+    ).fetchall()
+    db_connection.close()
+
+    pages = []
+    for body_hash, encoding in rows:
+        with open(os.path.join(cache_dir, "bodies", body_hash[:2], body_hash), "rb") as f:
+            pages.append(zlib.decompress(f.read()).decode(encoding or "utf-8", errors="replace"))
+    return pages
+
+def new_scraper():
+    # Parsing needs neither the databases nor the network
+    scraper = CoinTypesScraper.__new__(CoinTypesScraper)
+    scraper.basic_helper = BasicHelper()
+    return scraper
+
+def new_out(scraper):
+    return scraper._new_out(0, {"id": 0, "numista_url_slug": "bench"}, {"period_text": ""}, "bench")
+
+def parse_twice(scraper, page):
+    out = new_out(scraper)
+    scraper.parse_coin_type_page(out, page)
+    return out, scraper.clean_html(page, out, "bench")
+
+def parse_once(scraper, page):
+    out = new_out(scraper)
+    soup = scraper.parse_coin_type_page(out, page)
+    return out, scraper.clean_html(soup, out, "bench")
+
+def build_tree(scraper, page):
+    BeautifulSoup(page, "html.parser")
+
+def bench(fn, scraper, pages, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.process_time()
+        for page in pages:
+            fn(scraper, page)
+        elapsed = (time.process_time() - start) / len(pages)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", help="folder of saved coin type pages (*.html, searched recursively)")
+    parser.add_argument("--cache-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "scrappers", "numista", "cache"))
+    parser.add_argument("--limit", type=int, default=200, help="pages to load")
+    parser.add_argument("--rounds", type=int, default=3, help="timed rounds; the best one is reported")
+    args = parser.parse_args()
+
+    pages = load_pages_from_dir(args.pages, args.limit) if args.pages else load_pages_from_cache(args.cache_dir, args.limit)
+    if not pages:
+        print("No saved coin type pages found: pass --pages DIR or crawl with --cache first")
+        return 1
+
+    scraper = new_scraper()
+    for page in pages:
+        if parse_twice(scraper, page) != parse_once(scraper, page):
+            print("Mismatch between the two paths")
+            return 1
+
+    tree = bench(build_tree, scraper, pages, args.rounds)
+    twice = bench(parse_twice, scraper, pages, args.rounds)
+    once = bench(parse_once, scraper, pages, args.rounds)
+
+    print(f"pages:        {len(pages)} ({sum(len(p) for p in pages) / len(pages) / 1024:.0f} KiB on average)")
+    print(f"tree build:   {tree * 2000:.2f} -> {tree * 1000:.2f} ms CPU/coin")
+    print(f"parse twice:  {twice * 1000:.2f} ms CPU/coin (parse + clean)")
+    print(f"parse once:   {once * 1000:.2f} ms CPU/coin (parse + clean)")
+    print(f"saved:        {(twice - once) * 1000:.2f} ms CPU/coin ({(1 - once / twice) * 100:.0f}%)")
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,104 @@
+"""
+Before/after benchmark for BasicHelper's pooled session.
+
+Starts a local HTTPS stub (self-signed certificate generated with openssl,
+falls back to plain HTTP when openssl is missing) and times:
+  - one-shot creq.get() per request (the old BasicHelper.fetch behaviour)
+  - requests through SessionPool (the new behaviour)
+
+Usage: python work/benchmarks/bench_session_pool.py [requests] [--http]
+"""
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "scrappers", "numista"))
+
+from curl_cffi import requests as creq
+from basic_functions import SessionPool
+
+BODY = b"<html><body>" + b"x" * 20_000 + b"</body></html>"
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+def _make_cert(tmp_dir):
+    cert = os.path.join(tmp_dir, "cert.pem")
+    key = os.path.join(tmp_dir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+        check=True, capture_output=True)
+    return cert, key
+
+def start_stub(use_tls):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    scheme = "http"
+    if use_tls:
+        tmp_dir = tempfile.mkdtemp()
+        cert, key = _make_cert(tmp_dir)
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(cert, key)
+        server.socket = ctx.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}/page"
+
+def bench_one_shot(url, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        creq.get(url, impersonate="chrome136", timeout=30, verify=False)
+    return (time.perf_counter() - start) / n
+
+def bench_pooled(url, n):
+    pool = SessionPool(size=1)
+    start = time.perf_counter()
+    for _ in range(n):
+        with pool.session() as s:
+            s.get(url, timeout=30, verify=False)
+    elapsed = (time.perf_counter() - start) / n
+    pool.close()
+    return elapsed
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    n = int(args[0]) if args else 200
+    use_tls = "--http" not in sys.argv
+
+    try:
+        server, url = start_stub(use_tls)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"TLS stub unavailable ({e}), falling back to plain HTTP")
+        server, url = start_stub(False)
+
+    # warm up both paths once
+    bench_one_shot(url, 3)
+    bench_pooled(url, 3)
+
+    one_shot = bench_one_shot(url, n)
+    pooled = bench_pooled(url, n)
+
+    print(f"stub:      {url} ({n} requests)")
+    print(f"one-shot:  {one_shot * 1000:.2f} ms/request")
+    print(f"pooled:    {pooled * 1000:.2f} ms/request")
+    print(f"saved:     {(one_shot - pooled) * 1000:.2f} ms/request ({one_shot / pooled:.1f}x)")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
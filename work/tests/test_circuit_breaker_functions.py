@@ -0,0 +1,146 @@
+"""
+Circuit breaker (scrappers/shared/circuit_breaker_functions.py): the open -> half-open -> closed
+cycle, and image downloads left alone with a breaker that a page fetch tripped.
+
+Run from the repository root: python -m unittest discover -s work/tests
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "scrappers", "numista"))
+
+from basic_functions import BasicHelper
+import circuit_breaker_functions
+from circuit_breaker_functions import CircuitBreaker
+
+IMAGE = b"\xff\xd8" + b"x" * 10_000
+
+class ImageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(IMAGE)))
+        self.end_headers()
+        self.wfile.write(IMAGE)
+
+    def log_message(self, *args):
+        pass
+
+class CircuitBreakerTest(unittest.TestCase):
+    def new_breaker(self):
+        return CircuitBreaker("test", cooldown=0.05, max_cooldown=0.15, poll_interval=0.01)
+
+    def wait_in_thread(self, breaker, defer_probe):
+        result = {}
+        thread = threading.Thread(target=lambda: result.setdefault("probe", breaker.wait(defer_probe=defer_probe)), daemon=True)
+        thread.start()
+        return thread, result
+
+    def test_open_half_open_closed(self):
+        breaker = self.new_breaker()
+        self.assertFalse(breaker.wait())
+        breaker.trip("challenge page")
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(breaker.trips, 1)
+
+        # After the cooldown exactly one caller goes through, as the probe
+        self.assertTrue(breaker.wait())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        waiter, result = self.wait_in_thread(breaker, defer_probe=False)
+        time.sleep(0.1)
+        self.assertTrue(waiter.is_alive())
+
+        breaker.record_success(True)
+        waiter.join(1)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(result, {"probe": False})
+
+    def test_a_blocked_probe_doubles_the_cooldown(self):
+        breaker = self.new_breaker()
+        breaker.trip("challenge page")
+        # Sent before the trip and blocked as well: not a new trip
+        breaker.trip("challenge page")
+        self.assertEqual((breaker.trips, breaker.cooldown), (1, 0.05))
+
+        probe = breaker.wait()
+        breaker.trip("challenge page", probe)
+        self.assertEqual((breaker.state, breaker.cooldown), (CircuitBreaker.OPEN, 0.1))
+        probe = breaker.wait()
+        breaker.trip("challenge page", probe)
+        self.assertEqual(breaker.cooldown, 0.15)
+
+        # A probe failing for another reason lets the next caller probe right away
+        probe = breaker.wait()
+        breaker.record_failure(probe)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertTrue(breaker.wait())
+
+    def test_deferring_callers_leave_the_probe_to_a_page_fetch(self):
+        breaker = self.new_breaker()
+        breaker.trip("challenge page")
+        page, page_result = self.wait_in_thread(breaker, defer_probe=False)
+        while breaker._eager_waiters == 0:
+            time.sleep(0.001)
+        image, image_result = self.wait_in_thread(breaker, defer_probe=True)
+
+        page.join(1)
+        self.assertEqual(page_result, {"probe": True})
+        self.assertTrue(image.is_alive())
+        breaker.record_success(True)
+        image.join(1)
+        self.assertEqual(image_result, {"probe": False})
+
+    def test_deferring_callers_probe_when_no_page_fetch_waits(self):
+        breaker = self.new_breaker()
+        breaker.trip("challenge page")
+        self.assertTrue(breaker.wait(defer_probe=True))
+
+class ImageDownloadsWithOpenBreakerTest(unittest.TestCase):
+    """The page fetch that tripped the breaker gave up: the image downloads in flight must still finish."""
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.breaker = CircuitBreaker(BasicHelper.SITE_NAME, cooldown=0.1, poll_interval=0.02)
+        self.previous_breaker = circuit_breaker_functions._breakers.get(BasicHelper.SITE_NAME)
+        circuit_breaker_functions._breakers[BasicHelper.SITE_NAME] = self.breaker
+
+    def tearDown(self):
+        if self.previous_breaker is None:
+            circuit_breaker_functions._breakers.pop(BasicHelper.SITE_NAME, None)
+        else:
+            circuit_breaker_functions._breakers[BasicHelper.SITE_NAME] = self.previous_breaker
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def test_image_downloads_close_the_breaker(self):
+        helper = BasicHelper(pool_size=2)
+        self.breaker.trip("Cloudflare challenge page detected")
+
+        results = {}
+        def download(i):
+            url = f"http://127.0.0.1:{self.server.server_port}/photo{i}.jpg"
+            results[i] = helper.download_file(url, os.path.join(self.tmp_dir.name, f"photo{i}.jpg"))
+        threads = [threading.Thread(target=download, args=(i,), daemon=True) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+        self.assertFalse(any(thread.is_alive() for thread in threads), "image downloads still waiting on the breaker")
+        self.assertEqual(results, {0: True, 1: True, 2: True})
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        for i in range(3):
+            with open(os.path.join(self.tmp_dir.name, f"photo{i}.jpg"), "rb") as f:
+                self.assertEqual(f.read(), IMAGE)
+
+if __name__ == "__main__":
+    unittest.main()
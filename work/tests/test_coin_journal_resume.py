@@ -0,0 +1,106 @@
+"""
+Crash recovery of the coin journal through the asyncio crawler.
+
+Run from the repository root: python -m unittest discover -s work/tests
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+from bs4 import BeautifulSoup
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "scrappers", "numista", "coin_types"))
+
+from coin_types_scrapper import CoinTypesScraper
+from coin_types_db_functions import CoinTypesDbHelper
+from journal_db_functions import CoinJournalDbHelper
+from basic_functions import BasicHelper
+from download_functions import SingleFlightDownloads
+
+# The coin type tables the journal recovery reads and writes
+SCHEMA = """
+CREATE TABLE coin_types (id INTEGER PRIMARY KEY, issuer_id INTEGER, title TEXT, subtitle TEXT, edge_image TEXT, period TEXT, coin_type_slug TEXT, rarity_index INTEGER, issue_type_id INTEGER);
+CREATE TABLE coin_type_samples (id INTEGER PRIMARY KEY, coin_type_id INTEGER REFERENCES coin_types(id) ON DELETE CASCADE, obverse_image TEXT, reverse_image TEXT, sample_type INTEGER, is_fix INTEGER);
+CREATE TABLE coin_type_comment_images (coin_type_id INTEGER REFERENCES coin_types(id) ON DELETE CASCADE, image TEXT, source_type INTEGER);
+"""
+
+COIN_TYPE_ID = 1021
+ISSUER_RECORD = {"id": 1, "numista_url_slug": "issuer-1"}
+PERIOD = {"period_text": "Period A", "links": []}
+CLEANED_PAGE = "<html><body><main id=\"main\">Coin 1021</main></body></html>"
+
+class AsyncJournalResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "coins.db")
+        db_connection = sqlite3.connect(self.db_path)
+        db_connection.executescript(SCHEMA)
+        db_connection.close()
+        self.scrapers = []
+
+        self.coin_type_link = BeautifulSoup(f'<a href="/catalogue/pieces{COIN_TYPE_ID}.html">Coin {COIN_TYPE_ID}</a>', "html.parser").a
+
+    def tearDown(self):
+        for scraper in self.scrapers:
+            scraper.db_helper.db_connection.close()
+            scraper.journal.close()
+        self.tmp_dir.cleanup()
+
+    def new_scraper(self):
+        """A scraper on the test database and folders; its base URL refuses connections, so any fetch fails the test."""
+        scraper = CoinTypesScraper.__new__(CoinTypesScraper)
+        scraper.basic_helper = BasicHelper()
+        scraper.db_helper = CoinTypesDbHelper(self.db_path)
+        scraper.journal = CoinJournalDbHelper(self.db_path)
+        scraper.output_dir = self.tmp_dir.name
+        scraper.image_downloads = SingleFlightDownloads()
+        scraper.image_queue = None
+        scraper.base_url = "http://127.0.0.1:9/"
+        self.scrapers.append(scraper)
+        return scraper
+
+    def stage_and_crash(self, state):
+        """Stage the coin type with one scraper and leave it in the journal at state, as a crashed run would."""
+        scraper = self.new_scraper()
+        file_name_prefix, coin_type_dir = scraper.get_coin_type_dir(self.coin_type_link, ISSUER_RECORD, COIN_TYPE_ID)
+        out = scraper._new_out(COIN_TYPE_ID, ISSUER_RECORD, PERIOD, file_name_prefix)
+        out["title"] = f"Coin {COIN_TYPE_ID}"
+        staging_dir = scraper.stage_coin_type(out, CLEANED_PAGE, ISSUER_RECORD["numista_url_slug"], coin_type_dir)
+        if state != CoinJournalDbHelper.HTML_WRITTEN:
+            scraper.journal.advance(COIN_TYPE_ID, state)
+        return staging_dir, coin_type_dir
+
+    def store_async(self, scraper):
+        async def store():
+            await scraper._store_coin_type_async(COIN_TYPE_ID, self.coin_type_link, PERIOD, ISSUER_RECORD, asyncio.Semaphore(1), asyncio.Semaphore(1))
+        asyncio.run(store())
+
+    def assert_published(self, scraper, staging_dir, coin_type_dir):
+        with open(os.path.join(coin_type_dir, "coin_type.html"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), CLEANED_PAGE)
+        self.assertFalse(os.path.exists(staging_dir))
+        self.assertIsNone(scraper.journal.get_unfinished(COIN_TYPE_ID))
+        self.assertIsNotNone(scraper.db_helper.get_coin_type_full_info(COIN_TYPE_ID))
+
+    def test_html_written_coin_type_is_finished_without_refetching(self):
+        staging_dir, coin_type_dir = self.stage_and_crash(CoinJournalDbHelper.HTML_WRITTEN)
+        self.assertFalse(os.path.exists(coin_type_dir))
+
+        scraper = self.new_scraper()
+        self.store_async(scraper)
+
+        self.assert_published(scraper, staging_dir, coin_type_dir)
+
+    def test_images_done_coin_type_is_published(self):
+        staging_dir, coin_type_dir = self.stage_and_crash(CoinJournalDbHelper.IMAGES_DONE)
+
+        scraper = self.new_scraper()
+        self.store_async(scraper)
+
+        self.assert_published(scraper, staging_dir, coin_type_dir)
+
+if __name__ == "__main__":
+    unittest.main()
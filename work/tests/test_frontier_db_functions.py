@@ -0,0 +1,141 @@
+"""
+Shard isolation of the crawl frontier: a refresh (or another shard) crawling the same listing
+pages and coin types as the main crawl must not move, claim or delete the main crawl's rows.
+
+Run from the repository root: python -m unittest discover -s work/tests
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "scrappers", "numista", "coin_types"))
+
+from frontier_db_functions import FrontierDbHelper
+from coin_types_refresh import RefreshScheduler
+
+class FrontierShardTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "coins.db")
+        self.frontiers = []
+
+    def tearDown(self):
+        for frontier in self.frontiers:
+            frontier.close()
+        self.tmp_dir.cleanup()
+
+    def new_frontier(self, shard):
+        frontier = FrontierDbHelper(worker_id=f"worker-{len(self.frontiers)}", shard=shard, db_path=self.db_path)
+        self.frontiers.append(frontier)
+        return frontier
+
+    def crawl_page(self, frontier, issuer_url_slug, page, coin_type_ids, fingerprint=None):
+        frontier.start_page(issuer_url_slug, page)
+        for coin_type_id in coin_type_ids:
+            self.assertTrue(frontier.claim_coin(issuer_url_slug, page, coin_type_id))
+            frontier.complete_coin(issuer_url_slug, page, coin_type_id)
+        frontier.complete_page(issuer_url_slug, page, fingerprint)
+
+    def test_refresh_keeps_its_own_resume_point(self):
+        main = self.new_frontier("")
+        self.crawl_page(main, "x", 1, [11, 12], "fp-1")
+        # Page 2 is interrupted: coin 21 done, coin 22 in flight
+        main.start_page("x", 2)
+        self.assertTrue(main.claim_coin("x", 2, 21))
+        main.complete_coin("x", 2, 21)
+        self.assertTrue(main.claim_coin("x", 2, 22))
+        self.assertEqual(main.get_resume_point(), ("x", 2))
+
+        refresh = self.new_frontier(RefreshScheduler.refresh_shard(main.shard))
+        refresh.reset()
+        # The refresh re-checks page 2, including the coin the main crawl finished, then stops inside page 1
+        self.crawl_page(refresh, "x", 2, [21, 22], "fp-2")
+        refresh.start_page("x", 1)
+
+        self.assertEqual(main.get_resume_point(), ("x", 2))
+        self.assertEqual(refresh.get_resume_point(), ("x", 1))
+        # Page 2 is not finished in the main crawl, so its links are not known to be done there
+        self.assertIsNone(main.get_listing_fingerprint("x", 2))
+        self.assertEqual(refresh.get_listing_fingerprint("x", 2), "fp-2")
+
+        # The next refresh starts over without touching the main crawl
+        next_refresh = self.new_frontier(RefreshScheduler.refresh_shard(main.shard))
+        next_refresh.reset()
+        self.assertTrue(next_refresh.is_empty())
+        self.assertFalse(main.is_empty())
+        self.assertEqual(main.get_resume_point(), ("x", 2))
+        self.assertEqual(main.release_interrupted_coins(), [("x", 2, 22)])
+        self.assertFalse(main.claim_coin("x", 2, 21))
+        self.assertTrue(main.claim_coin("x", 2, 22))
+
+    def test_shards_on_the_same_page_keep_separate_rows(self):
+        first = self.new_frontier("0/2")
+        second = self.new_frontier("1/2")
+        self.crawl_page(first, "x", 1, [11])
+        second.start_page("x", 1)
+        self.assertTrue(second.claim_coin("x", 1, 11))
+
+        self.assertEqual(first.get_shard_progress(["0/2", "1/2"]), {
+            "0/2": {"pages_done": 1, "coins_done": 1, "coins_failed": 0, "current": "x p1"},
+            "1/2": {"pages_done": 0, "coins_done": 0, "coins_failed": 0, "current": "x p1"},
+        })
+        second.reset()
+        self.assertEqual(first.get_resume_point(), ("x", 1))
+        self.assertFalse(first.claim_coin("x", 1, 11))
+
+    def test_refresh_falls_back_to_the_fingerprints_of_the_crawl(self):
+        main = self.new_frontier("")
+        self.crawl_page(main, "x", 1, [11], "fp-1")
+        refresh = self.new_frontier(RefreshScheduler.refresh_shard(main.shard))
+        self.assertIsNone(refresh.get_listing_fingerprint("x", 1))
+
+        refresh.fingerprints_from_any_shard = True
+        self.assertEqual(refresh.get_listing_fingerprint("x", 1), "fp-1")
+        self.assertIsNone(refresh.get_listing_fingerprint("x", 2))
+        # Once the refresh finished the page itself, its own fingerprint wins
+        self.crawl_page(refresh, "x", 1, [11], "fp-2")
+        self.assertEqual(refresh.get_listing_fingerprint("x", 1), "fp-2")
+        self.assertEqual(main.get_listing_fingerprint("x", 1), "fp-1")
+
+    def test_listing_checks_of_all_shards_are_merged(self):
+        main = self.new_frontier("")
+        refresh = self.new_frontier(RefreshScheduler.refresh_shard(""))
+        main.record_listing_check("x", 1, "fp-1", 3)
+        refresh.record_listing_check("x", 1, "fp-1", 3)
+        refresh.record_listing_check("x", 1, "fp-2", 4)
+
+        check = main.get_listing_checks()["x"][1]
+        self.assertEqual((check["checks"], check["changes"], check["coin_count"]), (3, 1, 4))
+
+    def test_frontier_from_before_sharding_is_rebuilt(self):
+        db_connection = sqlite3.connect(self.db_path)
+        db_connection.executescript("""
+            CREATE TABLE crawl_frontier (
+                issuer_url_slug TEXT NOT NULL, page INTEGER NOT NULL, coin_type_id INTEGER NOT NULL,
+                state TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT, claimed_by TEXT,
+                updated_at REAL NOT NULL, shard TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (issuer_url_slug, page, coin_type_id)
+            );
+            INSERT INTO crawl_frontier (issuer_url_slug, page, coin_type_id, state, updated_at) VALUES ('y', 1, 0, 'done', 1);
+            INSERT INTO crawl_frontier (issuer_url_slug, page, coin_type_id, state, updated_at) VALUES ('x', 1, 0, 'claimed', 2);
+            CREATE TABLE listing_fingerprints (
+                issuer_url_slug TEXT NOT NULL, page INTEGER NOT NULL, fingerprint TEXT NOT NULL, updated_at REAL NOT NULL,
+                PRIMARY KEY (issuer_url_slug, page)
+            );
+            INSERT INTO listing_fingerprints VALUES ('y', 1, 'fp-y', 1);
+        """)
+        db_connection.close()
+
+        main = self.new_frontier("")
+        self.assertEqual(main.get_resume_point(), ("x", 1))
+        self.assertEqual(main.get_listing_fingerprint("y", 1), "fp-y")
+        # The refresh gets a row of its own for the same page
+        refresh = self.new_frontier("refresh")
+        refresh.start_page("x", 1)
+        refresh.complete_page("x", 1)
+        self.assertEqual(main.get_resume_point(), ("x", 1))
+
+if __name__ == "__main__":
+    unittest.main()
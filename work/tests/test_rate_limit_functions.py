@@ -0,0 +1,67 @@
+"""
+AIMD adaptation of the per-host rate limiter (scrappers/shared/rate_limit_functions.py).
+
+Run from the repository root: python -m unittest discover -s work/tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "scrappers", "shared"))
+
+from rate_limit_functions import HostRateLimiter, parse_retry_after
+
+class HostRateLimiterTest(unittest.TestCase):
+    def new_limiter(self, **settings):
+        return HostRateLimiter("example.com", **{"rate": 1.0, "min_rate": 0.2, "max_rate": 1.2, "increase": 0.05, **settings})
+
+    def test_fast_successes_add_back_up_to_max_rate(self):
+        limiter = self.new_limiter()
+        for _ in range(3):
+            limiter.on_response(200, 0.1)
+        self.assertAlmostEqual(limiter.current_rate(), 1.15)
+        for _ in range(10):
+            limiter.on_response(200, 0.1)
+        self.assertAlmostEqual(limiter.current_rate(), 1.2)
+        self.assertEqual(limiter.requests, 13)
+
+    def test_a_burst_of_429s_halves_the_rate_once(self):
+        limiter = self.new_limiter()
+        for _ in range(3):
+            limiter.on_response(429, 0.1)
+        self.assertAlmostEqual(limiter.current_rate(), 0.5)
+        self.assertEqual(limiter.throttled, 3)
+
+    def test_the_rate_never_drops_below_min_rate(self):
+        limiter = self.new_limiter(decrease_factor=0.1)
+        limiter.on_response(503, 0.1)
+        self.assertAlmostEqual(limiter.current_rate(), 0.2)
+
+    def test_retry_after_blocks_the_host(self):
+        limiter = self.new_limiter()
+        limiter.on_response(429, 0.1, retry_after="30")
+        self.assertGreater(limiter.reserve(), 29)
+
+    def test_slow_responses_in_flight_together_shrink_the_rate_once(self):
+        limiter = self.new_limiter(slow_latency=5.0)
+        for _ in range(4):
+            limiter.on_response(200, 6.0)
+        self.assertAlmostEqual(limiter.current_rate(), 0.9)
+        # A transport error says nothing about the rate
+        limiter.on_response(None, 0.1)
+        self.assertAlmostEqual(limiter.current_rate(), 0.9)
+
+    def test_slots_are_spaced_by_the_rate(self):
+        limiter = self.new_limiter(rate=2.0, max_rate=2.0)
+        delays = [limiter.reserve() for _ in range(3)]
+        self.assertAlmostEqual(delays[0], 0.0, places=2)
+        self.assertAlmostEqual(delays[1], 0.5, places=2)
+        self.assertAlmostEqual(delays[2], 1.0, places=2)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("12"), 12.0)
+        self.assertEqual(parse_retry_after("Thu, 01 Jan 1970 00:00:00 GMT"), 0.0)
+        self.assertIsNone(parse_retry_after("soon"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Leases of the shared crawl work queue (scrappers/numista/coin_types/work_queue_db_functions.py),
+on its SQLite backend.
+
+Run from the repository root: python -m unittest discover -s work/tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "scrappers", "numista", "coin_types"))
+
+from work_queue_db_functions import WorkQueueDbHelper
+
+class WorkQueueLeaseTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        # retry_delay=-1: a failed task is due for its retry right away
+        self.queue = WorkQueueDbHelper(sqlite_path=os.path.join(self.tmp_dir.name, "work_queue.db"), max_attempts=3, retry_delay=-1)
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp_dir.cleanup()
+
+    def test_a_live_lease_is_not_handed_out_again(self):
+        self.queue.add_page("x", 1)
+        task = self.queue.claim("node-a", lease_seconds=60)
+        self.assertEqual((task["task_key"], task["reclaimed"]), ("page:x:1", False))
+        self.assertIsNone(self.queue.claim("node-b", lease_seconds=60))
+
+    def test_an_expired_lease_is_reclaimed_by_another_node(self):
+        self.queue.add_coin("x", 1, 11, "{}")
+        # node-a dies right after its claim: the lease is already over
+        lost = self.queue.claim("node-a", lease_seconds=-1)
+        task = self.queue.claim("node-b", lease_seconds=60)
+        self.assertEqual((task["task_key"], task["reclaimed"]), ("coin:11", True))
+
+        # The old holder can neither extend the lease nor fail the task any more
+        self.assertEqual(self.queue.heartbeat([lost["token"]], 60), 0)
+        self.queue.fail(lost["task_key"], lost["token"], "late failure")
+        self.assertEqual(self.queue.get_counts(), {("coin", WorkQueueDbHelper.LEASED): 1})
+
+        self.assertTrue(self.queue.complete(task["task_key"]))
+        self.assertFalse(self.queue.complete(task["task_key"]))
+        self.assertFalse(self.queue.has_open_tasks())
+
+    def test_heartbeat_keeps_the_lease(self):
+        self.queue.add_page("x", 1)
+        task = self.queue.claim("node-a", lease_seconds=-1)
+        self.assertEqual(self.queue.heartbeat([task["token"]], 60), 1)
+        self.assertIsNone(self.queue.claim("node-b", lease_seconds=60))
+
+    def test_failed_tasks_are_retried_up_to_max_attempts(self):
+        self.queue.add_page("x", 1)
+        for attempt in range(3):
+            task = self.queue.claim("node-a", lease_seconds=60)
+            self.assertIsNotNone(task)
+            self.queue.fail(task["task_key"], task["token"], f"attempt {attempt + 1}")
+        self.assertIsNone(self.queue.claim("node-a", lease_seconds=60))
+        self.assertFalse(self.queue.has_open_tasks())
+
+if __name__ == "__main__":
+    unittest.main()